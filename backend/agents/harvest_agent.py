@@ -5,21 +5,49 @@ Uses LangGraph with Gemini to orchestrate weather, soil, and market tools
 into a harvest recommendation with explanation.
 """
 
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
 from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import tool
-
-from backend.tools.weather import get_current_weather, get_weather_forecast
+from langchain_core.tools import StructuredTool, tool
+
+from backend.tools.weather import (
+    get_current_weather,
+    get_weather_forecast,
+    aget_current_weather,
+    aget_weather_forecast,
+)
 from backend.tools.soil import get_soil_properties
 from backend.tools.mandi import get_mandi_prices
-from backend.tools.explanation import generate_explanation_safe
+from backend.tools.explanation import (
+    generate_explanation_safe,
+    agenerate_explanation,
+    agenerate_explanation_safe,
+    cached_explanation,
+    quick_explanation,
+)
+from backend.tools.distance import haversine_distance
+from backend.agents.runner import (
+    BACKOFF_ERROR,
+    ToolLog,
+    agent_mode,
+    astream_agent,
+    completed,
+    partial_result,
+    prefetch,
+    react_input,
+    run_agent,
+    run_sync,
+)
+from backend.config.llm_health import llm_health
+from backend.config.llm_factory import chat_model
+from backend.config.llm_gateway import (
+    PRIORITY_LOW,
+    llm_site,
+)
 
 
 # ─── Tool Wrappers ────────────────────────────────────────────
 
-@tool
-def fetch_weather(lat: float, lng: float) -> dict:
+def _fetch_weather(lat: float, lng: float) -> dict:
     """Get current weather conditions at a location. Returns
     temperature in Celsius, humidity percentage, and weather
     description. Use this to check if weather is favorable
@@ -27,14 +55,31 @@ def fetch_weather(lat: float, lng: float) -> dict:
     return get_current_weather(lat, lng)
 
 
-@tool
-def fetch_forecast(lat: float, lng: float) -> list:
+async def _afetch_weather(lat: float, lng: float) -> dict:
+    return await aget_current_weather(lat, lng)
+
+
+fetch_weather = StructuredTool.from_function(
+    func=_fetch_weather, coroutine=_afetch_weather, name="fetch_weather"
+)
+
+
+def _fetch_forecast(lat: float, lng: float) -> list:
     """Get weather forecast for next 24 hours at a location.
     Returns list of forecasts at 3-hour intervals. Use this
     to check if rain is coming or temperature will change."""
     return get_weather_forecast(lat, lng)
 
 
+async def _afetch_forecast(lat: float, lng: float) -> list:
+    return await aget_weather_forecast(lat, lng)
+
+
+fetch_forecast = StructuredTool.from_function(
+    func=_fetch_forecast, coroutine=_afetch_forecast, name="fetch_forecast"
+)
+
+
 @tool
 def fetch_soil_info(soil_type: str) -> dict:
     """Get soil properties for a given soil type. Returns
@@ -51,17 +96,13 @@ def fetch_market_prices(crop: str) -> list:
     return get_mandi_prices(crop)
 
 
-@tool
-def compute_harvest_score(
+def calculate_harvest_score(
     temp_c: float, humidity_pct: int, rain_forecast: bool,
     avg_mandi_price: float, price_trend: str,
     soil_moisture_factor: float
 ) -> dict:
-    """Calculate the harvest readiness score (0-100) based on
-    weather, market, and soil conditions. ALWAYS call this
-    after gathering data from other tools.
-    price_trend must be: 'rising', 'stable', or 'falling'.
-    Returns: score, color, recommendation, breakdown."""
+    """Deterministic harvest score math shared by the agent tool and
+    the fast path."""
     # Weather subscore (0-30)
     weather_score = 30
     if temp_c > 40:
@@ -111,6 +152,23 @@ def compute_harvest_score(
     }
 
 
+@tool
+def compute_harvest_score(
+    temp_c: float, humidity_pct: int, rain_forecast: bool,
+    avg_mandi_price: float, price_trend: str,
+    soil_moisture_factor: float
+) -> dict:
+    """Calculate the harvest readiness score (0-100) based on
+    weather, market, and soil conditions. ALWAYS call this
+    after gathering data from other tools.
+    price_trend must be: 'rising', 'stable', or 'falling'.
+    Returns: score, color, recommendation, breakdown."""
+    return calculate_harvest_score(
+        temp_c, humidity_pct, rain_forecast,
+        avg_mandi_price, price_trend, soil_moisture_factor,
+    )
+
+
 # ─── System Prompt ────────────────────────────────────────────
 
 HARVEST_SYSTEM_PROMPT = """You are AgriChain's Harvest Score Agent for Indian farmers.
@@ -120,7 +178,7 @@ YOUR PROCESS — follow these steps IN THIS EXACT ORDER:
 2. Call fetch_forecast to check for rain in the next 24 hours
 3. Call fetch_soil_info to get soil moisture properties
 4. Call fetch_market_prices to check mandi prices and assess demand
-5. From the market prices, calculate the average price and determine the trend (rising/stable/falling). If you cannot determine trend, use "stable".
+5. From the market prices, calculate the average price and determine the trend (rising/stable/falling) from each mandi's price "history", if any. Differences between mandis are not a trend: without history, use "stable".
 6. Call compute_harvest_score with ALL gathered data
 7. Give your final answer with the score and explanation
 
@@ -136,32 +194,242 @@ RULES:
 
 # ─── Agent Singleton ──────────────────────────────────────────
 
+HARVEST_TOOLS = [
+    fetch_weather,
+    fetch_forecast,
+    fetch_soil_info,
+    fetch_market_prices,
+    compute_harvest_score,
+]
+
 _harvest_agent = None
 
 
 def get_harvest_agent():
     global _harvest_agent
     if _harvest_agent is None:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.3,
-            google_api_key=os.getenv("GOOGLE_API_KEY", ""),
-        )
-        tools = [
-            fetch_weather,
-            fetch_forecast,
-            fetch_soil_info,
-            fetch_market_prices,
-            compute_harvest_score,
-        ]
+        llm = chat_model(temperature=0.3)
         _harvest_agent = create_react_agent(
-            llm, tools, prompt=HARVEST_SYSTEM_PROMPT
+            llm, HARVEST_TOOLS, state_modifier=HARVEST_SYSTEM_PROMPT
         )
     return _harvest_agent
 
 
-# ─── Public Run Function ─────────────────────────────────────
+# ─── Fast Path (no ReAct loop) ───────────────────────────────
+# The agent always calls the same tools in the same order, so the
+# fast path runs that pipeline directly: fetch everything at once,
+# score with calculate_harvest_score, then (optionally) one LLM call
+# to narrate the exact result.
+
+TREND_THRESHOLD_PCT = 5  # % change over the price history counted as a trend
+LOCAL_MANDI_COUNT = 3
+RAIN_WORDS = ("rain", "drizzle", "thunderstorm", "shower")
+
+
+def estimate_price_trend(prices: list, lat: float, lng: float) -> str:
+    """
+    Derive 'rising' / 'stable' / 'falling' from mandi price history.
+
+    A trend needs prices over time. Mandi entries may carry a
+    "history" list of earlier {"date", "price_per_kg"} readings,
+    oldest first; the trend is the average change from the oldest
+    reading to the current price across the farmer's nearest mandis
+    that have one. mandi_prices.json holds a single current price per
+    mandi, so without history this is "stable": a price gap between
+    nearby and distant mandis is geography, not a trend.
+    """
+    tracked = [p for p in prices if p.get("history")]
+    if not tracked:
+        return "stable"
+    nearest = sorted(
+        tracked,
+        key=lambda p: haversine_distance(lat, lng, p["lat"], p["lng"]),
+    )[:LOCAL_MANDI_COUNT]
+    changes = [
+        (p["price_per_kg"] - p["history"][0]["price_per_kg"])
+        / p["history"][0]["price_per_kg"] * 100
+        for p in nearest
+        if p["history"][0].get("price_per_kg")
+    ]
+    if not changes:
+        return "stable"
+    change_pct = sum(changes) / len(changes)
+    if change_pct >= TREND_THRESHOLD_PCT:
+        return "rising"
+    if change_pct <= -TREND_THRESHOLD_PCT:
+        return "falling"
+    return "stable"
+
+
+def _rain_expected(forecast: list) -> bool:
+    return any(
+        word in entry.get("description", "").lower()
+        for entry in forecast
+        for word in RAIN_WORDS
+    )
+
+
+def _score_inputs(
+    weather: dict, forecast: list, soil: dict, prices: list,
+    lat: float, lng: float,
+) -> dict:
+    avg_price = (
+        sum(p["price_per_kg"] for p in prices) / len(prices) if prices else 0
+    )
+    return {
+        "temp_c": weather["temp_c"],
+        "humidity_pct": weather["humidity_pct"],
+        "rain_forecast": _rain_expected(forecast),
+        "avg_mandi_price": round(avg_price, 2),
+        "price_trend": estimate_price_trend(prices, lat, lng),
+        "soil_moisture_factor": soil.get("moisture_factor", 1.0),
+    }
+
+
+def _prefetch_plan(
+    crop: str, lat: float, lng: float, soil_type: str
+) -> tuple:
+    """Harvest tools to run concurrently, and the scoring step that
+    depends on their results."""
+    fetchers = {
+        "weather": aget_current_weather(lat, lng),
+        "forecast": aget_weather_forecast(lat, lng),
+        "soil": asyncio.to_thread(get_soil_properties, soil_type),
+        "market_prices": asyncio.to_thread(get_mandi_prices, crop),
+    }
+
+    def derive(data: dict) -> dict:
+        inputs = _score_inputs(
+            data["weather"], data["forecast"], data["soil"],
+            data["market_prices"], lat, lng,
+        )
+        return {
+            "score_inputs": inputs,
+            "harvest_score": calculate_harvest_score(**inputs),
+        }
+
+    return fetchers, derive
+
+
+async def _aprefetch(
+    crop: str, lat: float, lng: float, soil_type: str
+) -> dict:
+    return await prefetch(*_prefetch_plan(crop, lat, lng, soil_type))
+
+
+def _plain_explanation(crop: str, score: dict) -> str:
+    return (
+        f"Harvest score for {crop}: {score['score']}/100 "
+        f"({score['color']}). {score['recommendation']}"
+    )
+
+
+@llm_site("harvest", PRIORITY_LOW)
+async def _anarrate(
+    crop: str, score: dict, inputs: dict, language: str
+) -> tuple:
+    """One LLM call to explain an already computed score. Returns
+    (explanation, success); falls back to a plain sentence."""
+    context = {"crop": crop, **score, **inputs}
+    cached = cached_explanation(context, language, "harvest")
+    if cached is not None:
+        return cached, True
+    if not llm_health.allow_request():
+        return _plain_explanation(crop, score), False
+    try:
+        explanation = await agenerate_explanation(
+            context, language, "harvest"
+        )
+        llm_health.record_success()
+        return explanation, True
+    except Exception as e:
+        print(f"Harvest narration error: {e}")
+        llm_health.record_failure()
+        return _plain_explanation(crop, score), False
+
+
+async def afast_harvest_score(
+    crop: str,
+    lat: float,
+    lng: float,
+    soil_type: str,
+    language: str = "hindi",
+    narrate: bool = True,
+) -> dict:
+    """
+    Score a harvest without the ReAct agent.
+
+    Weather, forecast, soil and mandi prices are fetched concurrently
+    and scored in Python, so the returned "score" (score, color,
+    recommendation, breakdown) is exact. With narrate=True a single
+    LLM call writes the explanation; otherwise it is a plain sentence.
+    """
+    data = await _aprefetch(crop, lat, lng, soil_type)
+    inputs, score = data["score_inputs"], data["harvest_score"]
+
+    if narrate:
+        explanation, success = await _anarrate(crop, score, inputs, language)
+    else:
+        explanation, success = _plain_explanation(crop, score), True
+
+    result = {
+        "explanation": explanation,
+        "success": success,
+        "score": score,
+        "inputs": inputs,
+    }
+    if not success:
+        result["error"] = "narration unavailable"
+    return result
+
+
+# ─── Public Run Functions ────────────────────────────────────
+
+def _fallback_result(crop: str, language: str, error: str) -> dict:
+    fallback = generate_explanation_safe(
+        {"score": 65, "crop": crop}, language, "harvest"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
+
+
+async def _afallback_result(crop: str, language: str, error: str) -> dict:
+    fallback = await agenerate_explanation_safe(
+        {"score": 65, "crop": crop}, language, "harvest"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
+
+
+def _structured(log: ToolLog) -> dict:
+    """The exact compute_harvest_score result, if the run got that far."""
+    score = completed(log.latest("harvest_score", "compute_harvest_score"))
+    return {"score": score} if score is not None else {}
 
+
+def _partial_result(crop: str, language: str, log: ToolLog) -> dict:
+    """A run past its deadline: the exact score, if it was computed."""
+    score = _structured(log).get("score")
+    if score is not None:
+        return partial_result(_plain_explanation(crop, score), score=score)
+    explanation = quick_explanation(
+        {"score": 65, "crop": crop}, language, "harvest"
+    )
+    return partial_result(explanation)
+
+
+def _user_prompt(
+    crop: str, lat: float, lng: float, soil_type: str, district: str,
+    language: str,
+) -> str:
+    return (
+        f"The farmer grows {crop} in {district}. "
+        f"Location: lat={lat}, lng={lng}. "
+        f"Soil type: {soil_type}. "
+        f"Please calculate the harvest score and explain "
+        f"in {language}."
+    )
+
+
+@llm_site("harvest", PRIORITY_LOW)
 def run_harvest_agent(
     crop: str,
     lat: float,
@@ -169,28 +437,96 @@ def run_harvest_agent(
     soil_type: str,
     district: str,
     language: str = "hindi",
+    mode: str | None = None,
 ) -> dict:
+    if agent_mode(mode) == "prefetch":
+        return run_sync(arun_harvest_agent(
+            crop, lat, lng, soil_type, district, language, mode="prefetch"
+        ))
+    if not llm_health.allow_request():
+        return _fallback_result(crop, language, BACKOFF_ERROR)
     try:
         agent = get_harvest_agent()
-        user_msg = (
-            f"The farmer grows {crop} in {district}. "
-            f"Location: lat={lat}, lng={lng}. "
-            f"Soil type: {soil_type}. "
-            f"Please calculate the harvest score and explain "
-            f"in {language}."
-        )
         result = agent.invoke(
-            {"messages": [{"role": "user", "content": user_msg}]},
+            react_input(
+                _user_prompt(crop, lat, lng, soil_type, district, language)
+            ),
             config={"recursion_limit": 10},
         )
         final_message = result["messages"][-1].content
-        return {"explanation": final_message, "success": True}
+        llm_health.record_success()
+        return {
+            "explanation": final_message, "success": True,
+            **_structured(ToolLog.from_messages(result["messages"])),
+        }
     except Exception as e:
         print(f"Harvest agent error: {e}")
-        fallback = generate_explanation_safe(
-            {"score": 65, "crop": crop}, language, "harvest"
+        llm_health.record_failure()
+        return _fallback_result(crop, language, str(e))
+
+
+@llm_site("harvest", PRIORITY_LOW)
+async def arun_harvest_agent(
+    crop: str,
+    lat: float,
+    lng: float,
+    soil_type: str,
+    district: str,
+    language: str = "hindi",
+    mode: str | None = None,
+) -> dict:
+    """
+    Async run_harvest_agent — awaits the agent without blocking the loop.
+    In prefetch mode all tools run up front and Gemini answers in one
+    turn; in react mode the LangGraph agent drives the tools. The
+    result carries the exact "score" the tools computed. Past
+    AGENT_DEADLINES["harvest"] it returns a partial result with the
+    score, if it was already computed.
+    """
+    if not llm_health.allow_request():
+        return await _afallback_result(crop, language, BACKOFF_ERROR)
+    user_prompt = _user_prompt(crop, lat, lng, soil_type, district, language)
+    log = ToolLog()
+    try:
+        final_message = await run_agent(
+            "harvest", mode, HARVEST_SYSTEM_PROMPT, user_prompt,
+            lambda: _prefetch_plan(crop, lat, lng, soil_type),
+            get_harvest_agent, recursion_limit=10, log=log,
         )
-        return {"explanation": fallback, "success": False, "error": str(e)}
+        if final_message is None:
+            return _partial_result(crop, language, log)
+        llm_health.record_success()
+        return {
+            "explanation": final_message, "success": True,
+            **_structured(log),
+        }
+    except Exception as e:
+        print(f"Harvest agent error: {e}")
+        llm_health.record_failure()
+        return {
+            **await _afallback_result(crop, language, str(e)),
+            **_structured(log),
+        }
+
+
+@llm_site("harvest", PRIORITY_LOW)
+async def astream_harvest_agent(
+    crop: str,
+    lat: float,
+    lng: float,
+    soil_type: str,
+    district: str,
+    language: str = "hindi",
+):
+    """Streaming prefetch run; yields runner.astream_agent events."""
+    async for event in astream_agent(
+        HARVEST_SYSTEM_PROMPT,
+        _user_prompt(crop, lat, lng, soil_type, district, language),
+        *_prefetch_plan(crop, lat, lng, soil_type),
+        fallback=lambda error: _afallback_result(crop, language, error),
+        extract=_structured,
+    ):
+        yield event
 
 
 if __name__ == "__main__":
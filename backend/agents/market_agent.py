@@ -5,10 +5,9 @@ Demonstrates that the highest-priced mandi isn't always the best deal
 after accounting for fuel costs and transit spoilage.
 """
 
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
 from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool, tool
 
 from backend.tools.mandi import get_mandi_prices, get_nearby_mandis
 from backend.tools.distance import (
@@ -16,8 +15,29 @@ from backend.tools.distance import (
     estimate_fuel_cost,
     calculate_transit_spoilage_pct,
 )
-from backend.tools.weather import get_current_weather
-from backend.tools.explanation import generate_explanation_safe
+from backend.tools.weather import get_current_weather, aget_current_weather
+from backend.tools.explanation import (
+    generate_explanation_safe,
+    agenerate_explanation_safe,
+    quick_explanation,
+)
+from backend.config.llm_health import llm_health
+from backend.config.llm_factory import chat_model
+from backend.config.llm_gateway import (
+    PRIORITY_NORMAL,
+    llm_site,
+)
+from backend.agents.runner import (
+    BACKOFF_ERROR,
+    ToolLog,
+    agent_mode,
+    astream_agent,
+    completed,
+    partial_result,
+    react_input,
+    run_agent,
+    run_sync,
+)
 
 
 # ─── Tool Wrappers ────────────────────────────────────────────
@@ -30,15 +50,24 @@ def fetch_nearby_mandis(crop: str, lat: float, lng: float) -> list:
     return get_nearby_mandis(crop, lat, lng, max_count=3)
 
 
-@tool
-def fetch_current_temp(lat: float, lng: float) -> dict:
+def _fetch_current_temp(lat: float, lng: float) -> dict:
     """Get current temperature at location. Needed to calculate
     how much crop will spoil during transport."""
     return get_current_weather(lat, lng)
 
 
-@tool
-def calculate_pocket_cash(
+async def _afetch_current_temp(lat: float, lng: float) -> dict:
+    return await aget_current_weather(lat, lng)
+
+
+fetch_current_temp = StructuredTool.from_function(
+    func=_fetch_current_temp,
+    coroutine=_afetch_current_temp,
+    name="fetch_current_temp",
+)
+
+
+def compute_pocket_cash(
     crop: str,
     volume_kg: float,
     farmer_lat: float,
@@ -50,11 +79,7 @@ def calculate_pocket_cash(
     temp_c: float,
     storage_method: str,
 ) -> dict:
-    """Calculate the ACTUAL cash a farmer takes home after
-    selling at a specific mandi. Accounts for fuel cost and
-    crop spoilage during transport. CALL THIS FOR EVERY MANDI
-    to compare them fairly. Returns pocket_cash, fuel_cost,
-    spoilage_loss, distance_km, and risk_level."""
+    """Pocket cash math shared by the agent tool and the prefetch path."""
     dist = haversine_distance(farmer_lat, farmer_lng, mandi_lat, mandi_lng)
     fuel = estimate_fuel_cost(dist, round_trip=True)
     spoilage_pct = calculate_transit_spoilage_pct(dist, crop, temp_c)
@@ -84,6 +109,30 @@ def calculate_pocket_cash(
     }
 
 
+@tool
+def calculate_pocket_cash(
+    crop: str,
+    volume_kg: float,
+    farmer_lat: float,
+    farmer_lng: float,
+    mandi_name: str,
+    mandi_lat: float,
+    mandi_lng: float,
+    price_per_kg: float,
+    temp_c: float,
+    storage_method: str,
+) -> dict:
+    """Calculate the ACTUAL cash a farmer takes home after
+    selling at a specific mandi. Accounts for fuel cost and
+    crop spoilage during transport. CALL THIS FOR EVERY MANDI
+    to compare them fairly. Returns pocket_cash, fuel_cost,
+    spoilage_loss, distance_km, and risk_level."""
+    return compute_pocket_cash(
+        crop, volume_kg, farmer_lat, farmer_lng, mandi_name,
+        mandi_lat, mandi_lng, price_per_kg, temp_c, storage_method,
+    )
+
+
 # ─── System Prompt ────────────────────────────────────────────
 
 MARKET_SYSTEM_PROMPT = """You are AgriChain's Market Comparison Agent for Indian farmers.
@@ -112,26 +161,121 @@ RULES:
 
 # ─── Agent Singleton ──────────────────────────────────────────
 
+MARKET_TOOLS = [fetch_nearby_mandis, fetch_current_temp, calculate_pocket_cash]
+
 _market_agent = None
 
 
 def get_market_agent():
     global _market_agent
     if _market_agent is None:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.3,
-            google_api_key=os.getenv("GOOGLE_API_KEY", ""),
-        )
-        tools = [fetch_nearby_mandis, fetch_current_temp, calculate_pocket_cash]
+        llm = chat_model(temperature=0.3)
         _market_agent = create_react_agent(
-            llm, tools, prompt=MARKET_SYSTEM_PROMPT
+            llm, MARKET_TOOLS, state_modifier=MARKET_SYSTEM_PROMPT
         )
     return _market_agent
 
 
-# ─── Public Run Function ─────────────────────────────────────
+# ─── Public Run Functions ────────────────────────────────────
+
+def _fallback_result(
+    crop: str, volume_kg: float, language: str, error: str
+) -> dict:
+    fallback = generate_explanation_safe(
+        {"crop": crop, "volume_kg": volume_kg}, language, "market"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
+
+
+async def _afallback_result(
+    crop: str, volume_kg: float, language: str, error: str
+) -> dict:
+    fallback = await agenerate_explanation_safe(
+        {"crop": crop, "volume_kg": volume_kg}, language, "market"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
 
+
+def _prefetch_plan(
+    crop: str, volume_kg: float, farmer_lat: float, farmer_lng: float,
+    storage_method: str,
+) -> tuple:
+    """Mandis and temperature concurrently, then pocket cash for every
+    mandi (ranked best first)."""
+    fetchers = {
+        "nearby_mandis": asyncio.to_thread(
+            get_nearby_mandis, crop, farmer_lat, farmer_lng, 3
+        ),
+        "current_weather": aget_current_weather(farmer_lat, farmer_lng),
+    }
+
+    def derive(data: dict) -> dict:
+        mandis = data["nearby_mandis"]
+        if not isinstance(mandis, list):
+            mandis = []
+        temp_c = data["current_weather"].get("temp_c", 35)
+        ranked = sorted(
+            (
+                compute_pocket_cash(
+                    crop, volume_kg, farmer_lat, farmer_lng, m["mandi"],
+                    m["lat"], m["lng"], m["price_per_kg"], temp_c,
+                    storage_method,
+                )
+                for m in mandis
+            ),
+            key=lambda r: r["pocket_cash"],
+            reverse=True,
+        )
+        return {"pocket_cash": ranked}
+
+    return fetchers, derive
+
+
+def _structured(log: ToolLog) -> dict:
+    """Pocket cash for every mandi evaluated, best first: the prefetch
+    ranking or each calculate_pocket_cash call of the agent."""
+    ranked = completed(log.latest("pocket_cash")) or sorted(
+        filter(completed, log.all("calculate_pocket_cash")),
+        key=lambda r: r["pocket_cash"],
+        reverse=True,
+    )
+    return {"mandis": ranked} if ranked else {}
+
+
+def _partial_result(
+    crop: str, volume_kg: float, language: str, log: ToolLog
+) -> dict:
+    """A run past its deadline: pocket cash for the mandis already
+    evaluated, best first."""
+    ranked = _structured(log).get("mandis")
+    if not ranked:
+        explanation = quick_explanation(
+            {"crop": crop, "volume_kg": volume_kg}, language, "market"
+        )
+        return partial_result(explanation)
+    best = ranked[0]
+    explanation = (
+        f"Best of {len(ranked)} mandis checked so far: "
+        f"{best['mandi_name']} — ₹{best['pocket_cash']:,.0f} in pocket "
+        f"for {volume_kg} kg of {crop}."
+    )
+    return partial_result(explanation, mandis=ranked)
+
+
+def _user_prompt(
+    crop: str, volume_kg: float, farmer_lat: float, farmer_lng: float,
+    current_temp_c: float, storage_method: str, language: str,
+) -> str:
+    return (
+        f"The farmer wants to sell {volume_kg} kg of {crop}. "
+        f"Location: lat={farmer_lat}, lng={farmer_lng}. "
+        f"Current temperature: {current_temp_c}°C. "
+        f"Storage method: {storage_method}. "
+        f"Find the best mandi and explain in {language}."
+    )
+
+
+@llm_site("market", PRIORITY_NORMAL)
 def run_market_agent(
     crop: str,
     volume_kg: float,
@@ -140,28 +284,112 @@ def run_market_agent(
     current_temp_c: float,
     storage_method: str,
     language: str = "hindi",
+    mode: str | None = None,
 ) -> dict:
+    if agent_mode(mode) == "prefetch":
+        return run_sync(arun_market_agent(
+            crop, volume_kg, farmer_lat, farmer_lng, current_temp_c,
+            storage_method, language, mode="prefetch",
+        ))
+    if not llm_health.allow_request():
+        return _fallback_result(crop, volume_kg, language, BACKOFF_ERROR)
     try:
         agent = get_market_agent()
-        user_msg = (
-            f"The farmer wants to sell {volume_kg} kg of {crop}. "
-            f"Location: lat={farmer_lat}, lng={farmer_lng}. "
-            f"Current temperature: {current_temp_c}°C. "
-            f"Storage method: {storage_method}. "
-            f"Find the best mandi and explain in {language}."
-        )
         result = agent.invoke(
-            {"messages": [{"role": "user", "content": user_msg}]},
+            react_input(_user_prompt(
+                crop, volume_kg, farmer_lat, farmer_lng,
+                current_temp_c, storage_method, language,
+            )),
             config={"recursion_limit": 12},
         )
         final_message = result["messages"][-1].content
-        return {"explanation": final_message, "success": True}
+        llm_health.record_success()
+        return {
+            "explanation": final_message, "success": True,
+            **_structured(ToolLog.from_messages(result["messages"])),
+        }
     except Exception as e:
         print(f"Market agent error: {e}")
-        fallback = generate_explanation_safe(
-            {"crop": crop, "volume_kg": volume_kg}, language, "market"
+        llm_health.record_failure()
+        return _fallback_result(crop, volume_kg, language, str(e))
+
+
+@llm_site("market", PRIORITY_NORMAL)
+async def arun_market_agent(
+    crop: str,
+    volume_kg: float,
+    farmer_lat: float,
+    farmer_lng: float,
+    current_temp_c: float,
+    storage_method: str,
+    language: str = "hindi",
+    mode: str | None = None,
+) -> dict:
+    """
+    Async run_market_agent — awaits the agent without blocking the loop.
+    In prefetch mode all tools run up front and Gemini answers in one
+    turn; in react mode the LangGraph agent drives the tools. The
+    result carries the exact pocket cash ranking as "mandis". Past
+    AGENT_DEADLINES["market"] it returns a partial result ranking the
+    mandis already evaluated.
+    """
+    if not llm_health.allow_request():
+        return await _afallback_result(crop, volume_kg, language, BACKOFF_ERROR)
+    user_prompt = _user_prompt(
+        crop, volume_kg, farmer_lat, farmer_lng,
+        current_temp_c, storage_method, language,
+    )
+    log = ToolLog()
+    try:
+        final_message = await run_agent(
+            "market", mode, MARKET_SYSTEM_PROMPT, user_prompt,
+            lambda: _prefetch_plan(
+                crop, volume_kg, farmer_lat, farmer_lng, storage_method
+            ),
+            get_market_agent, recursion_limit=12, log=log,
         )
-        return {"explanation": fallback, "success": False, "error": str(e)}
+        if final_message is None:
+            return _partial_result(crop, volume_kg, language, log)
+        llm_health.record_success()
+        return {
+            "explanation": final_message, "success": True,
+            **_structured(log),
+        }
+    except Exception as e:
+        print(f"Market agent error: {e}")
+        llm_health.record_failure()
+        return {
+            **await _afallback_result(crop, volume_kg, language, str(e)),
+            **_structured(log),
+        }
+
+
+@llm_site("market", PRIORITY_NORMAL)
+async def astream_market_agent(
+    crop: str,
+    volume_kg: float,
+    farmer_lat: float,
+    farmer_lng: float,
+    current_temp_c: float,
+    storage_method: str,
+    language: str = "hindi",
+):
+    """Streaming prefetch run; yields runner.astream_agent events."""
+    async for event in astream_agent(
+        MARKET_SYSTEM_PROMPT,
+        _user_prompt(
+            crop, volume_kg, farmer_lat, farmer_lng,
+            current_temp_c, storage_method, language,
+        ),
+        *_prefetch_plan(
+            crop, volume_kg, farmer_lat, farmer_lng, storage_method
+        ),
+        fallback=lambda error: _afallback_result(
+            crop, volume_kg, language, error
+        ),
+        extract=_structured,
+    ):
+        yield event
 
 
 if __name__ == "__main__":
@@ -5,8 +5,7 @@ Recommends cost-effective preservation methods sorted by ROI,
 with free methods always presented first.
 """
 
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
 from langgraph.prebuilt import create_react_agent
 from langchain_core.tools import tool
 
@@ -15,7 +14,28 @@ from backend.tools.preservation import (
     calculate_preservation_benefit,
 )
 from backend.tools.spoilage import predict_remaining_hours
-from backend.tools.explanation import generate_explanation_safe
+from backend.tools.explanation import (
+    generate_explanation_safe,
+    agenerate_explanation_safe,
+    quick_explanation,
+)
+from backend.config.llm_health import llm_health
+from backend.config.llm_factory import chat_model
+from backend.config.llm_gateway import (
+    PRIORITY_NORMAL,
+    llm_site,
+)
+from backend.agents.runner import (
+    BACKOFF_ERROR,
+    ToolLog,
+    agent_mode,
+    astream_agent,
+    completed,
+    partial_result,
+    react_input,
+    run_agent,
+    run_sync,
+)
 
 
 # ─── Tool Wrappers ────────────────────────────────────────────
@@ -73,57 +93,213 @@ RULES:
 
 # ─── Agent Singleton ──────────────────────────────────────────
 
+PRESERVATION_TOOLS = [
+    fetch_preservation_options, calculate_benefit, check_current_freshness,
+]
+
 _preservation_agent = None
 
 
 def get_preservation_agent():
     global _preservation_agent
     if _preservation_agent is None:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.3,
-            google_api_key=os.getenv("GOOGLE_API_KEY", ""),
-        )
+        llm = chat_model(temperature=0.3)
         _preservation_agent = create_react_agent(
             llm,
-            [fetch_preservation_options, calculate_benefit, check_current_freshness],
-            prompt=PRESERVATION_SYSTEM_PROMPT,
+            PRESERVATION_TOOLS,
+            state_modifier=PRESERVATION_SYSTEM_PROMPT,
         )
     return _preservation_agent
 
 
-# ─── Public Run Function ─────────────────────────────────────
+# ─── Public Run Functions ────────────────────────────────────
+# The preservation tools are local and CPU-only; under ainvoke
+# LangGraph runs them in a worker thread, so no async twins needed.
+
+FALLBACK_CONTEXT = {"method": "cold storage", "cost": 200}
+
+
+def _fallback_result(crop: str, language: str, error: str) -> dict:
+    fallback = generate_explanation_safe(
+        {"crop": crop, **FALLBACK_CONTEXT}, language, "preservation"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
+
+
+async def _afallback_result(crop: str, language: str, error: str) -> dict:
+    fallback = await agenerate_explanation_safe(
+        {"crop": crop, **FALLBACK_CONTEXT}, language, "preservation"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
+
+
+BENEFIT_METHOD_COUNT = 3  # "top 2-3 methods" in the system prompt
+
+
+def _prefetch_plan(crop: str, current_storage: str, temp_c: float) -> tuple:
+    """Baseline freshness and options concurrently, then the benefit
+    of each top method."""
+    fetchers = {
+        "current_freshness": asyncio.to_thread(
+            predict_remaining_hours, crop, current_storage, temp_c
+        ),
+        "preservation_options": asyncio.to_thread(
+            get_preservation_options, crop, current_storage
+        ),
+    }
+
+    def derive(data: dict) -> dict:
+        options = data["preservation_options"]
+        if not isinstance(options, list):
+            options = []
+        return {
+            "benefits": [
+                calculate_preservation_benefit(
+                    crop, option["id"], current_storage, temp_c
+                )
+                for option in options[:BENEFIT_METHOD_COUNT]
+                if "id" in option
+            ]
+        }
+
+    return fetchers, derive
+
+
+def _structured(log: ToolLog) -> dict:
+    """Current freshness, the options and the benefit of each method
+    worked out (prefetch or agent tool names)."""
+    structured = {
+        "current_freshness": completed(
+            log.latest("current_freshness", "check_current_freshness")
+        ),
+        "options": completed(
+            log.latest("preservation_options", "fetch_preservation_options")
+        ),
+        "benefits": completed(log.latest("benefits")) or list(
+            filter(completed, log.all("calculate_benefit"))
+        ),
+    }
+    return {k: v for k, v in structured.items() if v}
+
+
+def _partial_result(crop: str, language: str, log: ToolLog) -> dict:
+    """A run past its deadline: the benefits worked out so far, or
+    else the plain list of options."""
+    structured = _structured(log)
+    benefits = structured.get("benefits")
+    context = dict(FALLBACK_CONTEXT)
+    if benefits:
+        context = {
+            "method": benefits[0]["new_method"],
+            "cost": benefits[0]["cost_rupees"],
+        }
+    explanation = quick_explanation(
+        {"crop": crop, **context}, language, "preservation"
+    )
+    return partial_result(explanation, **structured)
+
 
+def _user_prompt(
+    crop: str, current_storage: str, temp_c: float, language: str
+) -> str:
+    return (
+        f"The farmer stores {crop} using {current_storage}. "
+        f"Current temperature: {temp_c}°C. "
+        f"What preservation methods should they use? "
+        f"Respond in {language}."
+    )
+
+
+@llm_site("preservation", PRIORITY_NORMAL)
 def run_preservation_agent(
     crop: str,
     current_storage: str,
     temp_c: float,
     language: str = "hindi",
+    mode: str | None = None,
 ) -> dict:
+    if agent_mode(mode) == "prefetch":
+        return run_sync(arun_preservation_agent(
+            crop, current_storage, temp_c, language, mode="prefetch"
+        ))
+    if not llm_health.allow_request():
+        return _fallback_result(crop, language, BACKOFF_ERROR)
     try:
         agent = get_preservation_agent()
-        user_msg = (
-            f"The farmer stores {crop} using {current_storage}. "
-            f"Current temperature: {temp_c}°C. "
-            f"What preservation methods should they use? "
-            f"Respond in {language}."
-        )
         result = agent.invoke(
-            {"messages": [{"role": "user", "content": user_msg}]},
+            react_input(_user_prompt(crop, current_storage, temp_c, language)),
             config={"recursion_limit": 10},
         )
+        llm_health.record_success()
         return {
             "explanation": result["messages"][-1].content,
             "success": True,
+            **_structured(ToolLog.from_messages(result["messages"])),
         }
     except Exception as e:
         print(f"Preservation agent error: {e}")
-        fallback = generate_explanation_safe(
-            {"crop": crop, "method": "cold storage", "cost": 200},
-            language,
-            "preservation",
+        llm_health.record_failure()
+        return _fallback_result(crop, language, str(e))
+
+
+@llm_site("preservation", PRIORITY_NORMAL)
+async def arun_preservation_agent(
+    crop: str,
+    current_storage: str,
+    temp_c: float,
+    language: str = "hindi",
+    mode: str | None = None,
+) -> dict:
+    """
+    Async run_preservation_agent — awaits the agent without blocking the
+    loop. In prefetch mode all tools run up front and Gemini answers in
+    one turn; in react mode the LangGraph agent drives the tools. The
+    result carries the exact "current_freshness", "options" and
+    "benefits". Past AGENT_DEADLINES["preservation"] it returns a
+    partial result with those already computed.
+    """
+    if not llm_health.allow_request():
+        return await _afallback_result(crop, language, BACKOFF_ERROR)
+    user_prompt = _user_prompt(crop, current_storage, temp_c, language)
+    log = ToolLog()
+    try:
+        final_message = await run_agent(
+            "preservation", mode, PRESERVATION_SYSTEM_PROMPT, user_prompt,
+            lambda: _prefetch_plan(crop, current_storage, temp_c),
+            get_preservation_agent, recursion_limit=10, log=log,
         )
-        return {"explanation": fallback, "success": False, "error": str(e)}
+        if final_message is None:
+            return _partial_result(crop, language, log)
+        llm_health.record_success()
+        return {
+            "explanation": final_message, "success": True,
+            **_structured(log),
+        }
+    except Exception as e:
+        print(f"Preservation agent error: {e}")
+        llm_health.record_failure()
+        return {
+            **await _afallback_result(crop, language, str(e)),
+            **_structured(log),
+        }
+
+
+@llm_site("preservation", PRIORITY_NORMAL)
+async def astream_preservation_agent(
+    crop: str,
+    current_storage: str,
+    temp_c: float,
+    language: str = "hindi",
+):
+    """Streaming prefetch run; yields runner.astream_agent events."""
+    async for event in astream_agent(
+        PRESERVATION_SYSTEM_PROMPT,
+        _user_prompt(crop, current_storage, temp_c, language),
+        *_prefetch_plan(crop, current_storage, temp_c),
+        fallback=lambda error: _afallback_result(crop, language, error),
+        extract=_structured,
+    ):
+        yield event
 
 
 if __name__ == "__main__":
@@ -0,0 +1,387 @@
+"""
+runner.py — Shared execution helpers for the agents.
+
+Every agent's tool arguments are already known from the request
+(crop, lat/lng, soil_type, storage_method), so the ReAct loop spends
+several Gemini round trips only deciding to call them. In "prefetch"
+mode an agent instead runs its tools concurrently up front and hands
+the results to the model, which answers in a single turn. "react"
+mode keeps the original LangGraph agent loop.
+
+astream_agent is the streaming form of a prefetch run, used by the
+SSE endpoints: tool results are yielded as they finish, then the
+explanation token by token.
+
+run_agent runs either mode within the agent's wall-clock deadline
+(settings.AGENT_DEADLINES). Tool results are kept in a ToolLog as they
+arrive, so a run that is cut off still returns what it had gathered
+and the agent can build a partial answer from it. Every run, finished
+or not, returns the exact tool outputs it relies on (score, pocket
+cash, remaining hours, ...) next to the explanation, so responses are
+built from them instead of from the prose.
+
+react_handoff(messages) hands a react run the tool-calling turn the
+single-call router (orchestrator/single_call.py) already took: the run
+continues from those tool calls and results instead of starting over.
+"""
+
+import asyncio
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from backend.config.llm_factory import chat_model
+from backend.config.llm_health import llm_health
+from backend.config.settings import settings
+
+AGENT_MODES = ("prefetch", "react")
+
+BACKOFF_ERROR = "LLM unavailable (backing off)"
+DEADLINE_ERROR = "Agent deadline exceeded"
+
+PREFETCH_INSTRUCTIONS = (
+    "\n\nIMPORTANT: every tool in YOUR PROCESS has already been called "
+    "for you. Their results are given in the user's message under "
+    "TOOL RESULTS. Do not call any tools and do not ask for more data. "
+    "Use these exact numbers and answer now, following the RULES."
+)
+
+_answer_llm = None
+
+
+def agent_mode(mode: str | None = None) -> str:
+    """Resolve an explicit mode or settings.AGENT_MODE to a valid mode."""
+    mode = (mode or settings.AGENT_MODE).lower()
+    return mode if mode in AGENT_MODES else "react"
+
+
+def run_sync(coroutine):
+    """
+    Run a coroutine to completion for a sync caller (the run_*_agent
+    wrappers). asyncio.run() cannot start inside a running event loop,
+    so there it runs on a worker thread's own loop, in a copy of the
+    caller's context (its llm_call site, weather prefetch).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(context.run, asyncio.run, coroutine).result()
+
+
+def react_input(content: str) -> dict:
+    """LangGraph input for a single user message."""
+    return {"messages": [{"role": "user", "content": content}]}
+
+
+def get_answer_llm():
+    """Gemini without tools, for single-turn prefetch answers."""
+    global _answer_llm
+    if _answer_llm is None:
+        _answer_llm = chat_model(temperature=0.3)
+    return _answer_llm
+
+
+async def _named(name: str, awaitable) -> tuple:
+    try:
+        return name, await awaitable
+    except Exception as e:
+        print(f"Prefetch {name} error: {e}")
+        return name, {"error": str(e)}
+
+
+async def gather_inputs(**fetchers) -> dict:
+    """
+    Await every fetcher concurrently and return {name: result}.
+
+    A fetcher that raises is reported as {"error": ...} instead of
+    failing the whole prefetch, just as a failed tool call would be.
+    """
+    results = await asyncio.gather(
+        *(_named(name, aw) for name, aw in fetchers.items())
+    )
+    return dict(results)
+
+
+async def prefetch(fetchers: dict, derive=None) -> dict:
+    """
+    Run an agent's prefetch plan: fetchers concurrently, then
+    derive(data) -> {name: result} for the steps that depend on them.
+    """
+    data = await gather_inputs(**fetchers)
+    if derive is not None:
+        data.update(derive(data))
+    return data
+
+
+async def iter_prefetch(fetchers: dict, derive=None):
+    """
+    Like prefetch(), but yield (name, result) as each one finishes.
+    Fetchers still running when the caller stops (deadline, client
+    gone) are cancelled.
+    """
+    data = {}
+    tasks = [
+        asyncio.ensure_future(_named(name, aw))
+        for name, aw in fetchers.items()
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            name, result = await next_done
+            data[name] = result
+            yield name, result
+    finally:
+        for task in tasks:
+            task.cancel()
+    if derive is not None:
+        for name, result in derive(data).items():
+            yield name, result
+
+
+def prefetch_messages(
+    system_prompt: str, user_prompt: str, context: dict
+) -> list:
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    tool_results = json.dumps(
+        context, ensure_ascii=False, default=str, indent=1
+    )
+    return [
+        SystemMessage(content=system_prompt + PREFETCH_INSTRUCTIONS),
+        HumanMessage(
+            content=f"{user_prompt}\n\nTOOL RESULTS:\n{tool_results}"
+        ),
+    ]
+
+
+async def aanswer_with_context(
+    system_prompt: str, user_prompt: str, context: dict
+) -> str:
+    """One Gemini call that answers from prefetched tool results."""
+    response = await get_answer_llm().ainvoke(
+        prefetch_messages(system_prompt, user_prompt, context)
+    )
+    return response.content
+
+
+# ─── Deadlines ───────────────────────────────────────────────
+
+class ToolLog:
+    """Tool results of one run, in the order they completed."""
+
+    def __init__(self):
+        self.calls: list = []
+
+    def add(self, name: str, result):
+        self.calls.append((name, result))
+
+    def latest(self, *names):
+        """The most recent result of any of these tools, or None."""
+        for name, result in reversed(self.calls):
+            if name in names:
+                return result
+        return None
+
+    def all(self, *names) -> list:
+        return [result for name, result in self.calls if name in names]
+
+    def as_dict(self) -> dict:
+        """{name: latest result}"""
+        return dict(self.calls)
+
+    @classmethod
+    def from_messages(cls, messages: list) -> "ToolLog":
+        """The tool results in a finished LangGraph message trace."""
+        from langchain_core.messages import ToolMessage
+
+        log = cls()
+        for message in messages:
+            if isinstance(message, ToolMessage):
+                log.add(message.name, _tool_result(message.content))
+        return log
+
+
+def completed(result):
+    """A tool result worth reporting: not missing and not an error."""
+    if result is None or (isinstance(result, dict) and "error" in result):
+        return None
+    return result
+
+
+def partial_result(explanation: str, **data) -> dict:
+    """
+    The result of a run cut off by its deadline. data holds the
+    structured results it had computed (None values are dropped) and
+    is passed on to the response formatter.
+    """
+    result = {
+        "explanation": explanation,
+        "success": False,
+        "partial": True,
+        "error": DEADLINE_ERROR,
+    }
+    result.update({k: v for k, v in data.items() if v is not None})
+    return result
+
+
+def agent_deadline(agent: str) -> float:
+    """Seconds an agent run may take; 0 means no deadline."""
+    return settings.AGENT_DEADLINES.get(agent, 0)
+
+
+def _tool_result(content):
+    """ToolMessage content back to the tool's return value."""
+    if not isinstance(content, str):
+        return content
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content
+
+
+async def _arun_prefetch(
+    system_prompt: str, user_prompt: str, fetchers: dict, derive,
+    log: ToolLog,
+) -> str:
+    context = {}
+    async for name, result in iter_prefetch(fetchers, derive):
+        context[name] = result
+        log.add(name, result)
+    return await aanswer_with_context(system_prompt, user_prompt, context)
+
+
+# [AIMessage with tool_calls, ToolMessage, ...] for the next react run
+_handoff: ContextVar = ContextVar("react_handoff", default=None)
+
+
+@contextmanager
+def react_handoff(messages: list):
+    """Start react runs inside the block from an earlier first turn."""
+    token = _handoff.set(list(messages) or None)
+    try:
+        yield
+    finally:
+        _handoff.reset(token)
+
+
+async def _arun_react(
+    agent, user_prompt: str, recursion_limit: int, log: ToolLog
+) -> str:
+    from langchain_core.messages import ToolMessage
+
+    inputs = react_input(user_prompt)
+    handoff = _handoff.get()
+    if handoff:
+        inputs["messages"] += handoff
+        for message in handoff:
+            if isinstance(message, ToolMessage):
+                log.add(message.name, _tool_result(message.content))
+
+    answer = ""
+    async for update in agent.astream(
+        inputs,
+        config={"recursion_limit": recursion_limit},
+        stream_mode="updates",
+    ):
+        for node in update.values():
+            for message in (node or {}).get("messages", []):
+                if isinstance(message, ToolMessage):
+                    log.add(message.name, _tool_result(message.content))
+                elif not getattr(message, "tool_calls", None):
+                    answer = message.content
+    return answer
+
+
+async def run_agent(
+    agent: str, mode: str | None, system_prompt: str, user_prompt: str,
+    plan, get_agent, recursion_limit: int, log: ToolLog,
+) -> str | None:
+    """
+    Run an agent in prefetch or react mode within agent_deadline(agent).
+    plan() returns the prefetch (fetchers, derive); get_agent() the
+    LangGraph agent.
+
+    Returns the answer, or None if the deadline passed first. Tool
+    results are added to log as they arrive, so it holds whatever was
+    gathered even when the run is cut off or raises.
+
+    A deadline hit counts as an llm_health failure and a cancelled run
+    releases the breaker probe, so the caller only records the outcome
+    of a run that returned an answer or raised.
+    """
+    if agent_mode(mode) == "prefetch":
+        run = _arun_prefetch(system_prompt, user_prompt, *plan(), log)
+    else:
+        run = _arun_react(get_agent(), user_prompt, recursion_limit, log)
+
+    seconds = agent_deadline(agent)
+    try:
+        if seconds <= 0:
+            return await run
+        return await asyncio.wait_for(run, seconds)
+    except asyncio.TimeoutError:
+        print(f"{agent} agent: deadline of {seconds}s exceeded")
+        llm_health.record_failure()
+        return None
+    except asyncio.CancelledError:
+        # The request went away (client disconnect, outer timeout):
+        # no verdict on Gemini, but let the next caller probe
+        llm_health.release_probe()
+        raise
+
+
+async def astream_agent(
+    system_prompt: str, user_prompt: str, fetchers: dict, derive, fallback,
+    extract=None,
+):
+    """
+    Streaming prefetch run. Yields (event, data) pairs:
+
+    - ("tool", {"name", "result"}) as each tool result is ready
+    - ("token", {"text"}) for each chunk of the LLM explanation
+    - ("answer", {"explanation", "success", ...}) once at the end
+
+    fallback(error) is awaited for the answer if Gemini is backing off
+    or fails mid-stream; tool results are still sent either way.
+    extract(log) adds the agent's structured results to the answer.
+    """
+    context = {}
+    log = ToolLog()
+    async for name, result in iter_prefetch(fetchers, derive):
+        context[name] = result
+        log.add(name, result)
+        yield "tool", {"name": name, "result": result}
+    structured = extract(log) if extract is not None else {}
+
+    if not llm_health.allow_request():
+        yield "answer", {**await fallback(BACKOFF_ERROR), **structured}
+        return
+
+    chunks = []
+    settled = False
+    try:
+        async for chunk in get_answer_llm().astream(
+            prefetch_messages(system_prompt, user_prompt, context)
+        ):
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield "token", {"text": chunk.content}
+        llm_health.record_success()
+        settled = True
+    except Exception as e:
+        print(f"Streaming answer error: {e}")
+        llm_health.record_failure()
+        settled = True
+        yield "answer", {**await fallback(str(e)), **structured}
+        return
+    finally:
+        # Client gone mid-stream (generator closed or cancelled)
+        if not settled:
+            llm_health.release_probe()
+    yield "answer", {
+        "explanation": "".join(chunks), "success": True, **structured,
+    }
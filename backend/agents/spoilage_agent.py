@@ -5,20 +5,51 @@ Checks remaining shelf life using weather-aware calculations
 and alerts on heatwave risks.
 """
 
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 
-from backend.tools.spoilage import check_spoilage_with_weather
-from backend.tools.weather import detect_heatwave_risk
-from backend.tools.explanation import generate_explanation_safe
+from backend.tools.spoilage import (
+    check_spoilage_with_weather,
+    acheck_spoilage_with_weather,
+)
+from backend.tools.weather import detect_heatwave_risk, adetect_heatwave_risk
+from backend.tools.explanation import (
+    generate_explanation_safe,
+    agenerate_explanation_safe,
+    quick_explanation,
+)
+from backend.config.llm_health import llm_health
+from backend.config.llm_factory import chat_model
+from backend.config.llm_gateway import (
+    PRIORITY_HIGH,
+    PRIORITY_URGENT,
+    llm_site,
+    raise_priority,
+)
+from backend.agents.runner import (
+    BACKOFF_ERROR,
+    ToolLog,
+    agent_mode,
+    astream_agent,
+    completed,
+    partial_result,
+    react_input,
+    run_agent,
+    run_sync,
+)
 
 
 # ─── Tool Wrappers ────────────────────────────────────────────
 
-@tool
-def check_crop_spoilage(
+def _escalate_red_risk(result: dict) -> dict:
+    """A crop already at red risk jumps the Gemini queue for the rest
+    of this check (see llm_gateway priorities)."""
+    if isinstance(result, dict) and result.get("color") == "red":
+        raise_priority(PRIORITY_URGENT)
+    return result
+
+
+def _check_crop_spoilage(
     crop: str,
     storage_method: str,
     hours_since_harvest: float,
@@ -30,19 +61,46 @@ def check_crop_spoilage(
     the location. Returns remaining_hours, risk_level
     (low/medium/high), color (green/yellow/red), and
     spoilage percentage."""
-    return check_spoilage_with_weather(
+    return _escalate_red_risk(check_spoilage_with_weather(
         crop, storage_method, hours_since_harvest, lat, lng
-    )
+    ))
+
+
+async def _acheck_crop_spoilage(
+    crop: str,
+    storage_method: str,
+    hours_since_harvest: float,
+    lat: float,
+    lng: float,
+) -> dict:
+    return _escalate_red_risk(await acheck_spoilage_with_weather(
+        crop, storage_method, hours_since_harvest, lat, lng
+    ))
 
 
-@tool
-def check_heatwave(lat: float, lng: float) -> dict:
+check_crop_spoilage = StructuredTool.from_function(
+    func=_check_crop_spoilage,
+    coroutine=_acheck_crop_spoilage,
+    name="check_crop_spoilage",
+)
+
+
+def _check_heatwave(lat: float, lng: float) -> dict:
     """Check if a heatwave is expected in the next 24 hours.
     Returns alert status (true/false) and projected max
     temperature. Important for spoilage acceleration."""
     return detect_heatwave_risk(lat, lng)
 
 
+async def _acheck_heatwave(lat: float, lng: float) -> dict:
+    return await adetect_heatwave_risk(lat, lng)
+
+
+check_heatwave = StructuredTool.from_function(
+    func=_check_heatwave, coroutine=_acheck_heatwave, name="check_heatwave"
+)
+
+
 # ─── System Prompt ────────────────────────────────────────────
 
 SPOILAGE_SYSTEM_PROMPT = """You are AgriChain's Spoilage Timer Agent for Indian farmers.
@@ -70,27 +128,89 @@ RULES:
 
 # ─── Agent Singleton ──────────────────────────────────────────
 
+SPOILAGE_TOOLS = [check_crop_spoilage, check_heatwave]
+
 _spoilage_agent = None
 
 
 def get_spoilage_agent():
     global _spoilage_agent
     if _spoilage_agent is None:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.3,
-            google_api_key=os.getenv("GOOGLE_API_KEY", ""),
-        )
+        llm = chat_model(temperature=0.3)
         _spoilage_agent = create_react_agent(
             llm,
-            [check_crop_spoilage, check_heatwave],
-            prompt=SPOILAGE_SYSTEM_PROMPT,
+            SPOILAGE_TOOLS,
+            state_modifier=SPOILAGE_SYSTEM_PROMPT,
         )
     return _spoilage_agent
 
 
-# ─── Public Run Function ─────────────────────────────────────
+# ─── Public Run Functions ────────────────────────────────────
+
+def _fallback_result(crop: str, language: str, error: str) -> dict:
+    fallback = generate_explanation_safe(
+        {"crop": crop, "remaining_hours": 24}, language, "spoilage"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
+
+
+async def _afallback_result(crop: str, language: str, error: str) -> dict:
+    fallback = await agenerate_explanation_safe(
+        {"crop": crop, "remaining_hours": 24}, language, "spoilage"
+    )
+    return {"explanation": fallback, "success": False, "error": error}
+
+
+def _structured(log: ToolLog) -> dict:
+    """The exact spoilage check and heatwave outlook from a run's tools
+    (prefetch or agent tool names)."""
+    structured = {
+        "spoilage": completed(
+            log.latest("crop_spoilage", "check_crop_spoilage")
+        ),
+        "heatwave": completed(log.latest("heatwave", "check_heatwave")),
+    }
+    return {k: v for k, v in structured.items() if v is not None}
+
+
+def _partial_result(crop: str, language: str, log: ToolLog) -> dict:
+    """A run past its deadline: the spoilage check, if it finished."""
+    structured = _structured(log)
+    spoilage = structured.get("spoilage")
+    remaining = spoilage["remaining_hours"] if spoilage else 24
+    explanation = quick_explanation(
+        {"crop": crop, "remaining_hours": remaining}, language, "spoilage"
+    )
+    return partial_result(explanation, **structured)
+
+
+def _prefetch_plan(
+    crop: str, storage_method: str, hours_since_harvest: float,
+    lat: float, lng: float,
+) -> tuple:
+    fetchers = {
+        "crop_spoilage": _acheck_crop_spoilage(
+            crop, storage_method, hours_since_harvest, lat, lng
+        ),
+        "heatwave": adetect_heatwave_risk(lat, lng),
+    }
+    return fetchers, None
+
+
+def _user_prompt(
+    crop: str, storage_method: str, hours_since_harvest: float,
+    lat: float, lng: float, language: str,
+) -> str:
+    return (
+        f"The farmer harvested {crop} about "
+        f"{hours_since_harvest} hours ago. "
+        f"Storage: {storage_method}. "
+        f"Location: lat={lat}, lng={lng}. "
+        f"How long will it stay fresh? Respond in {language}."
+    )
+
 
+@llm_site("spoilage", PRIORITY_HIGH)
 def run_spoilage_agent(
     crop: str,
     storage_method: str,
@@ -98,30 +218,103 @@ def run_spoilage_agent(
     lat: float,
     lng: float,
     language: str = "hindi",
+    mode: str | None = None,
 ) -> dict:
+    if agent_mode(mode) == "prefetch":
+        return run_sync(arun_spoilage_agent(
+            crop, storage_method, hours_since_harvest, lat, lng, language,
+            mode="prefetch",
+        ))
+    if not llm_health.allow_request():
+        return _fallback_result(crop, language, BACKOFF_ERROR)
     try:
         agent = get_spoilage_agent()
-        user_msg = (
-            f"The farmer harvested {crop} about "
-            f"{hours_since_harvest} hours ago. "
-            f"Storage: {storage_method}. "
-            f"Location: lat={lat}, lng={lng}. "
-            f"How long will it stay fresh? Respond in {language}."
-        )
         result = agent.invoke(
-            {"messages": [{"role": "user", "content": user_msg}]},
+            react_input(_user_prompt(
+                crop, storage_method, hours_since_harvest, lat, lng, language
+            )),
             config={"recursion_limit": 8},
         )
+        llm_health.record_success()
         return {
             "explanation": result["messages"][-1].content,
             "success": True,
+            **_structured(ToolLog.from_messages(result["messages"])),
         }
     except Exception as e:
         print(f"Spoilage agent error: {e}")
-        fallback = generate_explanation_safe(
-            {"crop": crop, "remaining_hours": 24}, language, "spoilage"
+        llm_health.record_failure()
+        return _fallback_result(crop, language, str(e))
+
+
+@llm_site("spoilage", PRIORITY_HIGH)
+async def arun_spoilage_agent(
+    crop: str,
+    storage_method: str,
+    hours_since_harvest: float,
+    lat: float,
+    lng: float,
+    language: str = "hindi",
+    mode: str | None = None,
+) -> dict:
+    """
+    Async run_spoilage_agent — awaits the agent without blocking the loop.
+    In prefetch mode both tools run up front and Gemini answers in one
+    turn; in react mode the LangGraph agent drives the tools. The
+    result carries the exact "spoilage" check and "heatwave" outlook.
+    Past AGENT_DEADLINES["spoilage"] it returns a partial result with
+    whichever of them it already has.
+    """
+    if not llm_health.allow_request():
+        return await _afallback_result(crop, language, BACKOFF_ERROR)
+    user_prompt = _user_prompt(
+        crop, storage_method, hours_since_harvest, lat, lng, language
+    )
+    log = ToolLog()
+    try:
+        final_message = await run_agent(
+            "spoilage", mode, SPOILAGE_SYSTEM_PROMPT, user_prompt,
+            lambda: _prefetch_plan(
+                crop, storage_method, hours_since_harvest, lat, lng
+            ),
+            get_spoilage_agent, recursion_limit=8, log=log,
         )
-        return {"explanation": fallback, "success": False, "error": str(e)}
+        if final_message is None:
+            return _partial_result(crop, language, log)
+        llm_health.record_success()
+        return {
+            "explanation": final_message, "success": True,
+            **_structured(log),
+        }
+    except Exception as e:
+        print(f"Spoilage agent error: {e}")
+        llm_health.record_failure()
+        return {
+            **await _afallback_result(crop, language, str(e)),
+            **_structured(log),
+        }
+
+
+@llm_site("spoilage", PRIORITY_HIGH)
+async def astream_spoilage_agent(
+    crop: str,
+    storage_method: str,
+    hours_since_harvest: float,
+    lat: float,
+    lng: float,
+    language: str = "hindi",
+):
+    """Streaming prefetch run; yields runner.astream_agent events."""
+    async for event in astream_agent(
+        SPOILAGE_SYSTEM_PROMPT,
+        _user_prompt(
+            crop, storage_method, hours_since_harvest, lat, lng, language
+        ),
+        *_prefetch_plan(crop, storage_method, hours_since_harvest, lat, lng),
+        fallback=lambda error: _afallback_result(crop, language, error),
+        extract=_structured,
+    ):
+        yield event
 
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+"""
+cache.py — Cache introspection endpoints for operators.
+
+Shows per-namespace sizes, hit/miss/eviction counters and
+age-at-hit histograms for agent_cache and explanation_cache, plus
+the tool memo counters, and lets operators drop a single namespace.
+"""
+
+from fastapi import APIRouter, HTTPException
+
+from backend.config.cache import agent_cache, explanation_cache
+from backend.config.settings import settings
+from backend.tools.memo import memo_stats
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+
+@router.get("/stats")
+async def cache_stats():
+    """Per-namespace agent cache statistics and tool memo counters."""
+    return {
+        "success": True,
+        "data": {
+            "agent_cache": agent_cache.stats(),
+            "explanation_cache": explanation_cache.stats(),
+            "tool_memo": memo_stats(),
+        },
+    }
+
+
+@router.delete("/{namespace}")
+async def clear_cache_namespace(namespace: str):
+    """Clear one namespace (e.g. "market") from both cache tiers."""
+    known = set(agent_cache.stats()["namespaces"]) | set(settings.CACHE_NAMESPACE_TTLS)
+    if namespace not in known:
+        raise HTTPException(404, f"Unknown cache namespace: {namespace}")
+    removed = agent_cache.clear_namespace(namespace)
+    return {"success": True, "namespace": namespace, "removed": removed}
+
+
+@router.delete("/")
+async def clear_cache():
+    """Clear the whole agent cache."""
+    agent_cache.clear()
+    return {"success": True}
@@ -0,0 +1,124 @@
+"""
+caching.py — Shared cache-aside flow for the agent endpoints.
+
+Checks agent_cache first; on a miss the endpoint's compute function
+runs through single-flight, so concurrent identical requests wait on
+one agent run instead of each starting their own Gemini ReAct loop.
+
+With a stale grace window, an expired entry is still returned right
+away while a background task refreshes it.
+
+Fallback responses (the agent failed, e.g. Gemini is down) are cached
+too, but only for NEGATIVE_CACHE_TTL seconds and without grace, so a
+burst of retries does not hit a failing Gemini again and again.
+
+Responses are sent as the cache's pre-serialized JSON bytes (gzip'd
+bytes for clients that accept them), with an X-Cache header of HIT,
+STALE, MISS or SHARED (joined an in-flight computation).
+"""
+
+import asyncio
+import time
+
+from fastapi import Request, Response
+
+from backend.config.cache import CachedBody, agent_cache, encode_body
+from backend.config.settings import settings
+from backend.config.singleflight import agent_flight
+from backend.config.stats import stats
+
+# Strong references so background refreshes are not garbage collected
+_background_tasks: set = set()
+
+
+def cached_response(
+    request: Request, body: CachedBody, status: str, age: float = 0
+) -> Response:
+    """Build a raw-bytes JSON response from a cached body."""
+    headers = {"X-Cache": status, "Age": str(int(age)), "Vary": "Accept-Encoding"}
+    accepts_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    if body.gzip_body is not None and accepts_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(body.gzip_body, media_type="application/json", headers=headers)
+    return Response(body.body, media_type="application/json", headers=headers)
+
+
+async def serve_cached(
+    request: Request,
+    agent: str,
+    cache_key: str,
+    compute,
+    refresh=None,
+    grace_seconds: float = 0,
+) -> Response:
+    """
+    Return the cached response for cache_key, or compute it once.
+
+    compute is a zero-arg callable returning an awaitable that
+    resolves to the response dict. Only the request that actually
+    ran compute() stores the result in the cache.
+
+    If grace_seconds > 0, entries past their TTL are served as stale
+    for that long while refresh() (defaults to compute) recomputes
+    them in the background.
+    """
+
+    def _store(response: dict) -> CachedBody:
+        return store_response(cache_key, response, grace_seconds)
+
+    found = agent_cache.get_entry(cache_key)
+    if found is not None:
+        body, stored_at, is_stale = found
+        if not is_stale or grace_seconds > 0:
+            stats.record(agent, success=True, cached=True, stale=is_stale)
+            if is_stale:
+                _schedule_refresh(agent, cache_key, refresh or compute, _store)
+            return cached_response(
+                request, body, "STALE" if is_stale else "HIT",
+                age=time.time() - stored_at,
+            )
+
+    async def _compute_and_store():
+        return _store(await compute())
+
+    body, shared = await agent_flight.do(cache_key, _compute_and_store)
+    stats.record(agent, success=True, coalesced=shared)
+    return cached_response(request, body, "SHARED" if shared else "MISS")
+
+
+def store_response(
+    cache_key: str, response: dict, grace_seconds: float = 0
+) -> CachedBody:
+    """Cache an endpoint response; fallbacks only briefly."""
+    if response.get("fallback"):
+        # Negative entry: absorb retries briefly, never serve stale
+        return agent_cache.set(
+            cache_key, response, ttl=settings.NEGATIVE_CACHE_TTL
+        )
+    return agent_cache.set(cache_key, response, grace=grace_seconds)
+
+
+def _schedule_refresh(agent: str, cache_key: str, refresh, store):
+    """
+    Recompute a stale entry in the background (once per key). Like
+    serve_cached's compute it resolves to a CachedBody, since a miss on
+    the same key may join this flight.
+    """
+
+    async def _refresh_and_store() -> CachedBody:
+        response = await refresh()
+        if response.get("fallback"):
+            # Keep serving the last good answer rather than a fallback;
+            # a joined miss still gets the fallback, uncached
+            return encode_body(response)
+        return store(response)
+
+    async def _run():
+        try:
+            await agent_flight.do(cache_key, _refresh_and_store)
+        except Exception as e:
+            print(f"{agent.capitalize()} background refresh failed: {e}")
+
+    task = asyncio.ensure_future(_run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
 
 from backend.models.database import get_db
-from backend.config.cache import agent_cache
+from backend.config.cache_keys import build_cache_key
 from backend.config.stats import stats
+from backend.api.caching import serve_cached
+from backend.api.streaming import stream_agent
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -22,45 +24,67 @@ class ChatRequest(BaseModel):
     storage_method: Optional[str] = "open_floor"
     hours_since_harvest: Optional[float] = 0
     current_temp_c: Optional[float] = 35
+    # "prefetch" (tools up front, one LLM turn) or "react" (LangGraph
+    # tool loop); defaults to settings.AGENT_MODE
+    agent_mode: Optional[str] = None
 
 
-@router.post("/")
-async def chat(req: ChatRequest):
-    """Chat with AgriChain orchestrator — routes to appropriate agent (cached)."""
-    cache_key = agent_cache.make_key("chat", req.message, req.crop)
-    cached = agent_cache.get(cache_key)
-    if cached:
-        stats.record("chat", success=True, cached=True)
-        cached["cached"] = True
-        return cached
+def _user_data(req: ChatRequest) -> dict:
+    return {
+        "crop": req.crop or "tomato",
+        "lat": req.lat or 21.1458,
+        "lng": req.lng or 79.0882,
+        "soil_type": req.soil_type or "black",
+        "district": req.district or "Nagpur",
+        "language": req.language or "hindi",
+        "volume_kg": req.volume_kg or 500,
+        "storage_method": req.storage_method or "open_floor",
+        "hours_since_harvest": req.hours_since_harvest or 0,
+        "current_temp_c": req.current_temp_c or 35,
+        "agent_mode": req.agent_mode,
+    }
 
-    try:
-        from backend.orchestrator.router import orchestrate
-        from backend.orchestrator.formatter import format_response
-
-        user_data = {
-            "crop": req.crop or "tomato",
-            "lat": req.lat or 21.1458,
-            "lng": req.lng or 79.0882,
-            "soil_type": req.soil_type or "black",
-            "district": req.district or "Nagpur",
-            "language": req.language or "hindi",
-            "volume_kg": req.volume_kg or 500,
-            "storage_method": req.storage_method or "open_floor",
-            "hours_since_harvest": req.hours_since_harvest or 0,
-            "current_temp_c": req.current_temp_c or 35,
-        }
 
-        orch_result = orchestrate(req.message, user_data)
+def _chat_payload(orch_result: dict, user_data: dict) -> dict:
+    from backend.orchestrator.formatter import (
+        format_multi_response,
+        format_response,
+    )
+
+    if orch_result.get("parts"):
+        formatted = format_multi_response(orch_result["parts"], user_data)
+    else:
         formatted = format_response(
-            orch_result["intent"], orch_result["response"], user_data
+            orch_result["intent"], orch_result["response"], user_data,
+            structured=orch_result.get("structured"),
         )
-        formatted["data"]["intent"] = orch_result["intent"]
-        formatted["data"]["agent_used"] = orch_result["agent_used"]
+    formatted["data"]["intent"] = orch_result["intent"]
+    formatted["data"]["agent_used"] = orch_result["agent_used"]
+    if not orch_result["success"]:
+        formatted["fallback"] = True
+    if orch_result.get("partial"):
+        formatted["partial"] = True
+    return formatted
+
 
-        agent_cache.set(cache_key, formatted)
-        stats.record("chat", success=True)
-        return formatted
+async def build_chat_response(req: ChatRequest) -> dict:
+    """Detect intent, run the matching agent and format its answer."""
+    from backend.orchestrator.router import aorchestrate
+
+    user_data = _user_data(req)
+    orch_result = await aorchestrate(req.message, user_data)
+    return _chat_payload(orch_result, user_data)
+
+
+@router.post("/")
+async def chat(req: ChatRequest, request: Request):
+    """Chat with AgriChain orchestrator — routes to appropriate agent (cached, coalesced)."""
+    cache_key = build_cache_key("chat", req.model_dump())
+    try:
+        return await serve_cached(
+            request, "chat", cache_key,
+            lambda: build_chat_response(req),
+        )
     except Exception as e:
         print(f"Chat endpoint error: {e}")
         stats.record("chat", success=False)
@@ -73,3 +97,39 @@ async def chat(req: ChatRequest):
             },
             "fallback": True,
         }
+
+
+@router.post("/stream")
+async def chat_stream(req: ChatRequest):
+    """Stream intent, tool results and the answer as server-sent events."""
+    from backend.orchestrator.router import astream_orchestrate
+
+    # A stream is a prefetch run whatever agent_mode asks for
+    user_data = {**_user_data(req), "agent_mode": "prefetch"}
+    routed = {"intent": "HARVEST", "agent_used": "harvest"}
+
+    async def events():
+        async for event, data in astream_orchestrate(req.message, user_data):
+            if event == "intent":
+                routed.update(data)
+            yield event, data
+
+    def finalize(answer: dict, tools: dict, db) -> dict:
+        from backend.orchestrator.formatter import structured_fields
+
+        if answer.get("parts"):
+            # A compound question: the answer is the whole result
+            return _chat_payload(answer, user_data)
+        orch_result = {
+            **routed,
+            "response": answer.get("explanation", ""),
+            "success": answer.get("success", True),
+            "structured": structured_fields(routed["intent"], answer),
+        }
+        return _chat_payload(orch_result, user_data)
+
+    return stream_agent(
+        "chat",
+        build_cache_key("chat", {**req.model_dump(), "agent_mode": "prefetch"}),
+        events(), finalize,
+    )
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
 
 from backend.models.database import get_db, AdviceHistory, generate_uuid
-from backend.config.cache import agent_cache
+from backend.config.cache_keys import build_cache_key
+from backend.config.settings import settings
 from backend.config.stats import stats
+from backend.api.caching import serve_cached
+from backend.api.streaming import stream_agent
 
 router = APIRouter(prefix="/harvest", tags=["harvest"])
 
+# How long an expired cached answer may still be served (marked stale)
+# while a background task refreshes it. 0 disables stale-while-revalidate.
+STALE_GRACE_SECONDS = 600
+
 FALLBACK_RESPONSE = {
     "score": 78,
     "color": "yellow",
@@ -28,50 +35,142 @@ class HarvestScoreRequest(BaseModel):
     soil_type: Optional[str] = None
     district: Optional[str] = None
     language: Optional[str] = "hindi"
+    # "fast" = direct scoring pipeline, "agent" = Gemini ReAct loop;
+    # defaults to settings.HARVEST_SCORING_MODE
+    mode: Optional[str] = None
+    # Fast mode only: write the explanation with one LLM call
+    narrate: Optional[bool] = True
+    # Agent mode only: "prefetch" (tools up front, one LLM turn) or
+    # "react" (LangGraph tool loop); defaults to settings.AGENT_MODE
+    agent_mode: Optional[str] = None
 
 
-@router.post("/score")
-async def harvest_score(req: HarvestScoreRequest, db: Session = Depends(get_db)):
-    """Calculate harvest score using AI agent (cached)."""
-    # Check cache
-    cache_key = agent_cache.make_key("harvest", req.crop, req.lat, req.soil_type)
-    cached = agent_cache.get(cache_key)
-    if cached:
-        stats.record("harvest", success=True, cached=True)
-        cached["cached"] = True
-        return cached
+def _scoring_mode(req: HarvestScoreRequest) -> str:
+    mode = (req.mode or settings.HARVEST_SCORING_MODE).lower()
+    return mode if mode in ("fast", "agent") else "agent"
+
+
+def harvest_cache_key(req: HarvestScoreRequest) -> str:
+    mode = _scoring_mode(req)
+    # Fast mode runs no agent: one entry whatever agent_mode says
+    agent_mode = req.agent_mode if mode == "agent" else "prefetch"
+    return build_cache_key(
+        "harvest",
+        {**req.model_dump(), "mode": mode, "agent_mode": agent_mode},
+    )
+
+
+def harvest_stream_cache_key(req: HarvestScoreRequest) -> str:
+    """A stream is a prefetch agent run whatever mode the request asks for."""
+    return harvest_cache_key(
+        req.model_copy(update={"mode": "agent", "agent_mode": "prefetch"})
+    )
+
+
+async def build_harvest_response(
+    req: HarvestScoreRequest, db: Optional[Session] = None
+) -> dict:
+    """
+    Run the harvest agent, format its answer and log the advice.
+    Background refreshes pass db=None and skip the advice log.
+    """
+    from backend.agents.harvest_agent import (
+        arun_harvest_agent,
+        afast_harvest_score,
+    )
+
+    kwargs = _agent_kwargs(req)
+    if _scoring_mode(req) == "fast":
+        kwargs.pop("district")
+        result = await afast_harvest_score(
+            **kwargs, narrate=req.narrate is not False
+        )
+    else:
+        result = await arun_harvest_agent(**kwargs, mode=req.agent_mode)
+    return _harvest_payload(req, result, db)
+
+
+def _agent_kwargs(req: HarvestScoreRequest) -> dict:
+    return dict(
+        crop=req.crop,
+        lat=req.lat or 21.1458,
+        lng=req.lng or 79.0882,
+        soil_type=req.soil_type or "black",
+        district=req.district or "Nagpur",
+        language=req.language or "hindi",
+    )
+
+
+def _harvest_payload(
+    req: HarvestScoreRequest, result: dict, db: Optional[Session] = None
+) -> dict:
+    from backend.orchestrator.formatter import format_harvest_response
 
+    formatted = format_harvest_response(
+        result["explanation"], req.model_dump(), score=result.get("score")
+    )
+
+    if db is not None:
+        _log_advice(db, result["explanation"])
+
+    response = {"success": True, "data": formatted}
+    if not result.get("success", True):
+        response["fallback"] = True
+    if result.get("partial"):
+        response["partial"] = True
+    return response
+
+
+def _log_advice(db: Session, explanation: str):
     try:
-        from backend.agents.harvest_agent import run_harvest_agent
-        from backend.orchestrator.formatter import format_harvest_response
-
-        result = run_harvest_agent(
-            crop=req.crop,
-            lat=req.lat or 21.1458,
-            lng=req.lng or 79.0882,
-            soil_type=req.soil_type or "black",
-            district=req.district or "Nagpur",
-            language=req.language or "hindi",
+        entry = AdviceHistory(
+            id=generate_uuid(), user_id="demo-user",
+            type="harvest", recommendation=explanation[:500],
+            savings_rupees=500,
+        )
+        db.add(entry)
+        db.commit()
+    except Exception:
+        db.rollback()
+
+
+@router.post("/score")
+async def harvest_score(
+    req: HarvestScoreRequest, request: Request, db: Session = Depends(get_db)
+):
+    """Calculate harvest score using AI agent or fast pipeline (cached, coalesced)."""
+    cache_key = harvest_cache_key(req)
+    try:
+        return await serve_cached(
+            request, "harvest", cache_key,
+            compute=lambda: build_harvest_response(req, db),
+            refresh=lambda: build_harvest_response(req),
+            grace_seconds=STALE_GRACE_SECONDS,
         )
-        formatted = format_harvest_response(result["explanation"], req.model_dump())
-
-        # Log advice
-        try:
-            entry = AdviceHistory(
-                id=generate_uuid(), user_id="demo-user",
-                type="harvest", recommendation=result["explanation"][:500],
-                savings_rupees=500,
-            )
-            db.add(entry)
-            db.commit()
-        except Exception:
-            db.rollback()
-
-        response = {"success": True, "data": formatted}
-        agent_cache.set(cache_key, response)
-        stats.record("harvest", success=True)
-        return response
     except Exception as e:
         print(f"Harvest endpoint fallback: {e}")
         stats.record("harvest", success=False)
         return {"success": True, "data": FALLBACK_RESPONSE, "fallback": True}
+
+
+@router.post("/score/stream")
+async def harvest_score_stream(req: HarvestScoreRequest):
+    """
+    Stream harvest scoring progress as server-sent events. The stream
+    runs the harvest agent in prefetch mode, so it shares the
+    agent/prefetch cache entry, never the fast-mode one (whose
+    explanation is narrated differently).
+    """
+    from backend.agents.harvest_agent import astream_harvest_agent
+
+    def finalize(answer: dict, tools: dict, db: Session) -> dict:
+        result = {**answer, "score": tools.get("harvest_score")}
+        return _harvest_payload(req, result, db)
+
+    return stream_agent(
+        "harvest",
+        harvest_stream_cache_key(req),
+        astream_harvest_agent(**_agent_kwargs(req)),
+        finalize=finalize,
+        grace_seconds=STALE_GRACE_SECONDS,
+    )
@@ -0,0 +1,318 @@
+"""
+jobs.py — Asynchronous job API for long-running agent requests.
+
+Instead of holding a connection open for the whole Gemini run, a
+client POSTs the usual request body to /jobs/{agent} and gets a job id
+back at once, then polls GET /jobs/{job_id} (cheap: one SQLite row)
+or fetches it again after reconnecting.
+
+- Jobs are rows in the agent_jobs table, so pending work survives a
+  restart: on startup pending jobs (and "running" jobs whose worker
+  died, see JOB_STALE_SECONDS) are queued again.
+- A bounded pool of JOB_WORKERS asyncio workers runs them.
+- An identical request (same cache key) that is already pending or
+  running returns the existing job instead of queueing a new one, and
+  a request with a fresh cached answer is done immediately.
+- Workers compute through agent_flight and store the result in
+  agent_cache, so a job and a plain request for the same data share
+  one agent run.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from backend.api.caching import store_response
+from backend.config.cache import agent_cache
+from backend.config.settings import settings
+from backend.config.singleflight import agent_flight
+from backend.config.stats import stats
+from backend.models.database import AgentJob, SessionLocal, generate_uuid
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+def _agent_specs() -> dict:
+    """agent -> (request model, cache key fn, run(req, db), grace)."""
+    from backend.config.cache_keys import build_cache_key
+    from backend.api import harvest, market, spoilage, preservation, chat
+
+    def key_for(agent):
+        return lambda req: build_cache_key(agent, req.model_dump())
+
+    return {
+        "harvest": (
+            harvest.HarvestScoreRequest, harvest.harvest_cache_key,
+            harvest.build_harvest_response, harvest.STALE_GRACE_SECONDS,
+        ),
+        "market": (
+            market.MarketCompareRequest, key_for("market"),
+            market.build_market_response, market.STALE_GRACE_SECONDS,
+        ),
+        "spoilage": (
+            spoilage.SpoilageCheckRequest, key_for("spoilage"),
+            spoilage.build_spoilage_response, spoilage.STALE_GRACE_SECONDS,
+        ),
+        "preservation": (
+            preservation.PreservationOptionsRequest, key_for("preservation"),
+            preservation.build_preservation_response,
+            preservation.STALE_GRACE_SECONDS,
+        ),
+        "chat": (
+            chat.ChatRequest, key_for("chat"),
+            lambda req, db: chat.build_chat_response(req), 0,
+        ),
+    }
+
+
+def _job_view(job: AgentJob) -> dict:
+    view = {
+        "job_id": job.id,
+        "agent": job.agent,
+        "status": job.status,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == "done" and job.result:
+        view["result"] = json.loads(job.result)
+    if job.status == "failed":
+        view["error"] = job.error
+    return view
+
+
+class JobQueue:
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list = []
+        self._submit_lock: asyncio.Lock | None = None
+        self.deduplicated = 0
+        self._specs: dict | None = None
+
+    @property
+    def specs(self) -> dict:
+        if self._specs is None:
+            self._specs = _agent_specs()
+        return self._specs
+
+    # ── Lifecycle ───────────────────────────────────────────────
+
+    async def start(self):
+        """Start the worker pool and re-queue unfinished jobs."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._submit_lock = asyncio.Lock()
+        for job_id in self._recover():
+            self._queue.put_nowait(job_id)
+        self._tasks = [
+            asyncio.ensure_future(self._worker(i)) for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _recover(self) -> list:
+        """Pending and stale running jobs to queue after a restart."""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        expired_before = now - timedelta(seconds=settings.JOB_RETENTION_SECONDS)
+        with SessionLocal() as db:
+            db.query(AgentJob).filter(
+                AgentJob.status.in_(("done", "failed")),
+                AgentJob.finished_at < expired_before,
+            ).delete(synchronize_session=False)
+            db.query(AgentJob).filter(
+                AgentJob.status == "running",
+                AgentJob.started_at < stale_before,
+            ).update({"status": "pending"}, synchronize_session=False)
+            db.commit()
+            pending = (
+                db.query(AgentJob.id)
+                .filter(AgentJob.status == "pending")
+                .order_by(AgentJob.created_at)
+                .all()
+            )
+        return [row.id for row in pending]
+
+    # ── Submit ──────────────────────────────────────────────────
+
+    async def submit(self, agent: str, payload: dict) -> tuple:
+        """
+        Validate and queue a request. Returns (job view, deduplicated).
+        Raises KeyError for an unknown agent and ValidationError for a
+        bad body.
+        """
+        model, key_fn, _run, _grace = self.specs[agent]
+        req = model(**payload)
+        cache_key = key_fn(req)
+
+        async with self._submit_lock:
+            with SessionLocal() as db:
+                existing = (
+                    db.query(AgentJob)
+                    .filter(
+                        AgentJob.dedup_key == cache_key,
+                        AgentJob.status.in_(ACTIVE_STATUSES),
+                    )
+                    .first()
+                )
+                if existing is not None:
+                    self.deduplicated += 1
+                    return _job_view(existing), True
+
+                job = AgentJob(
+                    id=generate_uuid(), agent=agent, dedup_key=cache_key,
+                    request=req.model_dump_json(), status="pending",
+                )
+                cached = agent_cache.get(cache_key)
+                if cached is not None:
+                    job.status = "done"
+                    job.result = json.dumps(cached, ensure_ascii=False)
+                    job.finished_at = datetime.utcnow()
+                    stats.record(agent, success=True, cached=True)
+                db.add(job)
+                db.commit()
+                db.refresh(job)
+                view = _job_view(job)
+
+        if view["status"] == "pending":
+            self._queue.put_nowait(view["job_id"])
+        return view, False
+
+    def get(self, job_id: str) -> dict | None:
+        with SessionLocal() as db:
+            job = db.get(AgentJob, job_id)
+            return _job_view(job) if job is not None else None
+
+    # ── Workers ─────────────────────────────────────────────────
+
+    def _claim(self, job_id: str):
+        """Atomically mark a pending job running (safe across processes)."""
+        with SessionLocal() as db:
+            claimed = (
+                db.query(AgentJob)
+                .filter(AgentJob.id == job_id, AgentJob.status == "pending")
+                .update(
+                    {
+                        "status": "running",
+                        "started_at": datetime.utcnow(),
+                        "attempts": AgentJob.attempts + 1,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(AgentJob, job_id)
+            return job.agent, job.request, job.attempts
+
+    def _finish(self, job_id: str, status: str, result=None, error=None):
+        with SessionLocal() as db:
+            db.query(AgentJob).filter(AgentJob.id == job_id).update(
+                {
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "finished_at": datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+
+    def _retry(self, job_id: str):
+        with SessionLocal() as db:
+            db.query(AgentJob).filter(AgentJob.id == job_id).update(
+                {"status": "pending"}, synchronize_session=False
+            )
+            db.commit()
+        self._queue.put_nowait(job_id)
+
+    async def _run(self, job_id: str):
+        claimed = self._claim(job_id)
+        if claimed is None:
+            return  # already taken by another worker/process
+        agent, request_json, attempts = claimed
+        model, key_fn, run, grace = self.specs[agent]
+        req = model.model_validate_json(request_json)
+        cache_key = key_fn(req)
+
+        async def _compute_and_store():
+            with SessionLocal() as db:
+                response = await run(req, db)
+            return store_response(cache_key, response, grace)
+
+        try:
+            body, _shared = await agent_flight.do(cache_key, _compute_and_store)
+            self._finish(job_id, "done", result=body.body.decode("utf-8"))
+            stats.record(agent, success=True)
+        except Exception as e:
+            print(f"Job {job_id} ({agent}) error: {e}")
+            if attempts < settings.JOB_MAX_ATTEMPTS:
+                self._retry(job_id)
+            else:
+                self._finish(job_id, "failed", error=str(e))
+                stats.record(agent, success=False)
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"Job worker {index} error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "deduplicated": self.deduplicated,
+        }
+
+
+# Global job queue — started and stopped by backend/main.py
+job_queue = JobQueue(workers=settings.JOB_WORKERS)
+
+
+# ── Endpoints ───────────────────────────────────────────────────
+
+@router.post("/{agent}", status_code=202)
+async def submit_job(agent: str, payload: dict):
+    """
+    Queue an agent request (harvest, market, spoilage, preservation or
+    chat) with the same body as its regular endpoint.
+    """
+    try:
+        view, deduplicated = await job_queue.submit(agent, payload)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown agent: {agent}")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    return JSONResponse(
+        status_code=200 if view["status"] == "done" else 202,
+        content={
+            "success": True,
+            "data": {**view, "deduplicated": deduplicated},
+        },
+    )
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Poll a job; includes "result" once status is "done"."""
+    view = job_queue.get(job_id)
+    if view is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": view}
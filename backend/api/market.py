@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
 
 from backend.models.database import get_db, AdviceHistory, generate_uuid
-from backend.config.cache import agent_cache
+from backend.config.cache_keys import build_cache_key
 from backend.config.stats import stats
+from backend.api.caching import serve_cached
+from backend.api.streaming import stream_agent
 
 router = APIRouter(prefix="/market", tags=["market"])
 
+# How long an expired cached answer may still be served (marked stale)
+# while a background task refreshes it. 0 disables stale-while-revalidate.
+STALE_GRACE_SECONDS = 600
+
 FALLBACK_RESPONSE = {
     "mandis": [
         {
@@ -30,47 +36,103 @@ class MarketCompareRequest(BaseModel):
     current_temp_c: Optional[float] = 35
     storage_method: Optional[str] = "open_floor"
     language: Optional[str] = "hindi"
+    # "prefetch" (tools up front, one LLM turn) or "react" (LangGraph
+    # tool loop); defaults to settings.AGENT_MODE
+    agent_mode: Optional[str] = None
 
 
-@router.post("/compare")
-async def market_compare(req: MarketCompareRequest, db: Session = Depends(get_db)):
-    """Compare mandis using AI agent (cached)."""
-    cache_key = agent_cache.make_key("market", req.crop, req.volume_kg, req.lat)
-    cached = agent_cache.get(cache_key)
-    if cached:
-        stats.record("market", success=True, cached=True)
-        cached["cached"] = True
-        return cached
+async def build_market_response(
+    req: MarketCompareRequest, db: Optional[Session] = None
+) -> dict:
+    """
+    Run the market agent, format its answer and log the advice.
+    Background refreshes pass db=None and skip the advice log.
+    """
+    from backend.agents.market_agent import arun_market_agent
+
+    result = await arun_market_agent(**_agent_kwargs(req))
+    return _market_payload(req, result, db)
+
+
+def _agent_kwargs(req: MarketCompareRequest) -> dict:
+    return dict(
+        crop=req.crop, volume_kg=req.volume_kg,
+        farmer_lat=req.lat or 21.1458, farmer_lng=req.lng or 79.0882,
+        current_temp_c=req.current_temp_c or 35,
+        storage_method=req.storage_method or "open_floor",
+        language=req.language or "hindi",
+        mode=req.agent_mode,
+    )
+
+
+def _market_payload(
+    req: MarketCompareRequest, result: dict, db: Optional[Session] = None
+) -> dict:
+    from backend.orchestrator.formatter import (
+        format_market_response,
+        structured_fields,
+    )
+
+    formatted = format_market_response(
+        result["explanation"], req.model_dump(),
+        **structured_fields("MARKET", result),
+    )
+
+    if db is not None:
+        _log_advice(db, result["explanation"])
+
+    response = {"success": True, "data": formatted}
+    if not result.get("success", True):
+        response["fallback"] = True
+    if result.get("partial"):
+        response["partial"] = True
+    return response
 
+
+def _log_advice(db: Session, explanation: str):
     try:
-        from backend.agents.market_agent import run_market_agent
-        from backend.orchestrator.formatter import format_market_response
-
-        result = run_market_agent(
-            crop=req.crop, volume_kg=req.volume_kg,
-            farmer_lat=req.lat or 21.1458, farmer_lng=req.lng or 79.0882,
-            current_temp_c=req.current_temp_c or 35,
-            storage_method=req.storage_method or "open_floor",
-            language=req.language or "hindi",
+        entry = AdviceHistory(
+            id=generate_uuid(), user_id="demo-user",
+            type="market", recommendation=explanation[:500],
+            savings_rupees=800,
+        )
+        db.add(entry)
+        db.commit()
+    except Exception:
+        db.rollback()
+
+
+@router.post("/compare")
+async def market_compare(
+    req: MarketCompareRequest, request: Request, db: Session = Depends(get_db)
+):
+    """Compare mandis using AI agent (cached, coalesced)."""
+    cache_key = build_cache_key("market", req.model_dump())
+    try:
+        return await serve_cached(
+            request, "market", cache_key,
+            compute=lambda: build_market_response(req, db),
+            refresh=lambda: build_market_response(req),
+            grace_seconds=STALE_GRACE_SECONDS,
         )
-        formatted = format_market_response(result["explanation"], req.model_dump())
-
-        try:
-            entry = AdviceHistory(
-                id=generate_uuid(), user_id="demo-user",
-                type="market", recommendation=result["explanation"][:500],
-                savings_rupees=800,
-            )
-            db.add(entry)
-            db.commit()
-        except Exception:
-            db.rollback()
-
-        response = {"success": True, "data": formatted}
-        agent_cache.set(cache_key, response)
-        stats.record("market", success=True)
-        return response
     except Exception as e:
         print(f"Market endpoint fallback: {e}")
         stats.record("market", success=False)
         return {"success": True, "data": FALLBACK_RESPONSE, "fallback": True}
+
+
+@router.post("/compare/stream")
+async def market_compare_stream(req: MarketCompareRequest):
+    """Stream mandi comparison progress as server-sent events."""
+    from backend.agents.market_agent import astream_market_agent
+
+    # A stream is a prefetch run whatever agent_mode asks for
+    kwargs = _agent_kwargs(req)
+    kwargs.pop("mode")
+    return stream_agent(
+        "market",
+        build_cache_key("market", {**req.model_dump(), "agent_mode": "prefetch"}),
+        astream_market_agent(**kwargs),
+        finalize=lambda answer, tools, db: _market_payload(req, answer, db),
+        grace_seconds=STALE_GRACE_SECONDS,
+    )
@@ -1,6 +1,7 @@
 import datetime
 
 from fastapi import APIRouter, Query, Depends
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from backend.models.database import get_db, AdviceHistory, Notification, User
@@ -259,3 +260,18 @@ async def get_notifications(db: Session = Depends(get_db)):
 async def health_check():
     """Health check endpoint."""
     return {"status": "ok", "version": "1.0.0"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the startup warm-up has finished,
+    and for good if a required warm-up step (e.g. an agent build) failed."""
+    from backend.config.warmup import warmup
+
+    if not warmup.ready:
+        status = "warming_up" if warmup.state != "done" else "unhealthy"
+        return JSONResponse(
+            status_code=503,
+            content={"status": status, "warmup": warmup.status()},
+        )
+    return {"status": "ready", "warmup": warmup.status()}
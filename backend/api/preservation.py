@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
 
 from backend.models.database import get_db, AdviceHistory, generate_uuid
-from backend.config.cache import agent_cache
+from backend.config.cache_keys import build_cache_key
 from backend.config.stats import stats
+from backend.api.caching import serve_cached
+from backend.api.streaming import stream_agent
 
 router = APIRouter(prefix="/preservation", tags=["preservation"])
 
+# How long an expired cached answer may still be served (marked stale)
+# while a background task refreshes it. 0 disables stale-while-revalidate.
+STALE_GRACE_SECONDS = 3600
+
 FALLBACK_RESPONSE = {
     "methods": [
         {
@@ -26,48 +32,106 @@ class PreservationOptionsRequest(BaseModel):
     current_storage: str = "open_floor"
     temp_c: Optional[float] = 35
     language: Optional[str] = "hindi"
+    # "prefetch" (tools up front, one LLM turn) or "react" (LangGraph
+    # tool loop); defaults to settings.AGENT_MODE
+    agent_mode: Optional[str] = None
+
+
+async def build_preservation_response(
+    req: PreservationOptionsRequest, db: Optional[Session] = None
+) -> dict:
+    """
+    Run the preservation agent, format its answer and log the advice.
+    Background refreshes pass db=None and skip the advice log.
+    """
+    from backend.agents.preservation_agent import arun_preservation_agent
+
+    result = await arun_preservation_agent(**_agent_kwargs(req))
+    return _preservation_payload(req, result, db)
+
+
+def _agent_kwargs(req: PreservationOptionsRequest) -> dict:
+    return dict(
+        crop=req.crop, current_storage=req.current_storage,
+        temp_c=req.temp_c or 35, language=req.language or "hindi",
+        mode=req.agent_mode,
+    )
+
+
+def _preservation_payload(
+    req: PreservationOptionsRequest, result: dict, db: Optional[Session] = None
+) -> dict:
+    from backend.orchestrator.formatter import (
+        format_preservation_response,
+        structured_fields,
+    )
+
+    formatted = format_preservation_response(
+        result["explanation"], req.model_dump(),
+        **structured_fields("PRESERVATION", result),
+    )
+
+    if db is not None:
+        _log_advice(db, result["explanation"])
+
+    response = {"success": True, "data": formatted}
+    if not result.get("success", True):
+        response["fallback"] = True
+    if result.get("partial"):
+        response["partial"] = True
+    return response
+
+
+def _log_advice(db: Session, explanation: str):
+    try:
+        entry = AdviceHistory(
+            id=generate_uuid(), user_id="demo-user",
+            type="preservation", recommendation=explanation[:500],
+            savings_rupees=500,
+        )
+        db.add(entry)
+        db.commit()
+    except Exception:
+        db.rollback()
 
 
 @router.post("/options")
 async def preservation_options(
-    req: PreservationOptionsRequest, db: Session = Depends(get_db)
+    req: PreservationOptionsRequest,
+    request: Request,
+    db: Session = Depends(get_db),
 ):
-    """Get preservation options using AI agent (cached)."""
-    cache_key = agent_cache.make_key("preservation", req.crop, req.current_storage)
-    cached = agent_cache.get(cache_key)
-    if cached:
-        stats.record("preservation", success=True, cached=True)
-        cached["cached"] = True
-        return cached
-
+    """Get preservation options using AI agent (cached, coalesced)."""
+    cache_key = build_cache_key("preservation", req.model_dump())
     try:
-        from backend.agents.preservation_agent import run_preservation_agent
-        from backend.orchestrator.formatter import format_preservation_response
-
-        result = run_preservation_agent(
-            crop=req.crop, current_storage=req.current_storage,
-            temp_c=req.temp_c or 35, language=req.language or "hindi",
+        return await serve_cached(
+            request, "preservation", cache_key,
+            compute=lambda: build_preservation_response(req, db),
+            refresh=lambda: build_preservation_response(req),
+            grace_seconds=STALE_GRACE_SECONDS,
         )
-        formatted = format_preservation_response(
-            result["explanation"], req.model_dump()
-        )
-
-        try:
-            entry = AdviceHistory(
-                id=generate_uuid(), user_id="demo-user",
-                type="preservation", recommendation=result["explanation"][:500],
-                savings_rupees=500,
-            )
-            db.add(entry)
-            db.commit()
-        except Exception:
-            db.rollback()
-
-        response = {"success": True, "data": formatted}
-        agent_cache.set(cache_key, response)
-        stats.record("preservation", success=True)
-        return response
     except Exception as e:
         print(f"Preservation endpoint fallback: {e}")
         stats.record("preservation", success=False)
         return {"success": True, "data": FALLBACK_RESPONSE, "fallback": True}
+
+
+@router.post("/options/stream")
+async def preservation_options_stream(req: PreservationOptionsRequest):
+    """Stream preservation advice progress as server-sent events."""
+    from backend.agents.preservation_agent import astream_preservation_agent
+
+    # A stream is a prefetch run whatever agent_mode asks for
+    kwargs = _agent_kwargs(req)
+    kwargs.pop("mode")
+    return stream_agent(
+        "preservation",
+        build_cache_key(
+            "preservation", {**req.model_dump(), "agent_mode": "prefetch"}
+        ),
+        astream_preservation_agent(**kwargs),
+        finalize=lambda answer, tools, db: _preservation_payload(
+            req, answer, db
+        ),
+        grace_seconds=STALE_GRACE_SECONDS,
+    )
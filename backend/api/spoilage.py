@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
 
 from backend.models.database import get_db, AdviceHistory, generate_uuid
-from backend.config.cache import agent_cache
+from backend.config.cache_keys import build_cache_key
 from backend.config.stats import stats
+from backend.api.caching import serve_cached
+from backend.api.streaming import stream_agent
 
 router = APIRouter(prefix="/spoilage", tags=["spoilage"])
 
+# How long an expired cached answer may still be served (marked stale)
+# while a background task refreshes it. 0 disables stale-while-revalidate.
+STALE_GRACE_SECONDS = 120
+
 FALLBACK_RESPONSE = {
     "remaining_hours": 42.0, "remaining_days": 1.75,
     "risk_level": "medium", "color": "yellow",
@@ -24,48 +30,102 @@ class SpoilageCheckRequest(BaseModel):
     lat: Optional[float] = None
     lng: Optional[float] = None
     language: Optional[str] = "hindi"
+    # "prefetch" (tools up front, one LLM turn) or "react" (LangGraph
+    # tool loop); defaults to settings.AGENT_MODE
+    agent_mode: Optional[str] = None
 
 
-@router.post("/check")
-async def spoilage_check(req: SpoilageCheckRequest, db: Session = Depends(get_db)):
-    """Check spoilage risk using AI agent (cached)."""
-    cache_key = agent_cache.make_key(
-        "spoilage", req.crop, req.storage_method, req.hours_since_harvest
+async def build_spoilage_response(
+    req: SpoilageCheckRequest, db: Optional[Session] = None
+) -> dict:
+    """
+    Run the spoilage agent, format its answer and log the advice.
+    Background refreshes pass db=None and skip the advice log.
+    """
+    from backend.agents.spoilage_agent import arun_spoilage_agent
+
+    result = await arun_spoilage_agent(**_agent_kwargs(req))
+    return _spoilage_payload(req, result, db)
+
+
+def _agent_kwargs(req: SpoilageCheckRequest) -> dict:
+    return dict(
+        crop=req.crop, storage_method=req.storage_method,
+        hours_since_harvest=req.hours_since_harvest,
+        lat=req.lat or 21.1458, lng=req.lng or 79.0882,
+        language=req.language or "hindi",
+        mode=req.agent_mode,
     )
-    cached = agent_cache.get(cache_key)
-    if cached:
-        stats.record("spoilage", success=True, cached=True)
-        cached["cached"] = True
-        return cached
 
+
+def _spoilage_payload(
+    req: SpoilageCheckRequest, result: dict, db: Optional[Session] = None
+) -> dict:
+    from backend.orchestrator.formatter import (
+        format_spoilage_response,
+        structured_fields,
+    )
+
+    formatted = format_spoilage_response(
+        result["explanation"], req.model_dump(),
+        **structured_fields("SPOILAGE", result),
+    )
+
+    if db is not None:
+        _log_advice(db, result["explanation"])
+
+    response = {"success": True, "data": formatted}
+    if not result.get("success", True):
+        response["fallback"] = True
+    if result.get("partial"):
+        response["partial"] = True
+    return response
+
+
+def _log_advice(db: Session, explanation: str):
     try:
-        from backend.agents.spoilage_agent import run_spoilage_agent
-        from backend.orchestrator.formatter import format_spoilage_response
-
-        result = run_spoilage_agent(
-            crop=req.crop, storage_method=req.storage_method,
-            hours_since_harvest=req.hours_since_harvest,
-            lat=req.lat or 21.1458, lng=req.lng or 79.0882,
-            language=req.language or "hindi",
+        entry = AdviceHistory(
+            id=generate_uuid(), user_id="demo-user",
+            type="spoilage", recommendation=explanation[:500],
+            savings_rupees=300,
+        )
+        db.add(entry)
+        db.commit()
+    except Exception:
+        db.rollback()
+
+
+@router.post("/check")
+async def spoilage_check(
+    req: SpoilageCheckRequest, request: Request, db: Session = Depends(get_db)
+):
+    """Check spoilage risk using AI agent (cached, coalesced)."""
+    cache_key = build_cache_key("spoilage", req.model_dump())
+    try:
+        return await serve_cached(
+            request, "spoilage", cache_key,
+            compute=lambda: build_spoilage_response(req, db),
+            refresh=lambda: build_spoilage_response(req),
+            grace_seconds=STALE_GRACE_SECONDS,
         )
-        formatted = format_spoilage_response(result["explanation"], req.model_dump())
-
-        try:
-            entry = AdviceHistory(
-                id=generate_uuid(), user_id="demo-user",
-                type="spoilage", recommendation=result["explanation"][:500],
-                savings_rupees=300,
-            )
-            db.add(entry)
-            db.commit()
-        except Exception:
-            db.rollback()
-
-        response = {"success": True, "data": formatted}
-        agent_cache.set(cache_key, response)
-        stats.record("spoilage", success=True)
-        return response
     except Exception as e:
         print(f"Spoilage endpoint fallback: {e}")
         stats.record("spoilage", success=False)
         return {"success": True, "data": FALLBACK_RESPONSE, "fallback": True}
+
+
+@router.post("/check/stream")
+async def spoilage_check_stream(req: SpoilageCheckRequest):
+    """Stream spoilage check progress as server-sent events."""
+    from backend.agents.spoilage_agent import astream_spoilage_agent
+
+    # A stream is a prefetch run whatever agent_mode asks for
+    kwargs = _agent_kwargs(req)
+    kwargs.pop("mode")
+    return stream_agent(
+        "spoilage",
+        build_cache_key("spoilage", {**req.model_dump(), "agent_mode": "prefetch"}),
+        astream_spoilage_agent(**kwargs),
+        finalize=lambda answer, tools, db: _spoilage_payload(req, answer, db),
+        grace_seconds=STALE_GRACE_SECONDS,
+    )
@@ -0,0 +1,90 @@
+"""
+streaming.py — Server-sent events for the agent and chat endpoints.
+
+The /stream variants send progress instead of a spinner:
+
+    event: status   {"state": "started"}           (immediately)
+    event: intent   {"intent", "agent_used"}        (chat only)
+    event: tool     {"name", "result"}              (per tool, as ready)
+    event: token    {"text"}                        (explanation chunks)
+    event: result   {...same payload as the non-streaming endpoint...}
+    event: done     {"cache": "HIT" | "MISS"}
+
+A fresh cache hit is sent as a single result event. A stream is a
+prefetch run, and its result is stored under the regular endpoint's
+cache key for agent_mode "prefetch", so either form can serve the
+other's answer.
+"""
+
+import json
+
+from fastapi.responses import StreamingResponse
+
+from backend.api.caching import store_response
+from backend.config.cache import agent_cache
+from backend.config.stats import stats
+from backend.models.database import SessionLocal
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # don't let nginx buffer the stream
+}
+
+
+def sse_event(event: str, data) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def stream_agent(
+    agent: str,
+    cache_key: str,
+    events,
+    finalize,
+    grace_seconds: float = 0,
+) -> StreamingResponse:
+    """
+    Stream an agent run as SSE.
+
+    events is an async iterator of (event, data) pairs that ends with
+    an "answer" event (see runner.astream_agent). finalize(answer,
+    tools, db) turns the answer plus the collected tool results into
+    the endpoint's response dict, which is cached and sent as the
+    result event.
+    """
+
+    async def body():
+        yield sse_event("status", {"state": "started"})
+
+        found = agent_cache.get_entry(cache_key)
+        if found is not None and not found[2]:
+            stats.record(agent, success=True, cached=True)
+            yield sse_event("result", found[0].value())
+            yield sse_event("done", {"cache": "HIT"})
+            return
+
+        tools = {}
+        try:
+            async for event, data in events:
+                if event == "tool":
+                    tools[data["name"]] = data["result"]
+                elif event == "answer":
+                    db = SessionLocal()
+                    try:
+                        response = finalize(data, tools, db)
+                    finally:
+                        db.close()
+                    store_response(cache_key, response, grace_seconds)
+                    stats.record(agent, success=True)
+                    yield sse_event("result", response)
+                    continue
+                yield sse_event(event, data)
+        except Exception as e:
+            print(f"{agent.capitalize()} stream error: {e}")
+            stats.record(agent, success=False)
+            yield sse_event("error", {"message": "stream failed"})
+        yield sse_event("done", {"cache": "MISS"})
+
+    return StreamingResponse(
+        body(), media_type="text/event-stream", headers=SSE_HEADERS
+    )
@@ -1,43 +1,404 @@
 """
-cache.py — Simple in-memory TTL cache for agent responses.
+cache.py — Two-tier cache for agent responses.
 
 Prevents Gemini API rate limits when the Flutter app or testers
 hammer the endpoints repeatedly with the same data.
+
+Keys built with make_key("harvest", ...) carry their namespace as a
+prefix, so each namespace gets its own TTL. The in-process tier is
+capped by entry count and payload bytes; least recently used entries
+are evicted first and a background thread sweeps out expired entries
+so memory does not creep up between reads.
+
+Entries can be stored with a stale grace window: after their TTL they
+are no longer returned by get(), but get_stale() still serves them
+until the grace window ends (stale-while-revalidate).
+
+Values are stored pre-serialized as immutable JSON bytes (CachedBody),
+gzip-compressed as well once they reach CACHE_GZIP_MIN_BYTES, so the
+API can serve hits as raw bytes without re-encoding or sharing
+mutable dicts between requests.
+
+Under the LRU sits an optional shared store (SQLite file or Redis,
+see cache_store.py) so every uvicorn worker and every restart sees
+the same entries. Writes go to both tiers; an LRU miss falls through
+to the store and promotes the entry.
 """
 
-import time
+import gzip
 import hashlib
 import json
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from backend.config.cache_store import make_store
+from backend.config.settings import settings
+
+DEFAULT_NAMESPACE = "default"
 
+# Upper bounds (seconds) of the age-at-hit histogram buckets
+AGE_BUCKETS = (10, 30, 60, 300, 900, 3600)
 
-class SimpleCache:
-    def __init__(self, ttl_seconds: int = 300):
-        self._cache: dict = {}
+COUNTERS = (
+    "hits", "stale_hits", "misses", "evictions",
+    "expirations", "expired_on_read", "store_hits",
+)
+
+
+def _new_counters() -> dict:
+    counters = {name: 0 for name in COUNTERS}
+    counters["age_at_hit"] = {
+        **{f"le_{b}s": 0 for b in AGE_BUCKETS}, "gt_%ds" % AGE_BUCKETS[-1]: 0
+    }
+    return counters
+
+
+class CachedBody(NamedTuple):
+    """Immutable pre-serialized cache value."""
+
+    body: bytes
+    gzip_body: bytes | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body or b"")
+
+    def value(self):
+        """Decode a fresh copy of the cached object."""
+        return json.loads(self.body)
+
+
+def encode_body(value, gzip_min_bytes: int | None = None) -> CachedBody:
+    raw = json.dumps(value, default=str, ensure_ascii=False).encode("utf-8")
+    return compress_body(raw, gzip_min_bytes)
+
+
+def compress_body(raw: bytes, gzip_min_bytes: int | None = None) -> CachedBody:
+    threshold = (
+        settings.CACHE_GZIP_MIN_BYTES if gzip_min_bytes is None else gzip_min_bytes
+    )
+    if threshold and len(raw) >= threshold:
+        return CachedBody(raw, gzip.compress(raw, compresslevel=6))
+    return CachedBody(raw)
+
+
+class LRUCache:
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        max_entries: int = 1000,
+        max_bytes: int = 16 * 1024 * 1024,
+        namespace_ttls: dict | None = None,
+        sweep_interval: float = 60,
+        store=None,
+    ):
+        self._cache: OrderedDict = OrderedDict()
         self._ttl = ttl_seconds
+        self._namespace_ttls = dict(namespace_ttls or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._sweep_interval = sweep_interval
+        self._sweeper = None
+        self._stop = threading.Event()
+        self._counters: dict = {}
+        self._store = store
+
+    # ── Keys & TTLs ─────────────────────────────────────────────
 
     def make_key(self, *args) -> str:
         raw = json.dumps(args, sort_keys=True, default=str)
-        return hashlib.md5(raw.encode()).hexdigest()
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        if args and isinstance(args[0], str):
+            return f"{args[0]}:{digest}"
+        return digest
+
+    @staticmethod
+    def namespace_of(key: str) -> str:
+        return key.split(":", 1)[0] if ":" in key else DEFAULT_NAMESPACE
+
+    def ttl_for(self, namespace: str) -> float:
+        return self._namespace_ttls.get(namespace, self._ttl)
+
+    def set_ttl(self, namespace: str, ttl_seconds: float):
+        self._namespace_ttls[namespace] = ttl_seconds
+
+    # ── Core API ────────────────────────────────────────────────
 
     def get(self, key: str):
-        if key in self._cache:
-            value, timestamp = self._cache[key]
-            if time.time() - timestamp < self._ttl:
-                return value
-            else:
-                del self._cache[key]
-        return None
+        value, is_stale = self.get_stale(key)
+        return None if is_stale else value
+
+    def get_stale(self, key: str) -> tuple:
+        """
+        Like get(), but also serves entries past their TTL while they
+        are inside their grace window. Returns (value, is_stale);
+        value is None on a miss.
+        """
+        found = self.get_entry(key)
+        if found is None:
+            return None, False
+        body, _stored_at, is_stale = found
+        return body.value(), is_stale
 
-    def set(self, key: str, value):
-        self._cache[key] = (value, time.time())
+    def get_entry(self, key: str):
+        """
+        Return (CachedBody, stored_at, is_stale) for a live or stale
+        entry, or None. Used to serve hits as raw bytes.
+        """
+        namespace = self.namespace_of(key)
+        entry = self._lookup(key)
+        if entry is None:
+            self._count(namespace, "misses")
+            return None
+        body, stored_at, expires_at, evict_at, _size = entry
+        now = time.time()
+        with self._lock:
+            if now >= evict_at:
+                if key in self._cache:
+                    self._remove(key, reason="expired_on_read")
+                self._count(namespace, "misses")
+                return None
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            is_stale = now >= expires_at
+            self._record_hit(namespace, now - stored_at, is_stale)
+        return body, stored_at, is_stale
+
+    def set(
+        self, key: str, value, ttl: float | None = None, grace: float = 0
+    ) -> CachedBody:
+        namespace = self.namespace_of(key)
+        now = time.time()
+        ttl = self.ttl_for(namespace) if ttl is None else ttl
+        body = encode_body(value)
+        entry = (body, now, now + ttl, now + ttl + grace, body.size)
+
+        self._insert(key, entry)
+        self._store_call("set", key, namespace, body.body, *entry[1:4])
+        self._ensure_sweeper()
+        return body
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+        self._store_call("delete", key)
 
     def clear(self):
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+        self._store_call("clear")
+
+    def clear_namespace(self, namespace: str) -> int:
+        """Drop every entry of one namespace from both tiers."""
+        with self._lock:
+            keys = [k for k in self._cache if self.namespace_of(k) == namespace]
+            for key in keys:
+                self._remove(key)
+        self._store_call("clear", namespace)
+        return len(keys)
 
     @property
     def size(self) -> int:
         return len(self._cache)
 
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    # ── Tiers ───────────────────────────────────────────────────
+
+    def _lookup(self, key: str):
+        """Find an entry in the LRU, falling back to the shared store."""
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None or self._store is None:
+            return entry
+
+        row = self._store_call("get", key)
+        if row is None:
+            return None
+        raw, stored_at, expires_at, evict_at = row
+        body = compress_body(raw)
+        entry = (body, stored_at, expires_at, evict_at, body.size)
+        self._insert(key, entry)
+        self._count(self.namespace_of(key), "store_hits")
+        return entry
+
+    def _insert(self, key: str, entry: tuple):
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = entry
+            self._bytes += entry[4]
+            self._evict_to_fit()
+
+    def _store_call(self, method: str, *args):
+        if self._store is None:
+            return None
+        try:
+            return getattr(self._store, method)(*args)
+        except Exception as e:
+            print(f"Cache store {method} error: {e}")
+            return None
+
+    # ── Eviction ────────────────────────────────────────────────
+
+    def _counters_for(self, namespace: str) -> dict:
+        counters = self._counters.get(namespace)
+        if counters is None:
+            counters = self._counters[namespace] = _new_counters()
+        return counters
+
+    def _count(self, namespace: str, counter: str):
+        with self._lock:
+            self._counters_for(namespace)[counter] += 1
+
+    def _record_hit(self, namespace: str, age: float, is_stale: bool):
+        counters = self._counters_for(namespace)
+        counters["stale_hits" if is_stale else "hits"] += 1
+        histogram = counters["age_at_hit"]
+        for bound in AGE_BUCKETS:
+            if age <= bound:
+                histogram[f"le_{bound}s"] += 1
+                return
+        histogram["gt_%ds" % AGE_BUCKETS[-1]] += 1
+
+    def _remove(self, key: str, reason: str | None = None):
+        _value, _stored_at, _expires_at, _evict_at, size = self._cache.pop(key)
+        self._bytes -= size
+        if reason:
+            self._count(self.namespace_of(key), reason)
+
+    def _evict_to_fit(self):
+        while self._cache and (
+            len(self._cache) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._cache))
+            self._remove(oldest, reason="evictions")
+
+    def sweep(self) -> int:
+        """Drop every expired entry. Returns the number removed."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, e in self._cache.items() if e[3] <= now]
+            for key in expired:
+                self._remove(key, reason="expirations")
+        self._store_call("sweep")
+        return len(expired)
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self._sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Cache sweep error: {e}")
+
+    def _ensure_sweeper(self):
+        if self._sweep_interval <= 0 or self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(
+                    target=self._sweep_loop, name="cache-sweeper", daemon=True
+                )
+                self._sweeper.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ── Introspection ───────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """
+        Per-namespace entries, bytes, hit/miss/eviction counters,
+        oldest entry age and an age-at-hit histogram.
+        """
+        now = time.time()
+        with self._lock:
+            namespaces = {}
+            for key, (_v, stored_at, _e, _ev, size) in self._cache.items():
+                ns = self.namespace_of(key)
+                data = namespaces.setdefault(
+                    ns, {"entries": 0, "bytes": 0, "oldest_age_seconds": 0}
+                )
+                data["entries"] += 1
+                data["bytes"] += size
+                data["oldest_age_seconds"] = max(
+                    data["oldest_age_seconds"], round(now - stored_at, 1)
+                )
+            for ns, counters in self._counters.items():
+                data = namespaces.setdefault(
+                    ns, {"entries": 0, "bytes": 0, "oldest_age_seconds": 0}
+                )
+                data.update(
+                    {k: (dict(v) if isinstance(v, dict) else v)
+                     for k, v in counters.items()}
+                )
+            for ns, data in namespaces.items():
+                for name, value in _new_counters().items():
+                    data.setdefault(name, value)
+                lookups = data["hits"] + data["stale_hits"] + data["misses"]
+                data["hit_rate"] = (
+                    round((data["hits"] + data["stale_hits"]) / lookups * 100, 1)
+                    if lookups else 0.0
+                )
+                data["ttl_seconds"] = self.ttl_for(ns)
+
+            totals = {
+                name: sum(c[name] for c in self._counters.values())
+                for name in COUNTERS
+            }
+            summary = {
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                **totals,
+                "namespaces": namespaces,
+            }
+
+        summary["store"] = {
+            "backend": self._store.name if self._store else "memory",
+            "entries": self._store_call("count"),
+            "hits": totals["store_hits"],
+        }
+        return summary
+
+
+# Kept for older imports — the unbounded SimpleCache was replaced by LRUCache.
+SimpleCache = LRUCache
+
+
+# Global cache instance — per-namespace TTLs, bounded LRU over a shared store
+agent_cache = LRUCache(
+    ttl_seconds=settings.CACHE_DEFAULT_TTL,
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    namespace_ttls=settings.CACHE_NAMESPACE_TTLS,
+    sweep_interval=settings.CACHE_SWEEP_INTERVAL,
+    store=make_store(
+        settings.CACHE_BACKEND,
+        sqlite_path=settings.CACHE_SQLITE_PATH,
+        redis_url=settings.CACHE_REDIS_URL,
+    ),
+)
+
 
-# Global cache instance — 5 minute TTL
-agent_cache = SimpleCache(ttl_seconds=300)
+# Generated explanations — long TTL, on disk (see tools/explanation.py)
+explanation_cache = LRUCache(
+    ttl_seconds=settings.EXPLANATION_CACHE_TTL,
+    max_entries=settings.EXPLANATION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_BYTES,
+    sweep_interval=settings.CACHE_SWEEP_INTERVAL,
+    store=make_store(
+        settings.EXPLANATION_CACHE_BACKEND,
+        sqlite_path=settings.EXPLANATION_CACHE_PATH,
+        redis_url=settings.CACHE_REDIS_URL,
+    ),
+)
@@ -0,0 +1,121 @@
+"""
+cache_keys.py — Declared cache key schemas for the agent endpoints.
+
+Each endpoint lists every request field that changes its answer,
+with the default the endpoint applies when the field is missing (so
+a missing lat and the Nagpur default share one entry). Strings are
+normalized and coordinates are snapped to a grid of
+CACHE_GEO_CELL_DEG degrees, so nearby farmers share cache entries.
+
+Keys also carry the LLM backend (llm_factory.llm_backend()): the
+cache is shared on disk, and answers from the fake or a replayed
+cassette must never be served to requests answered by Gemini.
+"""
+
+import math
+
+from backend.config.cache import agent_cache
+from backend.config.settings import settings
+
+DEFAULT_LAT = 21.1458
+DEFAULT_LNG = 79.0882
+
+GEO_FIELDS = {"lat", "lng"}
+
+# namespace -> {field: default}
+KEY_SCHEMAS = {
+    "harvest": {
+        "crop": None,
+        "lat": DEFAULT_LAT,
+        "lng": DEFAULT_LNG,
+        "soil_type": "black",
+        "district": "Nagpur",
+        "language": "hindi",
+        "mode": "agent",
+        "narrate": None,
+        "agent_mode": None,
+    },
+    "market": {
+        "crop": None,
+        "volume_kg": 500,
+        "lat": DEFAULT_LAT,
+        "lng": DEFAULT_LNG,
+        "current_temp_c": 35,
+        "storage_method": "open_floor",
+        "language": "hindi",
+        "agent_mode": None,
+    },
+    "spoilage": {
+        "crop": None,
+        "storage_method": "open_floor",
+        "hours_since_harvest": 0,
+        "lat": DEFAULT_LAT,
+        "lng": DEFAULT_LNG,
+        "language": "hindi",
+        "agent_mode": None,
+    },
+    "preservation": {
+        "crop": None,
+        "current_storage": "open_floor",
+        "temp_c": 35,
+        "language": "hindi",
+        "agent_mode": None,
+    },
+    "chat": {
+        "message": None,
+        "crop": "tomato",
+        "lat": DEFAULT_LAT,
+        "lng": DEFAULT_LNG,
+        "soil_type": "black",
+        "district": "Nagpur",
+        "language": "hindi",
+        "volume_kg": 500,
+        "storage_method": "open_floor",
+        "hours_since_harvest": 0,
+        "current_temp_c": 35,
+        "agent_mode": None,
+    },
+}
+
+
+def quantize_coord(value: float, cell_deg: float | None = None) -> float:
+    """Snap a latitude/longitude to the centre of its grid cell."""
+    cell = settings.CACHE_GEO_CELL_DEG if cell_deg is None else cell_deg
+    if not cell or cell <= 0:
+        return float(value)
+    return round((math.floor(value / cell) + 0.5) * cell, 6)
+
+
+def _normalize(field: str, value):
+    if field in GEO_FIELDS:
+        return quantize_coord(float(value))
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def build_cache_key(namespace: str, data: dict) -> str:
+    """
+    Build the agent_cache key for an endpoint request.
+
+    data is the request as a dict (e.g. req.model_dump()). Fields not
+    in the namespace's schema are ignored; missing or falsy values
+    take the schema default, mirroring the endpoints' `x or default`.
+    agent_mode is resolved as the agents resolve it (runner.agent_mode),
+    so leaving it out shares the entry of the configured AGENT_MODE.
+    """
+    from backend.agents.runner import agent_mode
+    from backend.config.llm_factory import llm_backend
+
+    schema = KEY_SCHEMAS[namespace]
+    if "agent_mode" in schema:
+        data = {**data, "agent_mode": agent_mode(data.get("agent_mode"))}
+    fields = {}
+    for field, default in schema.items():
+        value = data.get(field)
+        if not value and default is not None:
+            value = default
+        fields[field] = _normalize(field, value) if value is not None else None
+    return agent_cache.make_key(namespace, llm_backend(), fields)
@@ -0,0 +1,158 @@
+"""
+cache_store.py — Shared second-tier stores for the agent cache.
+
+The in-process LRU (cache.py) sits on top of one of these. Both are
+shared by every uvicorn worker on the host and survive restarts:
+
+- SQLiteStore: a local SQLite file in WAL mode (default)
+- RedisStore: any Redis-compatible server (needs the `redis` package)
+
+Stores hold already-encoded bytes plus the entry's timestamps; the
+LRU decides what is fresh, stale or gone. Store errors are logged and
+treated as misses so a broken tier never fails a request.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class SQLiteStore:
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY,"
+            " namespace TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " evict_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_evict_at "
+            "ON cache_entries (evict_at)"
+        )
+
+    def get(self, key: str):
+        """Return (value, stored_at, expires_at, evict_at) or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at, expires_at, evict_at "
+                "FROM cache_entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None or row[3] <= time.time():
+            return None
+        return bytes(row[0]), row[1], row[2], row[3]
+
+    def set(self, key, namespace, value: bytes, stored_at, expires_at, evict_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(key, namespace, value, stored_at, expires_at, evict_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, value, stored_at, expires_at, evict_at),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self, namespace: str | None = None):
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM cache_entries")
+            else:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ?", (namespace,)
+                )
+
+    def sweep(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM cache_entries WHERE evict_at <= ?", (time.time(),)
+            )
+        return cur.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries"
+            ).fetchone()[0]
+
+
+class RedisStore:
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "agrichain:cache:"):
+        import redis  # optional dependency
+
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def _k(self, key: str) -> str:
+        return self._prefix + key
+
+    def get(self, key: str):
+        row = self._redis.hmget(
+            self._k(key), "value", "stored_at", "expires_at", "evict_at"
+        )
+        if row[0] is None:
+            return None
+        evict_at = float(row[3])
+        if evict_at <= time.time():
+            return None
+        return row[0], float(row[1]), float(row[2]), evict_at
+
+    def set(self, key, namespace, value: bytes, stored_at, expires_at, evict_at):
+        rkey = self._k(key)
+        pipe = self._redis.pipeline()
+        pipe.hset(rkey, mapping={
+            "namespace": namespace,
+            "value": value,
+            "stored_at": stored_at,
+            "expires_at": expires_at,
+            "evict_at": evict_at,
+        })
+        pipe.pexpireat(rkey, int(evict_at * 1000))
+        pipe.execute()
+
+    def delete(self, key: str):
+        self._redis.delete(self._k(key))
+
+    def clear(self, namespace: str | None = None):
+        pattern = self._prefix + (f"{namespace}:*" if namespace else "*")
+        for rkey in self._redis.scan_iter(match=pattern):
+            self._redis.delete(rkey)
+
+    def sweep(self) -> int:
+        return 0  # Redis expires keys on its own
+
+    def count(self) -> int:
+        return sum(1 for _ in self._redis.scan_iter(match=self._prefix + "*"))
+
+
+def make_store(backend: str, sqlite_path: str = "", redis_url: str = ""):
+    """Build the configured second-tier store, or None for memory-only."""
+    backend = (backend or "memory").lower()
+    try:
+        if backend == "sqlite":
+            return SQLiteStore(sqlite_path)
+        if backend == "redis":
+            return RedisStore(redis_url)
+    except Exception as e:
+        print(f"Cache store init error ({backend}), using memory only: {e}")
+        return None
+    return None
@@ -0,0 +1,234 @@
+"""
+fake_llm.py — Deterministic offline stand-in for Gemini (LLM_BACKEND=fake).
+
+Never touches the network and always answers the same conversation
+the same way, so load tests and profiles measure our own overhead
+(tools, the ReAct loop, caching, serialization) instead of Gemini's.
+
+- With tools bound (the ReAct agents) it calls each bound tool once,
+  one per turn, in the order they were bound. Arguments are filled
+  from the user message ("lat=21.1", "Soil type: black", "sell 500 kg
+  of onion", ...) and from earlier tool results, the way Gemini reads
+  them; it then answers with a summary of the tool results.
+- A routing prompt (categories listed with their tools, see
+  orchestrator/single_call.py) narrows the bound tools to the
+  category it classifies the message into.
+- Without tools it answers a "reply with the category" prompt with a
+  keyword match against the listed categories, and anything else
+  with a short explanation built from the prompt.
+"""
+
+import json
+import re
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Values read from the user message: field -> patterns (first group)
+MESSAGE_FACTS = {
+    "crop": (
+        r"grows (\w+)", r"harvested (\w+)", r"kg of (\w+)", r"stores (\w+)",
+    ),
+    "district": (r"grows \w+ in (\w+)",),
+    "soil_type": (r"[Ss]oil type: (\w+)",),
+    "storage_method": (r"[Ss]torage(?: method)?: (\w+)", r"using (\w+)"),
+    "hours_since_harvest": (r"about ([\d.]+) hours ago",),
+    "volume_kg": (r"([\d.]+) kg",),
+    "temp_c": (r"[Tt]emperature: ([\d.]+)",),
+}
+
+# Tool parameter -> other names the same value goes by
+ALIASES = {
+    "farmer_lat": ("lat",),
+    "farmer_lng": ("lng",),
+    "current_storage": ("storage_method",),
+    "current_temp_c": ("temp_c",),
+    "method_id": ("id",),
+    "avg_mandi_price": ("price_per_kg",),
+    "soil_moisture_factor": ("moisture_factor",),
+}
+
+# Used when nothing in the conversation provides the value
+FIELD_DEFAULTS = {"price_trend": "stable"}
+
+TYPE_DEFAULTS = {
+    "number": 0, "integer": 0, "string": "", "boolean": False,
+    "array": [], "object": {},
+}
+
+CATEGORY_LINE = re.compile(r"^([A-Z]{3,}) — (.+)$", re.MULTILINE)
+QUOTED_MESSAGE = re.compile(r"message: '(.+?)'", re.DOTALL)
+
+
+def _text(message) -> str:
+    content = message.content
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    return str(content)
+
+
+def _message_facts(text: str) -> dict:
+    facts = dict(re.findall(r"\b(\w+)=(-?\d+(?:\.\d+)?)", text))
+    for field, patterns in MESSAGE_FACTS.items():
+        for pattern in patterns:
+            match = re.search(pattern, text)
+            if match:
+                facts.setdefault(field, match.group(1))
+                break
+    return facts
+
+
+def _result_facts(content: str) -> dict:
+    """Top-level keys of a tool result (or of its first list item)."""
+    try:
+        value = json.loads(content)
+    except (TypeError, ValueError):
+        return {}
+    if isinstance(value, list):
+        value = value[0] if value else {}
+    return value if isinstance(value, dict) else {}
+
+
+def _coerce(value, kind: str):
+    try:
+        if kind == "number":
+            return float(value)
+        if kind == "integer":
+            return int(float(value))
+        if kind == "boolean":
+            return value if isinstance(value, bool) else str(value).lower() == "true"
+        if kind == "string":
+            return str(value)
+    except (TypeError, ValueError):
+        return TYPE_DEFAULTS[kind]
+    return value
+
+
+def _tool_args(schema: dict, facts: dict) -> dict:
+    args = {}
+    for name, spec in schema.get("properties", {}).items():
+        kind = spec.get("type", "string")
+        for key in (name, *ALIASES.get(name, ())):
+            if key in facts:
+                args[name] = _coerce(facts[key], kind)
+                break
+        else:
+            args[name] = spec.get(
+                "default", FIELD_DEFAULTS.get(name, TYPE_DEFAULTS.get(kind))
+            )
+    return args
+
+
+def _classify(prompt: str) -> str:
+    """Pick the listed category whose description shares the most
+    words with the quoted message (the first category on a tie)."""
+    categories = CATEGORY_LINE.findall(prompt)
+    quoted = QUOTED_MESSAGE.search(prompt)
+    words = set(re.findall(r"\w+", (quoted.group(1) if quoted else prompt).lower()))
+    best, best_score = categories[0][0], -1
+    for name, description in categories:
+        score = len(words & set(re.findall(r"\w+", description.lower())))
+        if score > best_score:
+            best, best_score = name, score
+    return best
+
+
+def _category_tools(prompt: str, tools: list) -> list:
+    """The bound tools named on the chosen category's line."""
+    chosen = dict(CATEGORY_LINE.findall(prompt))[_classify(prompt)]
+    return [t for t in tools if t["function"]["name"] in chosen] or tools
+
+
+class FakeChatModel(BaseChatModel):
+    model: str = "fake"
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "agrichain-fake"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    # ── Reply ───────────────────────────────────────────────────
+
+    def _reply(self, messages: list, tools: list | None) -> AIMessage:
+        human = "\n".join(_text(m) for m in messages if isinstance(m, HumanMessage))
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        turn = sum(1 for m in messages if isinstance(m, AIMessage))
+        prompt = "\n".join(_text(m) for m in messages)
+        if tools and CATEGORY_LINE.search(prompt):
+            tools = _category_tools(prompt, tools)
+
+        if tools and turn < len(tools):
+            facts = _message_facts(human)
+            for message in results:
+                for key, value in _result_facts(_text(message)).items():
+                    facts.setdefault(key, value)
+            function = tools[turn]["function"]
+            return AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": function["name"],
+                    "args": _tool_args(function.get("parameters", {}), facts),
+                    "id": f"fake-call-{turn}",
+                }],
+            )
+
+        if results:
+            summary = "; ".join(
+                f"{m.name}: {_text(m)[:120]}" for m in results
+            )
+            return AIMessage(content=f"Based on {len(results)} tool results — {summary}")
+
+        if CATEGORY_LINE.search(prompt):
+            return AIMessage(content=_classify(prompt))
+        return AIMessage(content=f"Advice: {human.splitlines()[0] if human else ''}")
+
+    # The mixins in llm_factory wrap _generate/_agenerate/_stream/_astream;
+    # each is implemented here directly (not via BaseChatModel's
+    # defaults, which would call back into the wrapped methods).
+
+    def _respond(self, messages: list, kwargs: dict) -> AIMessage:
+        return self._reply(messages, kwargs.get("tools"))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._respond(messages, kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._respond(messages, kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message: AIMessage) -> list:
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            return [ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": call["name"], "args": json.dumps(call["args"]),
+                    "id": call["id"], "index": 0,
+                }],
+            ))]
+        return [
+            ChatGenerationChunk(message=AIMessageChunk(content=word))
+            for word in re.findall(r"\S+\s*", message.content)
+        ]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield from self._chunks(self._respond(messages, kwargs))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._chunks(self._respond(messages, kwargs)):
+            yield chunk
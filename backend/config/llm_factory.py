@@ -0,0 +1,242 @@
+"""
+llm_factory.py — The one place chat models are built.
+
+Agents, intent detection and explanations all call chat_model(); the
+backend is picked by LLM_BACKEND:
+
+- "gemini": ChatGoogleGenerativeAI (gemini-2.0-flash), the default
+- "fake":   fake_llm.FakeChatModel — deterministic, realistic tool
+            calls, no network (offline load tests and profiling)
+- "record": Gemini, and every exchange is appended to the cassette
+            file LLM_CASSETTE_PATH
+- "replay": answers only from that cassette, no network; a request
+            that was never recorded raises, like a failed Gemini call
+
+Every backend goes through llm_gateway (fake and replay without the
+LLM_RPM/LLM_TPM quota), and LLM_LATENCY_MS (plus up to
+LLM_LATENCY_JITTER_MS) is slept inside each call, so fake and replay
+runs can mimic Gemini's response time.
+
+Cassette entries are keyed on the temperature, the bound tool names,
+the system/human message text and the turn number, not on tool
+results: a replayed ReAct loop follows the recorded tool calls even
+when live weather or prices have changed since.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import ClassVar
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    SystemMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from backend.config.fake_llm import FakeChatModel
+from backend.config.llm_gateway import GatewayMixin
+from backend.config.settings import settings
+
+LLM_BACKENDS = ("gemini", "fake", "record", "replay")
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+
+# ─── Latency Injection ───────────────────────────────────────
+
+def _latency_seconds() -> float:
+    if settings.LLM_LATENCY_MS <= 0 and settings.LLM_LATENCY_JITTER_MS <= 0:
+        return 0.0
+    jitter = random.uniform(0, settings.LLM_LATENCY_JITTER_MS)
+    return max(0.0, settings.LLM_LATENCY_MS + jitter) / 1000
+
+
+class LatencyMixin:
+    """Sleeps LLM_LATENCY_MS (+ jitter) before every call."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(_latency_seconds())
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(_latency_seconds())
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(_latency_seconds())
+        yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(_latency_seconds())
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+
+# ─── Record / Replay ─────────────────────────────────────────
+
+def _tool_names(tools) -> list:
+    """Names of bound tools, in OpenAI-style dicts or Gemini protos."""
+    names = []
+    for tool in tools or ():
+        if isinstance(tool, dict):
+            function = tool.get("function", tool)
+            if "name" in function:
+                names.append(function["name"])
+            for declaration in tool.get("function_declarations", ()):
+                names.append(declaration["name"])
+        else:
+            for declaration in getattr(tool, "function_declarations", ()):
+                names.append(declaration.name)
+    return names
+
+
+def cassette_key(temperature, tools, messages) -> str:
+    prompt = [
+        (m.type, m.content) for m in messages
+        if isinstance(m, (SystemMessage, HumanMessage))
+    ]
+    turn = sum(1 for m in messages if isinstance(m, AIMessage))
+    raw = json.dumps(
+        [temperature, _tool_names(tools), prompt, turn],
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class Cassette:
+    """Append-only JSONL file of {key, message} exchanges."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._entries[entry["key"]] = entry["message"]
+        return self._entries
+
+    def get(self, key: str):
+        with self._lock:
+            data = self._load().get(key)
+        return messages_from_dict([data])[0] if data is not None else None
+
+    def put(self, key: str, message):
+        data = message_to_dict(message)
+        with self._lock:
+            self._load()[key] = data
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "message": data}, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+
+_cassette: Cassette | None = None
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette(settings.LLM_CASSETTE_PATH)
+    return _cassette
+
+
+class RecordingMixin:
+    """Saves each (non-streamed) answer to the cassette."""
+
+    def _record(self, messages, kwargs, result):
+        if result.generations:
+            key = cassette_key(self.temperature, kwargs.get("tools"), messages)
+            get_cassette().put(key, result.generations[0].message)
+        return result
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = super()._generate(messages, stop, run_manager, **kwargs)
+        return self._record(messages, kwargs, result)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+        return self._record(messages, kwargs, result)
+
+
+class CassetteChatModel(FakeChatModel):
+    """Replays recorded answers. Tool binding and the call plumbing
+    come from FakeChatModel; only the answer differs."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "agrichain-replay"
+
+    def _respond(self, messages: list, kwargs: dict):
+        key = cassette_key(self.temperature, kwargs.get("tools"), messages)
+        message = get_cassette().get(key)
+        if message is None:
+            raise LookupError(f"No cassette entry for this request ({key[:12]})")
+        return message
+
+
+# ─── Models ──────────────────────────────────────────────────
+
+class GeminiChatModel(GatewayMixin, LatencyMixin, ChatGoogleGenerativeAI):
+    pass
+
+
+class RecordingGeminiChatModel(RecordingMixin, GeminiChatModel):
+    pass
+
+
+class GatedFakeChatModel(GatewayMixin, LatencyMixin, FakeChatModel):
+    metered: ClassVar[bool] = False  # no Gemini quota: slots only
+
+
+class ReplayChatModel(GatewayMixin, LatencyMixin, CassetteChatModel):
+    metered: ClassVar[bool] = False
+
+
+def llm_backend() -> str:
+    backend = settings.LLM_BACKEND.lower()
+    return backend if backend in LLM_BACKENDS else "gemini"
+
+
+def chat_model(temperature: float, api_key: str | None = None) -> BaseChatModel:
+    """
+    The configured chat model. Gemini backends raise ValueError when
+    no GOOGLE_API_KEY is set (callers fall back to templates).
+    """
+    backend = llm_backend()
+    if backend == "fake":
+        return GatedFakeChatModel(temperature=temperature)
+    if backend == "replay":
+        return ReplayChatModel(temperature=temperature)
+
+    api_key = api_key if api_key is not None else os.getenv("GOOGLE_API_KEY", "")
+    if not api_key:
+        raise ValueError("No GOOGLE_API_KEY set")
+    if backend == "record":
+        # Streamed calls go through _generate too, so they get recorded
+        return RecordingGeminiChatModel(
+            model=GEMINI_MODEL, temperature=temperature,
+            google_api_key=api_key, disable_streaming=True,
+        )
+    return GeminiChatModel(
+        model=GEMINI_MODEL, temperature=temperature, google_api_key=api_key,
+    )
@@ -0,0 +1,455 @@
+"""
+llm_gateway.py — One shared gate in front of every Gemini call.
+
+The agents, intent detection and the explanation generator each own a
+chat model, and a burst of requests used to hit Gemini all at once
+until it answered 429 and everything fell back. Every model is now
+built by llm_factory.chat_model() with GatewayMixin, so its calls
+pass through llm_gateway:
+
+- at most LLM_MAX_CONCURRENCY calls in flight,
+- a requests-per-minute (LLM_RPM) and tokens-per-minute (LLM_TPM)
+  token bucket; a call's tokens are estimated from its prompt and
+  corrected from Gemini's usage metadata afterwards,
+- waiting calls are served by priority, then arrival order.
+
+The RPM/TPM buckets model Gemini's quota, so only real Gemini clients
+are metered: the fake and replay backends (llm_factory) still queue for
+a concurrency slot but never wait on, or draw from, the buckets.
+
+Callers label their calls with llm_call(site, priority); the gateway
+reports queue wait and tokens per site in /api/v1/stats. A spoilage check whose
+crop is already at red risk raises itself to PRIORITY_URGENT, so it
+overtakes routine harvest scoring in a busy queue.
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import inspect
+import itertools
+import json
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import ClassVar
+
+from backend.config.settings import settings
+
+# Lower runs first
+PRIORITY_URGENT = 0   # red-risk spoilage
+PRIORITY_HIGH = 1     # spoilage checks, chat intent detection
+PRIORITY_NORMAL = 2   # market, preservation
+PRIORITY_LOW = 3      # routine harvest scoring
+
+CHARS_PER_TOKEN = 4
+
+
+# ─── Call Sites ──────────────────────────────────────────────
+
+@dataclass
+class CallSite:
+    name: str
+    priority: int = PRIORITY_NORMAL
+    wait_seconds: float = 0.0
+
+
+_current_site: contextvars.ContextVar = contextvars.ContextVar(
+    "llm_call_site", default=None
+)
+
+
+@contextmanager
+def llm_call(site: str, priority: int = PRIORITY_NORMAL):
+    """
+    Label the Gemini calls made inside this block (including those a
+    LangGraph agent makes) with a site name and queue priority.
+    Yields the CallSite, whose wait_seconds adds up the queue wait.
+    """
+    previous = _current_site.get()
+    call_site = CallSite(site, priority)
+    _current_site.set(call_site)
+    try:
+        yield call_site
+    finally:
+        # set() rather than reset(token): an abandoned stream may be
+        # closed from another context, where reset() would raise
+        _current_site.set(previous)
+
+
+def llm_site(site: str, priority: int = PRIORITY_NORMAL):
+    """Decorator form of llm_call for run functions, coroutines and
+    async generators (the streaming runs)."""
+
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def agen_wrapper(*args, **kwargs):
+                with llm_call(site, priority):
+                    async for item in fn(*args, **kwargs):
+                        yield item
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with llm_call(site, priority):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with llm_call(site, priority):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def raise_priority(priority: int):
+    """Make the remaining calls of the current site more urgent."""
+    call_site = _current_site.get()
+    if call_site is not None and priority < call_site.priority:
+        call_site.priority = priority
+
+
+def current_site() -> CallSite:
+    return _current_site.get() or CallSite("other")
+
+
+# ─── Token Bucket ────────────────────────────────────────────
+
+class _TokenBucket:
+    """Refills `per_minute` units per minute; 0 disables the limit."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` units are available."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.capacity > 0:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Return (negative) or charge (positive) a correction."""
+        if self.capacity > 0:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+
+# ─── Gateway ─────────────────────────────────────────────────
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    wake: object = field(compare=False)
+    # False: not charged to the RPM/TPM buckets (no Gemini quota)
+    metered: bool = field(default=True, compare=False)
+    granted: bool = field(default=False, compare=False)
+
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int = 4, rpm: int = 0, tpm: int = 0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = _TokenBucket(rpm)
+        self._tokens = _TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._timer: threading.Timer | None = None
+        self._sites: dict = {}
+        self.rate_limited = 0
+
+    # ── Scheduling (lock held) ──────────────────────────────────
+
+    def _dispatch(self) -> list:
+        """Grant slots to the head of the queue; returns waiters to wake."""
+        ready = []
+        while self._heap and self._active < self.max_concurrency:
+            waiter = self._heap[0]
+            if waiter.metered:
+                delay = max(
+                    self._requests.delay(1), self._tokens.delay(waiter.tokens)
+                )
+                if delay > 0:
+                    self.rate_limited += 1
+                    self._arm_timer(delay)
+                    break
+                self._requests.take(1)
+                self._tokens.take(waiter.tokens)
+            heapq.heappop(self._heap)
+            self._active += 1
+            waiter.granted = True
+            ready.append(waiter)
+        return ready
+
+    def _arm_timer(self, delay: float):
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            ready = self._dispatch()
+        self._wake(ready)
+
+    def _wake(self, waiters: list):
+        for waiter in waiters:
+            try:
+                waiter.wake()
+            except RuntimeError:
+                # The waiting event loop has closed; give the slot back
+                self.release(waiter)
+
+    def _enqueue(
+        self, tokens: int, priority: int, wake, metered: bool = True
+    ) -> _Waiter:
+        waiter = _Waiter(priority, next(self._seq), tokens, wake, metered)
+        with self._lock:
+            heapq.heappush(self._heap, waiter)
+            ready = self._dispatch()
+        self._wake(ready)
+        return waiter
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            granted = waiter.granted
+            if not granted:
+                self._heap.remove(waiter)
+                heapq.heapify(self._heap)
+        if granted:
+            self.release(waiter)
+
+    # ── Acquire / Release ───────────────────────────────────────
+
+    async def acquire(
+        self, tokens: int, call_site: CallSite, metered: bool = True
+    ) -> _Waiter:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve():
+            if not future.done():
+                future.set_result(None)
+
+        started = time.monotonic()
+        waiter = self._enqueue(
+            tokens, call_site.priority,
+            lambda: loop.call_soon_threadsafe(resolve), metered,
+        )
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self._record(call_site, time.monotonic() - started)
+        return waiter
+
+    def acquire_sync(
+        self, tokens: int, call_site: CallSite, metered: bool = True
+    ) -> _Waiter:
+        event = threading.Event()
+        started = time.monotonic()
+        waiter = self._enqueue(tokens, call_site.priority, event.set, metered)
+        event.wait()
+        self._record(call_site, time.monotonic() - started)
+        return waiter
+
+    def release(self, waiter: _Waiter, used_tokens: int | None = None):
+        with self._lock:
+            self._active -= 1
+            if used_tokens and waiter.metered:
+                self._tokens.adjust(used_tokens - waiter.tokens)
+            ready = self._dispatch()
+        self._wake(ready)
+
+    @contextmanager
+    def slot(self, tokens: int, metered: bool = True):
+        """Hold a slot for a blocking call; set usage["tokens"] if known."""
+        call_site = current_site()
+        waiter = self.acquire_sync(tokens, call_site, metered)
+        usage = {"tokens": None}
+        try:
+            yield usage
+        finally:
+            self.release(waiter, usage["tokens"])
+            self._record_tokens(call_site, usage["tokens"] or tokens)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int, metered: bool = True):
+        call_site = current_site()
+        waiter = await self.acquire(tokens, call_site, metered)
+        usage = {"tokens": None}
+        try:
+            yield usage
+        finally:
+            self.release(waiter, usage["tokens"])
+            self._record_tokens(call_site, usage["tokens"] or tokens)
+
+    # ── Stats ───────────────────────────────────────────────────
+
+    def _record(self, call_site: CallSite, waited: float):
+        call_site.wait_seconds += waited
+        with self._lock:
+            site = self._sites.setdefault(
+                call_site.name,
+                {
+                    "calls": 0, "total_wait": 0.0, "max_wait": 0.0,
+                    "last_wait": 0.0, "tokens": 0,
+                },
+            )
+            site["calls"] += 1
+            site["total_wait"] += waited
+            site["max_wait"] = max(site["max_wait"], waited)
+            site["last_wait"] = waited
+
+    def _record_tokens(self, call_site: CallSite, tokens: int):
+        """Tokens used (Gemini's count, else the estimate) per site."""
+        with self._lock:
+            self._sites[call_site.name]["tokens"] += tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            sites = {
+                name: {
+                    "calls": s["calls"],
+                    "avg_wait_ms": round(1000 * s["total_wait"] / s["calls"], 1),
+                    "max_wait_ms": round(1000 * s["max_wait"], 1),
+                    "last_wait_ms": round(1000 * s["last_wait"], 1),
+                    "tokens": s["tokens"],
+                }
+                for name, s in sorted(self._sites.items())
+            }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "in_flight": self._active,
+                "queued": len(self._heap),
+                "rate_limited": self.rate_limited,
+                "queue_wait": sites,
+            }
+
+
+# Global instance — every Gemini chat model goes through it
+llm_gateway = LLMGateway(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    rpm=settings.LLM_RPM,
+    tpm=settings.LLM_TPM,
+)
+
+
+# ─── Gated Chat Models ───────────────────────────────────────
+
+def estimate_tokens(messages, tools=None) -> int:
+    """Prompt length (with bound tool schemas) / CHARS_PER_TOKEN plus
+    the expected answer size."""
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    if tools:
+        chars += len(json.dumps(tools, default=str))
+    return chars // CHARS_PER_TOKEN + settings.LLM_OUTPUT_TOKEN_ESTIMATE
+
+
+def _used_tokens(message) -> int | None:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+_STREAM_END = object()
+
+
+class GatewayMixin:
+    """Chat model mixin: every call waits for an llm_gateway slot.
+    Listed before the model class (see llm_factory). Models without a
+    Gemini quota (fake, replay) set metered = False."""
+
+    metered: ClassVar[bool] = True
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = estimate_tokens(messages, kwargs.get("tools"))
+        with llm_gateway.slot(tokens, self.metered) as usage:
+            result = super()._generate(messages, stop, run_manager, **kwargs)
+            if result.generations:
+                usage["tokens"] = _used_tokens(result.generations[0].message)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = estimate_tokens(messages, kwargs.get("tools"))
+        async with llm_gateway.aslot(tokens, self.metered) as usage:
+            result = await super()._agenerate(
+                messages, stop, run_manager, **kwargs
+            )
+            if result.generations:
+                usage["tokens"] = _used_tokens(result.generations[0].message)
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = estimate_tokens(messages, kwargs.get("tools"))
+        with llm_gateway.slot(tokens, self.metered) as usage:
+            for chunk in super()._stream(messages, stop, run_manager, **kwargs):
+                usage["tokens"] = (usage["tokens"] or 0) + (
+                    _used_tokens(chunk.message) or 0
+                )
+                yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        """
+        Gemini's chunks are read into a queue under the slot, and the
+        slot is released as soon as Gemini has finished, not when a slow
+        consumer (an SSE client) has read every chunk. The queue holds
+        at most one answer.
+        """
+        tokens = estimate_tokens(messages, kwargs.get("tools"))
+        upstream = super()._astream(messages, stop, run_manager, **kwargs)
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        async def read_upstream():
+            try:
+                async with llm_gateway.aslot(tokens, self.metered) as usage:
+                    async for chunk in upstream:
+                        usage["tokens"] = (usage["tokens"] or 0) + (
+                            _used_tokens(chunk.message) or 0
+                        )
+                        chunks.put_nowait(chunk)
+            except Exception as e:
+                chunks.put_nowait(e)
+            finally:
+                await upstream.aclose()
+                chunks.put_nowait(_STREAM_END)
+
+        reader = asyncio.ensure_future(read_upstream())
+        try:
+            while (item := await chunks.get()) is not _STREAM_END:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer gone early: stop reading and free the slot
+            reader.cancel()
@@ -0,0 +1,93 @@
+"""
+llm_health.py — Shared "is Gemini healthy?" state with exponential backoff.
+
+When Gemini is down or rate-limiting, every agent run waits for the
+failure and then its fallback explanation calls Gemini again. After
+LLM_FAILURE_THRESHOLD consecutive failures this breaker opens: callers
+skip Gemini and go straight to their template fallback. Once the
+backoff window passes, exactly one request is let through as a probe;
+its success closes the breaker, its failure doubles the backoff (up
+to LLM_BACKOFF_MAX seconds). Every caller let through must end with
+record_success(), record_failure() or, if it was cancelled before
+Gemini answered, release_probe(); otherwise the probe stays taken and
+the breaker never closes.
+"""
+
+import threading
+import time
+
+from backend.config.settings import settings
+
+
+class LLMHealth:
+    def __init__(
+        self, failure_threshold: int = 2, base_backoff: float = 5,
+        max_backoff: float = 300,
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.open_until = 0.0
+        self.skipped = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    def allow_request(self) -> bool:
+        """
+        True if the caller may call Gemini. While the breaker is open
+        this returns True to a single probe caller per backoff window.
+        """
+        with self._lock:
+            if not self.is_open:
+                return True
+            if time.time() >= self.open_until and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.skipped += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.is_open:
+                exponent = self.failures - self.failure_threshold
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** exponent)
+                self.open_until = time.time() + backoff
+
+    def release_probe(self):
+        """
+        Hand back a probe that ended without a verdict (its caller was
+        cancelled): the breaker stays as it was and the next caller
+        may probe instead.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "healthy": not self.is_open,
+                "consecutive_failures": self.failures,
+                "retry_in_seconds": round(max(0.0, self.open_until - time.time()), 1),
+                "skipped_calls": self.skipped,
+            }
+
+
+# Global instance shared by agents, intent detection and explanations
+llm_health = LLMHealth(
+    failure_threshold=settings.LLM_FAILURE_THRESHOLD,
+    base_backoff=settings.LLM_BACKOFF_BASE,
+    max_backoff=settings.LLM_BACKOFF_MAX,
+)
@@ -12,6 +12,97 @@ class Settings(BaseSettings):
     JWT_SECRET: str = "agrichain_secret_key_change_in_prod"
     DATABASE_URL: str = "sqlite:///./agrichain.db"
 
+    # Agent response cache
+    CACHE_DEFAULT_TTL: int = 300
+    CACHE_MAX_ENTRIES: int = 2000
+    CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    CACHE_SWEEP_INTERVAL: float = 60
+    CACHE_NAMESPACE_TTLS: dict[str, int] = {
+        "harvest": 300,
+        "market": 300,
+        "spoilage": 180,
+        "preservation": 1800,
+        "chat": 300,
+    }
+    # Coordinates in cache keys are snapped to this grid (0.05° ≈ 5 km)
+    CACHE_GEO_CELL_DEG: float = 0.05
+    # Cached payloads at least this big are also kept gzip-compressed
+    CACHE_GZIP_MIN_BYTES: int = 1024
+    # Shared second tier under the in-process LRU: "sqlite", "redis" or "memory"
+    CACHE_BACKEND: str = "sqlite"
+    CACHE_SQLITE_PATH: str = "./agent_cache.db"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    # Failed (fallback) agent answers are cached this briefly per request key
+    NEGATIVE_CACHE_TTL: int = 30
+
+    # Generated explanations, keyed on their normalized context; kept
+    # on disk by default even when CACHE_BACKEND is "memory"
+    EXPLANATION_CACHE_TTL: int = 7 * 24 * 3600
+    EXPLANATION_CACHE_MAX_ENTRIES: int = 5000
+    EXPLANATION_CACHE_BACKEND: str = "sqlite"
+    EXPLANATION_CACHE_PATH: str = "./explanation_cache.db"
+    # Contexts packed into one Gemini request by the batch explanation API
+    EXPLANATION_BATCH_SIZE: int = 20
+
+    # Job API: worker pool size, how long finished jobs are kept, and
+    # after how long a "running" job (its worker died) is retried
+    JOB_WORKERS: int = 4
+    JOB_RETENTION_SECONDS: int = 24 * 3600
+    JOB_STALE_SECONDS: int = 600
+    JOB_MAX_ATTEMPTS: int = 3
+
+    # Agent execution: "react" (LangGraph tool-calling loop) or
+    # "prefetch" (tools run concurrently up front, one Gemini turn;
+    # opt in per deployment or per request)
+    AGENT_MODE: str = "react"
+    # Wall-clock budget per agent run in seconds (0 = none); a run cut
+    # off returns the tool results it already had, flagged "partial"
+    AGENT_DEADLINES: dict[str, float] = {
+        "harvest": 20,
+        "market": 20,
+        "spoilage": 12,
+        "preservation": 15,
+    }
+
+    # Harvest scoring: "agent" (Gemini ReAct loop) or "fast" (direct
+    # pipeline, exact score, one optional LLM call for the explanation)
+    HARVEST_SCORING_MODE: str = "agent"
+
+    # Intent detection: the local classifier decides when its confidence
+    # is at least this, Gemini is asked below it (above 1 = always Gemini)
+    INTENT_CONFIDENCE_THRESHOLD: float = 0.75
+    # Most agents one compound /chat question is fanned out to
+    MAX_CHAT_INTENTS: int = 3
+    # /chat routing with react agents: "two_stage" (intent call, then
+    # the agent) or "single_call" (one call picks the intent and runs
+    # the agent's first tools)
+    ROUTING_MODE: str = "two_stage"
+    # Fetch the farmer's weather while the intent is being classified
+    SPECULATIVE_PREFETCH: bool = True
+
+    # Build agents and LLM clients at startup; /ready is 503 until done
+    WARMUP_ENABLED: bool = True
+
+    # Gemini health breaker
+    LLM_FAILURE_THRESHOLD: int = 2
+    LLM_BACKOFF_BASE: float = 5
+    LLM_BACKOFF_MAX: float = 300
+
+    # LLM backend: "gemini", "fake" (deterministic, offline), "record"
+    # (Gemini, saved to LLM_CASSETTE_PATH) or "replay" (cassette only)
+    LLM_BACKEND: str = "gemini"
+    LLM_CASSETTE_PATH: str = "./llm_cassette.jsonl"
+    # Latency added to every LLM call, e.g. to make fake runs realistic
+    LLM_LATENCY_MS: float = 0
+    LLM_LATENCY_JITTER_MS: float = 0
+
+    # Shared Gemini gateway: concurrent calls, requests and tokens per
+    # minute (0 = unlimited), and the answer size assumed per call
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_RPM: int = 15
+    LLM_TPM: int = 1_000_000
+    LLM_OUTPUT_TOKEN_ESTIMATE: int = 512
+
     class Config:
         env_file = ".env"
 
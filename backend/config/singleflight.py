@@ -0,0 +1,45 @@
+"""
+singleflight.py — Coalesce identical in-flight async computations.
+
+When many farmers send the same request at once, only the first one
+starts the (slow) agent run; everyone else with the same key awaits
+that run and receives its result.
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: dict = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn) -> tuple:
+        """
+        Run fn() once per key at a time.
+
+        fn is a zero-arg callable returning an awaitable. Returns
+        (result, shared) where shared is True if this caller joined
+        a computation started by another request. Exceptions are
+        propagated to every waiter.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+
+        # shield: a client disconnect must not cancel the shared run
+        result = await asyncio.shield(task)
+        return result, shared
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+# Global instance shared by the agent endpoints
+agent_flight = SingleFlight()
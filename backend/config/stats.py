@@ -15,6 +15,8 @@ class RequestStats:
             "success": 0,
             "error": 0,
             "cache_hit": 0,
+            "coalesced": 0,
+            "stale_hit": 0,
             "by_agent": {
                 "harvest": 0,
                 "market": 0,
@@ -25,7 +27,10 @@ class RequestStats:
             },
         }
 
-    def record(self, agent: str, success: bool, cached: bool = False):
+    def record(
+        self, agent: str, success: bool, cached: bool = False,
+        coalesced: bool = False, stale: bool = False,
+    ):
         self.counts["total"] += 1
         if success:
             self.counts["success"] += 1
@@ -33,6 +38,10 @@ class RequestStats:
             self.counts["error"] += 1
         if cached:
             self.counts["cache_hit"] += 1
+        if coalesced:
+            self.counts["coalesced"] += 1
+        if stale:
+            self.counts["stale_hit"] += 1
         if agent in self.counts["by_agent"]:
             self.counts["by_agent"][agent] += 1
 
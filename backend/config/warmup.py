@@ -0,0 +1,183 @@
+"""
+warmup.py — Build at startup what the first request would otherwise pay for.
+
+The agent graphs, the chat models and some data files are built lazily,
+so the first request on a fresh worker used to pay for client
+construction, LangGraph compilation and the TLS handshake to Gemini (a
+p99 spike after every deploy or scale-out). main.py starts warmup.run()
+in the background at startup:
+
+- imports: the agent, LangChain and Gemini client modules
+- data: the JSON data files (mandis, soil, spoilage, preservation)
+- agents.*: the four LangGraph agents
+- llm.*: the answer, intent and explanation chat models
+- connect.*: one count_tokens call per Gemini model, which opens its
+  connection without generating anything (skipped for fake/replay)
+
+Each step is timed and a failing step is recorded in errors. Without
+a GOOGLE_API_KEY (Gemini backends) the agent, llm and connect steps
+cannot build anything and are skipped, since requests fall back to
+templates then anyway. imports, data and the agent builds are required:
+if one of them fails the worker is not healthy, as every agent request
+would fail or rebuild on the request path. A failed llm or connect step
+only costs the first request its latency.
+
+GET /ready answers 503 until every step has run, and keeps answering
+503 while a required step has failed.
+"""
+
+import asyncio
+import os
+import time
+
+from backend.config.settings import settings
+
+
+# ─── Steps ───────────────────────────────────────────────────
+
+# Steps whose failure leaves the worker unhealthy (exact names or
+# "prefix.")
+REQUIRED_STEPS = ("imports", "data", "agents.")
+
+
+def is_required(step: str) -> bool:
+    return any(
+        step.startswith(name) if name.endswith(".") else step == name
+        for name in REQUIRED_STEPS
+    )
+
+
+def _llm_configured() -> bool:
+    """Whether chat_model() can build a model in this configuration."""
+    from backend.config.llm_factory import llm_backend
+
+    return llm_backend() in ("fake", "replay") or bool(
+        os.getenv("GOOGLE_API_KEY")
+    )
+
+
+def _load_data():
+    from backend.tools import mandi, preservation, soil, spoilage  # noqa: F401
+    from backend.tools.distance import _load_spoilage_data
+
+    _load_spoilage_data()
+
+
+def _agent_steps() -> list:
+    from backend.agents.harvest_agent import get_harvest_agent
+    from backend.agents.market_agent import get_market_agent
+    from backend.agents.spoilage_agent import get_spoilage_agent
+    from backend.agents.preservation_agent import get_preservation_agent
+
+    return [
+        ("agents.harvest", get_harvest_agent),
+        ("agents.market", get_market_agent),
+        ("agents.spoilage", get_spoilage_agent),
+        ("agents.preservation", get_preservation_agent),
+    ]
+
+
+def _llm_steps() -> list:
+    from backend.agents.runner import get_answer_llm
+    from backend.orchestrator.router import _intent_llm
+    from backend.tools.explanation import get_llm
+
+    return [
+        ("llm.answer", get_answer_llm),
+        ("llm.intent", _intent_llm),
+        ("llm.explanation", get_llm),
+    ]
+
+
+def _connect(get_model):
+    """Open a Gemini model's connection with a free count_tokens call."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    def connect():
+        model = get_model()
+        if isinstance(model, ChatGoogleGenerativeAI):
+            model.get_num_tokens("warm-up")
+
+    return connect
+
+
+# ─── Warm-up ─────────────────────────────────────────────────
+
+class WarmUp:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.state = "pending"  # pending -> running -> done
+        self.timings: dict = {}
+        self.errors: dict = {}
+        self.skipped: list = []
+        self.total_seconds = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        """No required step has failed."""
+        return not any(is_required(name) for name in self.errors)
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "done" and self.healthy
+
+    def _steps(self) -> list:
+        if not _llm_configured():
+            self.skipped = ["agents.*", "llm.*", "connect.*"]
+            print("Warm-up: no GOOGLE_API_KEY, skipping agents and LLM clients")
+            return [("data", _load_data)]
+        llm_steps = _llm_steps()
+        return [
+            ("data", _load_data),
+            *_agent_steps(),
+            *llm_steps,
+            *(
+                (name.replace("llm.", "connect."), _connect(get_model))
+                for name, get_model in llm_steps
+            ),
+        ]
+
+    async def run(self):
+        """Run every step in a worker thread (the server keeps
+        answering /health meanwhile), then mark the warm-up done."""
+        if not self.enabled:
+            self.state = "done"
+            return
+        self.state = "running"
+        started = time.monotonic()
+        steps = await self._run_step("imports", self._steps) or []
+        for name, step in steps:
+            await self._run_step(name, step)
+        self.total_seconds = time.monotonic() - started
+        self.state = "done"
+        print(
+            f"Warm-up done in {self.total_seconds * 1000:.0f} ms "
+            f"({len(self.errors)} failed steps)"
+        )
+
+    async def _run_step(self, name: str, step):
+        started = time.monotonic()
+        try:
+            return await asyncio.to_thread(step)
+        except Exception as e:
+            print(f"Warm-up {name} error: {e}")
+            self.errors[name] = str(e)
+        finally:
+            self.timings[name] = time.monotonic() - started
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "total_ms": round(1000 * self.total_seconds, 1),
+            "steps_ms": {
+                name: round(1000 * seconds, 1)
+                for name, seconds in self.timings.items()
+            },
+            "errors": dict(self.errors),
+            "skipped": list(self.skipped),
+            "healthy": self.healthy,
+        }
+
+
+# Global instance — started by backend/main.py on startup
+warmup = WarmUp(enabled=settings.WARMUP_ENABLED)
@@ -1,9 +1,19 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.models.database import create_tables
 from backend.api import auth, user, harvest, market, spoilage, preservation, chat, middleware, voice
+from backend.api import cache, jobs
 from backend.config.stats import stats
+from backend.config.cache import agent_cache
+from backend.config.llm_health import llm_health
+from backend.config.llm_gateway import llm_gateway
+from backend.config.warmup import warmup
+from backend.orchestrator.router import intent_stats
+from backend.tools.memo import memo_stats
+from backend.tools.weather import prefetch_stats
 
 app = FastAPI(
     title="AgriChain API",
@@ -30,12 +40,23 @@ app.include_router(preservation.router, prefix="/api/v1")
 app.include_router(chat.router, prefix="/api/v1")
 app.include_router(middleware.router, prefix="/api/v1")
 app.include_router(voice.router, prefix="/api/v1")
+app.include_router(cache.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
 
 
 # ── Startup event ───────────────────────────────────────────────────────────
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    await jobs.job_queue.start()
+    # Build agents and LLM clients in the background; /ready waits for it
+    app.state.warmup_task = asyncio.ensure_future(warmup.run())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.warmup_task.cancel()
+    await jobs.job_queue.stop()
 
 
 # ── Root endpoint ───────────────────────────────────────────────────────────
@@ -48,4 +69,17 @@ async def root():
 @app.get("/api/v1/stats")
 async def get_stats():
     """Get server request statistics."""
-    return {"success": True, "data": stats.get_summary()}
+    return {
+        "success": True,
+        "data": {
+            **stats.get_summary(),
+            "cache": agent_cache.stats(),
+            "tool_memo": memo_stats(),
+            "llm_health": llm_health.status(),
+            "llm_gateway": llm_gateway.stats(),
+            "jobs": jobs.job_queue.stats(),
+            "warmup": warmup.status(),
+            "intent": intent_stats(),
+            "weather_prefetch": prefetch_stats(),
+        },
+    }
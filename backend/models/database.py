@@ -80,6 +80,24 @@ class Notification(Base):
     user = relationship("User", back_populates="notifications")
 
 
+class AgentJob(Base):
+    """A queued agent request (see backend/api/jobs.py)."""
+
+    __tablename__ = "agent_jobs"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    agent = Column(String, nullable=False)
+    dedup_key = Column(String, nullable=False, index=True)
+    request = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
 # ── Helpers ─────────────────────────────────────────────────────────────────
 
 def create_tables():
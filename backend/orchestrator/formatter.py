@@ -1,49 +1,112 @@
 """
 formatter.py — Structured response formatting for all agent types.
 
-Parses agent text output into structured dicts for mobile app consumption.
+Builds structured dicts for mobile app consumption from the exact tool
+results the agents return (score, pocket cash, remaining hours, ...).
+The agent's prose is only parsed when a result carries none, as with
+template fallbacks.
+
+A compound chat question answered by several agents is formatted part
+by part and merged into one "multi_intent" response.
 """
 
 import re
 
 
-def format_harvest_response(raw_explanation: str, user_data: dict) -> dict:
-    score_match = re.search(r"(\d{1,3})/100", raw_explanation)
-    score = int(score_match.group(1)) if score_match else 65
+def format_harvest_response(
+    raw_explanation: str, user_data: dict, score: dict | None = None
+) -> dict:
+    """
+    score is the exact compute_harvest_score result taken from the
+    run's tool results, in every mode (fast, prefetch, react, stream).
+    Only when no score tool completed (a failed or cut-off run) is the
+    score read from the prose.
+    """
+    if score is not None:
+        value = score["score"]
+    else:
+        score_match = re.search(r"(\d{1,3})/100", raw_explanation)
+        value = int(score_match.group(1)) if score_match else 65
 
-    if score >= 80:
+    if value >= 80:
         color, action = "green", "harvest_now"
-    elif score >= 50:
+    elif value >= 50:
         color, action = "yellow", "wait"
     else:
         color, action = "red", "do_not_harvest"
 
-    return {
+    formatted = {
         "type": "harvest_score",
-        "score": score,
+        "score": value,
         "color": color,
         "action": action,
         "explanation_text": raw_explanation,
         "crop": user_data.get("crop"),
         "show_voice_button": True,
     }
+    if score is not None:
+        formatted["recommendation"] = score["recommendation"]
+        formatted["breakdown"] = score["breakdown"]
+    return formatted
 
 
-def format_market_response(raw_explanation: str, user_data: dict) -> dict:
-    return {
+def _mandi_rows(ranked: list) -> list:
+    return [
+        {
+            "rank": rank,
+            "name": m.get("mandi_name"),
+            "price_per_kg": m.get("price_per_kg"),
+            "distance_km": m.get("distance_km"),
+            "fuel_cost": m.get("fuel_cost"),
+            "spoilage_pct": m.get("spoilage_pct"),
+            "spoilage_loss": m.get("spoilage_loss_rupees"),
+            "gross_revenue": m.get("gross_revenue"),
+            "pocket_cash": m.get("pocket_cash"),
+            "risk_level": m.get("risk_level"),
+        }
+        for rank, m in enumerate(ranked, start=1)
+    ]
+
+
+def format_market_response(
+    raw_explanation: str, user_data: dict, mandis: list | None = None
+) -> dict:
+    """
+    mandis is the agent's pocket cash ranking (best first), as
+    calculate_pocket_cash returned it; the ranked table is built
+    from it.
+    """
+    formatted = {
         "type": "market_comparison",
         "explanation_text": raw_explanation,
         "crop": user_data.get("crop"),
         "volume_kg": user_data.get("volume_kg"),
         "show_voice_button": True,
     }
+    if mandis:
+        formatted["mandis"] = _mandi_rows(mandis)
+        formatted["overall_recommendation"] = (
+            f"Sell at {mandis[0].get('mandi_name')} for best net returns."
+        )
+    return formatted
 
 
-def format_spoilage_response(raw_explanation: str, user_data: dict) -> dict:
-    hours_match = re.search(
-        r"(\d+\.?\d*)\s*hours?", raw_explanation, re.IGNORECASE
-    )
-    remaining = float(hours_match.group(1)) if hours_match else 24
+def format_spoilage_response(
+    raw_explanation: str, user_data: dict,
+    spoilage: dict | None = None, heatwave: dict | None = None,
+) -> dict:
+    """
+    spoilage and heatwave are the agent's check_crop_spoilage and
+    check_heatwave results. Without them the remaining hours and the
+    alert are read from the prose.
+    """
+    if spoilage is not None:
+        remaining = float(spoilage["remaining_hours"])
+    else:
+        hours_match = re.search(
+            r"(\d+\.?\d*)\s*hours?", raw_explanation, re.IGNORECASE
+        )
+        remaining = float(hours_match.group(1)) if hours_match else 24
 
     if remaining > 48:
         color, urgency = "green", "safe"
@@ -52,12 +115,18 @@ def format_spoilage_response(raw_explanation: str, user_data: dict) -> dict:
     else:
         color, urgency = "red", "urgent"
 
-    has_alert = any(
-        w in raw_explanation.lower()
-        for w in ["alert", "⚠️", "heatwave", "warning"]
-    )
+    if spoilage is not None or heatwave is not None:
+        has_alert = bool(
+            (heatwave or {}).get("alert")
+            or (spoilage or {}).get("heatwave_alert")
+        )
+    else:
+        has_alert = any(
+            w in raw_explanation.lower()
+            for w in ["alert", "⚠️", "heatwave", "warning"]
+        )
 
-    return {
+    formatted = {
         "type": "spoilage_timer",
         "remaining_hours": remaining,
         "remaining_days": round(remaining / 24, 1),
@@ -68,20 +137,88 @@ def format_spoilage_response(raw_explanation: str, user_data: dict) -> dict:
         "explanation_text": raw_explanation,
         "show_voice_button": True,
     }
+    if spoilage is not None:
+        formatted["risk_level"] = spoilage.get("risk_level")
+        formatted["spoilage_pct"] = spoilage.get("spoilage_pct")
+        formatted["total_safe_hours"] = spoilage.get("total_safe_hours")
+        if "projected_if_heatwave" in spoilage:
+            formatted["remaining_hours_if_heatwave"] = (
+                spoilage["projected_if_heatwave"]
+            )
+    return formatted
 
 
-def format_preservation_response(raw_explanation: str, user_data: dict) -> dict:
-    return {
+def _preservation_methods(options: list, benefits: list) -> list:
+    """Options in their ROI order (free first), each with its benefit
+    numbers when the agent worked them out."""
+    by_method = {b.get("new_method"): b for b in benefits}
+    if not options:
+        options = [{"id": method} for method in by_method]
+    methods = []
+    for option in options:
+        method = dict(option)
+        benefit = by_method.get(option.get("id"))
+        if benefit is not None:
+            method.update(
+                extra_hours_gained=benefit.get("extra_hours_gained"),
+                new_remaining_hours=benefit.get("new_remaining_hours"),
+                roi=benefit.get("roi"),
+                worth_it=benefit.get("recommendation") == "Worth it",
+            )
+            method.setdefault("cost_rupees", benefit.get("cost_rupees"))
+            method.setdefault("saves_rupees", benefit.get("value_saved_rupees"))
+        methods.append(method)
+    return methods
+
+
+def format_preservation_response(
+    raw_explanation: str, user_data: dict,
+    current_freshness: dict | None = None,
+    options: list | None = None, benefits: list | None = None,
+) -> dict:
+    """
+    current_freshness, options and benefits are the agent's tool
+    results; the ranked method list is built from them.
+    """
+    formatted = {
         "type": "preservation_list",
         "explanation_text": raw_explanation,
         "crop": user_data.get("crop"),
         "current_storage": user_data.get("storage_method"),
         "show_voice_button": True,
     }
+    if current_freshness is not None:
+        formatted["current_remaining_hours"] = (
+            current_freshness.get("remaining_hours")
+        )
+    if options or benefits:
+        formatted["methods"] = _preservation_methods(
+            options or [], benefits or []
+        )
+    return formatted
+
+
+# Structured agent result fields each formatter accepts
+STRUCTURED_FIELDS = {
+    "HARVEST": ("score",),
+    "MARKET": ("mandis",),
+    "SPOILAGE": ("spoilage", "heatwave"),
+    "PRESERVATION": ("current_freshness", "options", "benefits"),
+}
+
+
+def structured_fields(intent: str, result: dict) -> dict:
+    """The structured fields of an agent result for intent's formatter."""
+    return {
+        name: result[name]
+        for name in STRUCTURED_FIELDS.get(intent, STRUCTURED_FIELDS["HARVEST"])
+        if result.get(name) is not None
+    }
 
 
 def format_response(
-    intent: str, raw_explanation: str, user_data: dict
+    intent: str, raw_explanation: str, user_data: dict,
+    structured: dict | None = None,
 ) -> dict:
     formatters = {
         "HARVEST": format_harvest_response,
@@ -90,5 +227,35 @@ def format_response(
         "PRESERVATION": format_preservation_response,
     }
     formatter = formatters.get(intent, format_harvest_response)
-    formatted = formatter(raw_explanation, user_data)
+    formatted = formatter(raw_explanation, user_data, **(structured or {}))
     return {"success": True, "data": formatted}
+
+
+def format_multi_response(parts: list, user_data: dict) -> dict:
+    """
+    parts: one orchestration result per intent ({"intent", "response",
+    "structured"}), in the order the farmer asked. Each is formatted
+    by format_response into "sections"; the explanations are joined
+    for the voice button.
+    """
+    sections = []
+    for part in parts:
+        section = format_response(
+            part["intent"], part["response"], user_data,
+            structured=part.get("structured"),
+        )["data"]
+        section["intent"] = part["intent"]
+        sections.append(section)
+    return {
+        "success": True,
+        "data": {
+            "type": "multi_intent",
+            "intents": [part["intent"] for part in parts],
+            "sections": sections,
+            "explanation_text": "\n\n".join(
+                section["explanation_text"] for section in sections
+            ),
+            "crop": user_data.get("crop"),
+            "show_voice_button": True,
+        },
+    }
@@ -0,0 +1,240 @@
+"""
+intent_classifier.py — Local intent classifier in front of Gemini.
+
+A multinomial naive Bayes model trained at import from
+data/intent_examples.json: labelled messages in English, Hinglish,
+Hindi and Marathi, plus a keyword list per intent. Its features are the
+words and word bigrams of a message (stopwords dropped) and one "=LABEL"
+feature per intent whose keywords appear in it, a keyword matching as a
+word prefix ("bech" matches "bechu", "bechna"). The keyword features
+are shared by every phrasing of an intent, so they carry most of the
+weight on the small training set. Classifying a message takes tens of
+microseconds, so detect_intent only asks Gemini when the local
+confidence is below INTENT_CONFIDENCE_THRESHOLD.
+
+classify_intents splits a compound question ("my tomatoes are ready,
+where should I sell and how long will they last?") into clauses and
+classifies each question clause on its own, so the orchestrator can
+run one agent per intent.
+
+Run this module for an offline benchmark: leave-one-out accuracy over
+the examples and the router's sample messages, how many messages clear
+the threshold, and per-message latency.
+
+    python -m backend.orchestrator.intent_classifier
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+
+DATA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "data", "intent_examples.json"
+)
+
+# Word characters plus the Devanagari block (its vowel signs are not
+# \w), minus the danda punctuation marks
+TOKEN = re.compile(r"[\w\u0900-\u0963\u0966-\u097f]+")
+SMOOTHING = 1.0
+
+# A clause ends at punctuation (its mark tells if it was asked) ...
+CLAUSE = re.compile(r"([^?.!;,।]+)([?.!;,।]?)")
+# ... or at a conjunction joining two questions
+CONJUNCTION = re.compile(
+    r"\s(?:and|also|then|plus|aur|phir|ani|और|तथा|फिर|आणि)\s", re.IGNORECASE
+)
+
+
+def _load_data() -> dict:
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class IntentClassifier:
+    def __init__(
+        self, examples: dict, keywords: dict, stopwords=(), question_words=(),
+    ):
+        """
+        examples: {label: [message, ...]}
+        keywords: {label: [keyword, ...]}
+        """
+        self.labels = sorted(examples)
+        # First word of each keyword -> [(label, remaining words)]
+        self.keyword_index = {}
+        for label, words in keywords.items():
+            for keyword in words:
+                first, *rest = keyword.lower().split()
+                self.keyword_index.setdefault(first, []).append((label, rest))
+        self.prefix_lengths = sorted({len(first) for first in self.keyword_index})
+        self.stopwords = set(stopwords)
+        self.question_words = set(question_words)
+        total = sum(len(messages) for messages in examples.values())
+        self.log_prior = {}
+        self.log_likelihood = {}
+        self.log_unseen = {}
+        counts = {}
+        for label in self.labels:
+            counts[label] = Counter(
+                f for message in examples[label] for f in self.features(message)
+            )
+            self.log_prior[label] = math.log(len(examples[label]) / total)
+        self.vocabulary = set().union(*counts.values())
+        for label, counter in counts.items():
+            denominator = sum(counter.values()) + SMOOTHING * len(self.vocabulary)
+            self.log_likelihood[label] = {
+                f: math.log((n + SMOOTHING) / denominator)
+                for f, n in counter.items()
+            }
+            self.log_unseen[label] = math.log(SMOOTHING / denominator)
+
+    def _keyword_labels(self, words: list) -> set:
+        """Labels with a keyword whose words prefix consecutive words."""
+        labels = set()
+        for i, word in enumerate(words):
+            for n in self.prefix_lengths:
+                if n > len(word):
+                    break
+                for label, rest in self.keyword_index.get(word[:n], ()):
+                    following = words[i + 1:i + 1 + len(rest)]
+                    if len(following) == len(rest) and all(
+                        w.startswith(part) for w, part in zip(following, rest)
+                    ):
+                        labels.add(label)
+        return labels
+
+    def features(self, message: str) -> list:
+        """Keyword features, then words and bigrams without stopwords."""
+        words = TOKEN.findall(message.lower())
+        feats = [f"={label}" for label in sorted(self._keyword_labels(words))]
+        words = [w for w in words if w not in self.stopwords]
+        feats += words
+        feats += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return feats
+
+    def classify(self, message: str) -> tuple:
+        """
+        (label, confidence): the most likely label and its posterior
+        probability. Confidence is 0.0 when nothing in the message was
+        seen in training.
+        """
+        known = [f for f in self.features(message) if f in self.vocabulary]
+        scores = {}
+        for label in self.labels:
+            likelihood = self.log_likelihood[label]
+            unseen = self.log_unseen[label]
+            scores[label] = self.log_prior[label] + sum(
+                likelihood.get(f, unseen) for f in known
+            )
+        best = max(self.labels, key=scores.get)
+        if not known:
+            return best, 0.0
+        top = scores[best]
+        total = sum(math.exp(score - top) for score in scores.values())
+        return best, 1.0 / total
+
+    def questions(self, message: str) -> list:
+        """The clauses of message that ask something (end with "?" or
+        hold a question word); statements like "I harvested 6 hours
+        ago." only give context."""
+        found = []
+        for text, mark in CLAUSE.findall(message):
+            parts = CONJUNCTION.split(text)
+            for i, part in enumerate(parts):
+                asked = mark == "?" and i == len(parts) - 1
+                words = TOKEN.findall(part.lower())
+                if words and (asked or self.question_words.intersection(words)):
+                    found.append(part.strip())
+        return found
+
+    def classify_all(self, message: str, threshold: float) -> list:
+        """Distinct labels of the question clauses classified with at
+        least threshold confidence, in the order they were asked."""
+        labels = []
+        for clause in self.questions(message):
+            label, confidence = self.classify(clause)
+            if confidence >= threshold and label not in labels:
+                labels.append(label)
+        return labels
+
+
+def load_classifier(examples: dict | None = None) -> IntentClassifier:
+    """The classifier trained on the shipped data (or other examples
+    with the shipped keywords and word lists)."""
+    data = _load_data()
+    return IntentClassifier(
+        examples if examples is not None else data["examples"],
+        data["keywords"],
+        data["stopwords"],
+        data["question_words"],
+    )
+
+
+# Global instance — trained once at import (a few milliseconds)
+intent_classifier = load_classifier()
+
+
+def classify_intent(message: str) -> tuple:
+    """(intent, confidence) from the local model."""
+    return intent_classifier.classify(message)
+
+
+def classify_intents(message: str, threshold: float) -> list:
+    """Every intent a compound question asks about (see classify_all)."""
+    return intent_classifier.classify_all(message, threshold)
+
+
+if __name__ == "__main__":
+    import time
+
+    from backend.config.settings import settings
+    from backend.orchestrator.router import SAMPLE_MESSAGES
+
+    threshold = settings.INTENT_CONFIDENCE_THRESHOLD
+    examples = _load_data()["examples"]
+    labelled = [
+        (message, label)
+        for label, messages in examples.items()
+        for message in messages
+    ]
+
+    def held_out(message: str, label: str) -> IntentClassifier:
+        return load_classifier({
+            name: [m for m in messages if not (name == label and m == message)]
+            for name, messages in examples.items()
+        })
+
+    def report(title: str, cases: list):
+        correct = confident = confident_correct = 0
+        for message, label in cases:
+            predicted, confidence = held_out(message, label).classify(message)
+            correct += predicted == label
+            if confidence >= threshold:
+                confident += 1
+                confident_correct += predicted == label
+        n = len(cases)
+        print(f"{title}: {n} messages")
+        print(f"  accuracy (leave-one-out):   {correct / n:.1%}")
+        print(f"  confident (>= {threshold}):      {confident / n:.1%}")
+        if confident:
+            print(f"  accuracy when confident:    {confident_correct / confident:.1%}")
+
+    print("=== Intent Classifier Benchmark ===")
+    report("Labelled examples", labelled)
+    report("Router sample messages", list(SAMPLE_MESSAGES.items()))
+
+    messages = [message for message, _ in labelled]
+    rounds = 200
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            classify_intent(message)
+    elapsed = time.perf_counter() - started
+    print(f"Latency: {elapsed / (rounds * len(messages)) * 1e6:.1f} µs per message")
+
+    print("\nRouter samples (full model):")
+    for message, label in SAMPLE_MESSAGES.items():
+        predicted, confidence = classify_intent(message)
+        mark = "✅" if predicted == label else "❌"
+        print(f"  {mark} '{message}' → {predicted} ({confidence:.2f})")
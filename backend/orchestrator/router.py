@@ -3,122 +3,443 @@ router.py — Intent detection and agent routing orchestrator.
 
 Classifies farmer messages and routes them to the appropriate agent.
 Single entry point for the /chat endpoint.
+
+Intent detection tries the local classifier (intent_classifier.py)
+first; Gemini is only asked when its confidence is below
+INTENT_CONFIDENCE_THRESHOLD, and the local guess is used when Gemini
+is unavailable.
+
+While the intent is being classified, the weather for the farmer's
+location is already being fetched (SPECULATIVE_PREFETCH): whichever
+agent is chosen gets it from weather.prefetch_weather instead of
+calling the API itself.
+
+A compound question ("where should I sell and how long will it
+last?") is fanned out: every intent the classifier finds in its
+question clauses gets its own agent, all running concurrently, and
+the result carries one part per intent (formatter.format_multi_response
+merges them).
 """
 
-import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.agents.harvest_agent import (
+    run_harvest_agent,
+    arun_harvest_agent,
+    astream_harvest_agent,
+)
+from backend.agents.market_agent import (
+    run_market_agent,
+    arun_market_agent,
+    astream_market_agent,
+)
+from backend.agents.spoilage_agent import (
+    run_spoilage_agent,
+    arun_spoilage_agent,
+    astream_spoilage_agent,
+)
+from backend.agents.preservation_agent import (
+    run_preservation_agent,
+    arun_preservation_agent,
+    astream_preservation_agent,
+)
+from backend.agents.runner import react_handoff
+from backend.config.llm_factory import chat_model
+from backend.config.llm_gateway import (
+    PRIORITY_HIGH,
+    llm_call,
+)
+from backend.config.llm_health import llm_health
+from backend.config.settings import settings
+from backend.orchestrator.formatter import structured_fields
+from backend.orchestrator.intent_classifier import (
+    classify_intent,
+    classify_intents,
+)
+from backend.tools.weather import prefetch_weather
+
+VALID_INTENTS = ["HARVEST", "MARKET", "SPOILAGE", "PRESERVATION"]
+
+AGENT_RUNNERS = {
+    "HARVEST": run_harvest_agent,
+    "MARKET": run_market_agent,
+    "SPOILAGE": run_spoilage_agent,
+    "PRESERVATION": run_preservation_agent,
+}
+
+ASYNC_AGENT_RUNNERS = {
+    "HARVEST": arun_harvest_agent,
+    "MARKET": arun_market_agent,
+    "SPOILAGE": arun_spoilage_agent,
+    "PRESERVATION": arun_preservation_agent,
+}
+
+STREAM_AGENT_RUNNERS = {
+    "HARVEST": astream_harvest_agent,
+    "MARKET": astream_market_agent,
+    "SPOILAGE": astream_spoilage_agent,
+    "PRESERVATION": astream_preservation_agent,
+}
+
+# Labelled sample messages (the __main__ checks and the classifier
+# benchmark)
+SAMPLE_MESSAGES = {
+    "Should I harvest today?": "HARVEST",
+    "When is the right time to pick my tomatoes?": "HARVEST",
+    "Where should I sell my crop?": "MARKET",
+    "Which mandi gives the best price?": "MARKET",
+    "I harvested 6 hours ago. How long will it last?": "SPOILAGE",
+    "My tomatoes are going bad, what do I do?": "SPOILAGE",
+    "How can I keep my crop fresh longer?": "PRESERVATION",
+    "What is the cheapest way to prevent rotting?": "PRESERVATION",
+}
+
+
+# ─── Intent Detection ────────────────────────────────────────
+
+_intent_model = None
+
+
+def _intent_llm():
+    global _intent_model
+    if _intent_model is None:
+        _intent_model = chat_model(temperature=0)
+    return _intent_model
+
+
+INTENT_DESCRIPTIONS = {
+    "HARVEST": (
+        "asking about when to harvest, crop readiness, "
+        "harvest timing, should I pick my crop, is it ready"
+    ),
+    "MARKET": (
+        "asking about where to sell, which mandi, "
+        "best price, selling, how much will I get, pocket cash"
+    ),
+    "SPOILAGE": (
+        "asking about freshness, how long will it "
+        "last, is my crop going bad, shelf life, rotting"
+    ),
+    "PRESERVATION": (
+        "asking about how to keep fresh, save "
+        "my crop, storage tips, prevent rotting, delay selling"
+    ),
+}
+
+
+def _intent_prompt(user_message: str) -> str:
+    categories = "".join(
+        f"{intent} — {description}\n"
+        for intent, description in INTENT_DESCRIPTIONS.items()
+    )
+    return (
+        "Classify this Indian farmer's message into exactly "
+        f"ONE category.\n\n{categories}\n"
+        f"Farmer's message: '{user_message}'\n\n"
+        "Reply with ONLY the category name in caps. Nothing else."
+    )
+
+
+def parse_intent(content: str) -> str:
+    """An LLM's intent answer as a VALID_INTENTS name (default HARVEST)."""
+    intent = content.strip().upper()
+    return intent if intent in VALID_INTENTS else "HARVEST"
+
 
-from backend.agents.harvest_agent import run_harvest_agent
-from backend.agents.market_agent import run_market_agent
-from backend.agents.spoilage_agent import run_spoilage_agent
-from backend.agents.preservation_agent import run_preservation_agent
+# Which path decided each intent: "local" (confident classifier),
+# "llm" (Gemini) or "fallback" (Gemini unavailable, local guess);
+# "multi" counts compound questions fanned out to several agents
+intent_counts = {"local": 0, "llm": 0, "fallback": 0, "multi": 0}
+
+
+def intent_stats() -> dict:
+    total = max(1, sum(
+        intent_counts[path] for path in ("local", "llm", "fallback")
+    ))
+    return {
+        **intent_counts,
+        "local_rate": round(intent_counts["local"] / total * 100, 1),
+        "threshold": settings.INTENT_CONFIDENCE_THRESHOLD,
+    }
+
+
+def local_intent(user_message: str) -> tuple:
+    """(intent, confident) from the local classifier; a confident
+    answer is counted as decided locally."""
+    intent, confidence = classify_intent(user_message)
+    if confidence >= settings.INTENT_CONFIDENCE_THRESHOLD:
+        intent_counts["local"] += 1
+        return intent, True
+    # Nothing recognised: same default as an unparseable LLM answer
+    return (intent if confidence > 0 else "HARVEST"), False
 
 
 def detect_intent(user_message: str) -> str:
     """Classify a farmer's message into one of 4 categories."""
+    guess, confident = local_intent(user_message)
+    if confident:
+        return guess
+    if not llm_health.allow_request():
+        intent_counts["fallback"] += 1
+        return guess
     try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0,
-            google_api_key=os.getenv("GOOGLE_API_KEY", ""),
-        )
-        prompt = (
-            "Classify this Indian farmer's message into exactly "
-            "ONE category.\n\n"
-            "HARVEST — asking about when to harvest, crop readiness, "
-            "harvest timing, should I pick my crop, is it ready\n"
-            "MARKET — asking about where to sell, which mandi, "
-            "best price, selling, how much will I get, pocket cash\n"
-            "SPOILAGE — asking about freshness, how long will it "
-            "last, is my crop going bad, shelf life, rotting\n"
-            "PRESERVATION — asking about how to keep fresh, save "
-            "my crop, storage tips, prevent rotting, delay selling\n\n"
-            f"Farmer's message: '{user_message}'\n\n"
-            "Reply with ONLY the category name in caps. Nothing else."
-        )
-        response = llm.invoke(prompt)
-        intent = response.content.strip().upper()
-        valid = ["HARVEST", "MARKET", "SPOILAGE", "PRESERVATION"]
-        return intent if intent in valid else "HARVEST"
+        with llm_call("intent", PRIORITY_HIGH):
+            response = _intent_llm().invoke(_intent_prompt(user_message))
+        llm_health.record_success()
+        intent_counts["llm"] += 1
+        return parse_intent(response.content)
     except Exception as e:
         print(f"Intent detection error: {e}")
-        return "HARVEST"
+        llm_health.record_failure()
+        intent_counts["fallback"] += 1
+        return guess
 
 
-def route_to_agent(intent: str, user_data: dict) -> dict:
-    """Route to the correct agent based on detected intent."""
-    crop = user_data.get("crop", "tomato")
-    lat = user_data.get("lat", 21.1458)
-    lng = user_data.get("lng", 79.0882)
-    language = user_data.get("language", "hindi")
+async def adetect_intent(user_message: str) -> str:
+    """Async detect_intent (uses the LLM's ainvoke)."""
+    guess, confident = local_intent(user_message)
+    if confident:
+        return guess
+    if not llm_health.allow_request():
+        intent_counts["fallback"] += 1
+        return guess
+    try:
+        with llm_call("intent", PRIORITY_HIGH):
+            response = await _intent_llm().ainvoke(
+                _intent_prompt(user_message)
+            )
+        llm_health.record_success()
+        intent_counts["llm"] += 1
+        return parse_intent(response.content)
+    except Exception as e:
+        print(f"Intent detection error: {e}")
+        llm_health.record_failure()
+        intent_counts["fallback"] += 1
+        return guess
+
+
+def detect_intents(user_message: str) -> list:
+    """
+    The intents of a compound question, in the order asked (at most
+    MAX_CHAT_INTENTS), when the local classifier is confident about
+    more than one; otherwise [] and the message is routed to one agent.
+    """
+    intents = classify_intents(user_message, settings.INTENT_CONFIDENCE_THRESHOLD)
+    if len(intents) < 2:
+        return []
+    intent_counts["multi"] += 1
+    return intents[:settings.MAX_CHAT_INTENTS]
+
+
+# ─── Routing ─────────────────────────────────────────────────
+
+# Farmer details the agents fall back to when the request omits them
+USER_DEFAULTS = {
+    "crop": "tomato",
+    "lat": 21.1458,
+    "lng": 79.0882,
+    "language": "hindi",
+    "volume_kg": 500,
+    "current_temp_c": 35,
+    "storage_method": "open_floor",
+    "hours_since_harvest": 0,
+    "soil_type": "black",
+    "district": "Nagpur",
+}
+
+
+def with_defaults(user_data: dict) -> dict:
+    return {**USER_DEFAULTS, **user_data}
+
 
-    if intent == "HARVEST":
-        return run_harvest_agent(
+def _location(user_data: dict) -> tuple:
+    data = with_defaults(user_data)
+    return data["lat"], data["lng"]
+
+
+def _agent_args(intent: str, user_data: dict) -> tuple:
+    """Positional arguments for the agent that handles intent."""
+    data = with_defaults(user_data)
+    crop, lat, lng = data["crop"], data["lat"], data["lng"]
+    language = data["language"]
+
+    if intent == "MARKET":
+        return (
             crop,
+            data["volume_kg"],
             lat,
             lng,
-            user_data.get("soil_type", "black"),
-            user_data.get("district", "Nagpur"),
+            data["current_temp_c"],
+            data["storage_method"],
             language,
         )
-    elif intent == "MARKET":
-        return run_market_agent(
+    elif intent == "SPOILAGE":
+        return (
             crop,
-            user_data.get("volume_kg", 500),
+            data["storage_method"],
+            data["hours_since_harvest"],
             lat,
             lng,
-            user_data.get("current_temp_c", 35),
-            user_data.get("storage_method", "open_floor"),
             language,
         )
-    elif intent == "SPOILAGE":
-        return run_spoilage_agent(
+    elif intent == "PRESERVATION":
+        return (
             crop,
-            user_data.get("storage_method", "open_floor"),
-            user_data.get("hours_since_harvest", 0),
-            lat,
-            lng,
+            data["storage_method"],
+            data["current_temp_c"],
             language,
         )
-    elif intent == "PRESERVATION":
-        return run_preservation_agent(
+    elif intent == "HARVEST":
+        return (
             crop,
-            user_data.get("storage_method", "open_floor"),
-            user_data.get("current_temp_c", 35),
+            lat,
+            lng,
+            data["soil_type"],
+            data["district"],
             language,
         )
     else:
-        return run_harvest_agent(crop, lat, lng, "black", "Nagpur", language)
+        return (crop, lat, lng, "black", "Nagpur", language)
 
 
-def orchestrate(user_message: str, user_data: dict) -> dict:
-    """Main entry point: detect intent and route to agent."""
-    intent = detect_intent(user_message)
-    result = route_to_agent(intent, user_data)
+def route_to_agent(intent: str, user_data: dict) -> dict:
+    """Route to the correct agent based on detected intent."""
+    runner = AGENT_RUNNERS.get(intent, run_harvest_agent)
+    return runner(
+        *_agent_args(intent, user_data), mode=user_data.get("agent_mode")
+    )
+
+
+async def aroute_to_agent(intent: str, user_data: dict) -> dict:
+    """Async route_to_agent — awaits the agent's ainvoke path."""
+    runner = ASYNC_AGENT_RUNNERS.get(intent, arun_harvest_agent)
+    return await runner(
+        *_agent_args(intent, user_data), mode=user_data.get("agent_mode")
+    )
+
+
+def _orchestration_result(intent: str, result: dict) -> dict:
     return {
         "intent": intent,
         "response": result.get("explanation", ""),
         "agent_used": intent.lower(),
         "success": result.get("success", True),
+        "partial": result.get("partial", False),
+        "structured": structured_fields(intent, result),
     }
 
 
+def _multi_result(intents: list, results: list) -> dict:
+    """One orchestration result per intent under "parts"; the top-level
+    fields describe the first intent asked, as for a single intent."""
+    parts = [
+        _orchestration_result(intent, result)
+        for intent, result in zip(intents, results)
+    ]
+    return {
+        **parts[0],
+        "intents": intents,
+        "agent_used": ",".join(part["agent_used"] for part in parts),
+        "success": all(part["success"] for part in parts),
+        "partial": any(part["partial"] for part in parts),
+        "parts": parts,
+    }
+
+
+def _prefetch_context(user_data: dict):
+    """Weather for the farmer's location, fetched during routing."""
+    if not settings.SPECULATIVE_PREFETCH:
+        return contextlib.nullcontext()
+    return prefetch_weather(*_location(user_data))
+
+
+async def _aroute(user_message: str, user_data: dict) -> tuple:
+    """(intent, handoff for the agent's react run) per ROUTING_MODE."""
+    from backend.agents.runner import agent_mode
+
+    mode = agent_mode(user_data.get("agent_mode"))
+    if settings.ROUTING_MODE == "single_call" and mode == "react":
+        from backend.orchestrator.single_call import aroute_single_call
+
+        return await aroute_single_call(user_message, user_data)
+    return await adetect_intent(user_message), []
+
+
+def orchestrate(user_message: str, user_data: dict) -> dict:
+    """Main entry point: detect intent and route to agent."""
+    with _prefetch_context(user_data):
+        intents = detect_intents(user_message)
+        if intents:
+            # One thread per agent, each in a copy of this context so
+            # it sees the weather prefetch
+            with ThreadPoolExecutor(max_workers=len(intents)) as pool:
+                futures = [
+                    pool.submit(
+                        contextvars.copy_context().run,
+                        route_to_agent, intent, user_data,
+                    )
+                    for intent in intents
+                ]
+                results = [future.result() for future in futures]
+            return _multi_result(intents, results)
+        intent = detect_intent(user_message)
+        result = route_to_agent(intent, user_data)
+    return _orchestration_result(intent, result)
+
+
+async def aorchestrate(user_message: str, user_data: dict) -> dict:
+    """Async orchestrate — used by the /chat endpoint."""
+    with _prefetch_context(user_data):
+        intents = detect_intents(user_message)
+        if intents:
+            results = await asyncio.gather(*(
+                aroute_to_agent(intent, user_data) for intent in intents
+            ))
+            return _multi_result(intents, results)
+        intent, handoff = await _aroute(user_message, user_data)
+        with react_handoff(handoff):
+            result = await aroute_to_agent(intent, user_data)
+    return _orchestration_result(intent, result)
+
+
+async def astream_orchestrate(user_message: str, user_data: dict):
+    """
+    Streaming aorchestrate: yields ("intent", {...}) once the intent is
+    known, then the chosen agent's astream events.
+
+    A compound question is fanned out as in aorchestrate: after the
+    intent event its agents run concurrently and a single "answer"
+    event carries the whole result (with "parts"), so the stream and
+    /chat give the same answer under their shared cache key.
+    """
+    with _prefetch_context(user_data):
+        intents = detect_intents(user_message)
+        if intents:
+            yield "intent", {
+                "intent": intents[0], "intents": intents,
+                "agent_used": ",".join(intent.lower() for intent in intents),
+            }
+            results = await asyncio.gather(*(
+                aroute_to_agent(intent, user_data) for intent in intents
+            ))
+            yield "answer", _multi_result(intents, results)
+            return
+        intent = await adetect_intent(user_message)
+        yield "intent", {"intent": intent, "agent_used": intent.lower()}
+        runner = STREAM_AGENT_RUNNERS.get(intent, astream_harvest_agent)
+        async for event in runner(*_agent_args(intent, user_data)):
+            yield event
+
+
 if __name__ == "__main__":
     from dotenv import load_dotenv
 
     load_dotenv()
 
-    test_messages = [
-        "Should I harvest today?",
-        "When is the right time to pick my tomatoes?",
-        "Where should I sell my crop?",
-        "Which mandi gives the best price?",
-        "I harvested 6 hours ago. How long will it last?",
-        "My tomatoes are going bad, what do I do?",
-        "How can I keep my crop fresh longer?",
-        "What is the cheapest way to prevent rotting?",
-    ]
-
-    for msg in test_messages:
+    for msg, expected in SAMPLE_MESSAGES.items():
         intent = detect_intent(msg)
-        print(f"  '{msg}' → {intent}")
+        mark = "✅" if intent == expected else "❌"
+        print(f"  {mark} '{msg}' → {intent}")
@@ -0,0 +1,198 @@
+"""
+single_call.py — Intent routing merged into the agent's first turn.
+
+In the default two-stage flow a message the local classifier is unsure
+about costs one Gemini call for its label, then the chosen agent's
+ReAct loop starts with a call that only decides which tools to run.
+With ROUTING_MODE="single_call" (react agents only) those are one
+call: Gemini sees all four agents' tools, grouped by intent, and picks
+the intent by calling that agent's tools. The router runs those calls
+and hands the turn to the chosen agent (runner.react_handoff), whose
+loop continues from the tool results.
+
+Run this module to compare both flows on the router's sample messages
+(latency, LLM calls and tokens per message, Gemini asked every time):
+
+    AGENT_MODE=react LLM_BACKEND=fake LLM_LATENCY_MS=400 \\
+        python -m backend.orchestrator.single_call
+"""
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from backend.agents.harvest_agent import HARVEST_TOOLS
+from backend.agents.market_agent import MARKET_TOOLS
+from backend.agents.preservation_agent import PRESERVATION_TOOLS
+from backend.agents.spoilage_agent import SPOILAGE_TOOLS
+from backend.config.llm_factory import chat_model
+from backend.config.llm_gateway import PRIORITY_HIGH, llm_call
+from backend.config.llm_health import llm_health
+from backend.orchestrator.router import (
+    INTENT_DESCRIPTIONS,
+    intent_counts,
+    local_intent,
+    parse_intent,
+    with_defaults,
+)
+
+INTENT_TOOLS = {
+    "HARVEST": HARVEST_TOOLS,
+    "MARKET": MARKET_TOOLS,
+    "SPOILAGE": SPOILAGE_TOOLS,
+    "PRESERVATION": PRESERVATION_TOOLS,
+}
+
+TOOL_INTENTS = {
+    tool.name: intent
+    for intent, tools in INTENT_TOOLS.items()
+    for tool in tools
+}
+
+ROUTE_SYSTEM_PROMPT = (
+    "You route an Indian farmer's message to ONE of four specialists "
+    "and start that specialist's work in the same reply.\n\n"
+    + "\n".join(
+        f"{intent} — {INTENT_DESCRIPTIONS[intent]}. Tools: "
+        + ", ".join(tool.name for tool in tools)
+        for intent, tools in INTENT_TOOLS.items()
+    )
+    + "\n\nPick the ONE category that fits the message and call its "
+    "first tools, with arguments from the farmer's details. Never call "
+    "tools of another category. If no tool call is needed, reply with "
+    "ONLY the category name in caps."
+)
+
+_route_model = None
+
+
+def _route_llm():
+    global _route_model
+    if _route_model is None:
+        _route_model = chat_model(temperature=0).bind_tools(
+            [tool for tools in INTENT_TOOLS.values() for tool in tools]
+        )
+    return _route_model
+
+
+def route_messages(user_message: str, user_data: dict) -> list:
+    data = with_defaults(user_data)
+    return [
+        SystemMessage(content=ROUTE_SYSTEM_PROMPT),
+        HumanMessage(content=(
+            f"Farmer's message: '{user_message}'\n\n"
+            f"Farmer's details: grows {data['crop']} in {data['district']}, "
+            f"lat={data['lat']}, lng={data['lng']}. "
+            f"Soil type: {data['soil_type']}. "
+            f"Storage method: {data['storage_method']}. "
+            f"Current temperature: {data['current_temp_c']}°C. "
+            f"Harvested about {data['hours_since_harvest']} hours ago. "
+            f"Has {data['volume_kg']} kg of {data['crop']}. "
+            f"Language: {data['language']}."
+        )),
+    ]
+
+
+async def _first_turn(intent: str, message: AIMessage) -> list:
+    """Run the routing call's tool calls for intent; the handoff."""
+    from langgraph.prebuilt import ToolNode
+
+    calls = [
+        call for call in message.tool_calls
+        if TOOL_INTENTS.get(call["name"]) == intent
+    ]
+    if len(calls) < len(message.tool_calls):
+        message = AIMessage(content=message.content, tool_calls=calls)
+    results = await ToolNode(INTENT_TOOLS[intent]).ainvoke({"messages": [message]})
+    return [message, *results["messages"]]
+
+
+async def aroute_single_call(user_message: str, user_data: dict) -> tuple:
+    """
+    (intent, handoff messages). A confident local classification costs
+    no call and hands nothing off; otherwise one Gemini call picks the
+    intent through its first tool call. Falls back to the local guess
+    when Gemini is unavailable.
+    """
+    guess, confident = local_intent(user_message)
+    if confident:
+        return guess, []
+    if not llm_health.allow_request():
+        intent_counts["fallback"] += 1
+        return guess, []
+    try:
+        with llm_call("route", PRIORITY_HIGH):
+            message = await _route_llm().ainvoke(
+                route_messages(user_message, user_data)
+            )
+        llm_health.record_success()
+    except Exception as e:
+        print(f"Single-call routing error: {e}")
+        llm_health.record_failure()
+        intent_counts["fallback"] += 1
+        return guess, []
+
+    intent_counts["llm"] += 1
+    intents = [
+        TOOL_INTENTS[call["name"]] for call in message.tool_calls
+        if call["name"] in TOOL_INTENTS
+    ]
+    if not intents:
+        return parse_intent(str(message.content)), []
+    return intents[0], await _first_turn(intents[0], message)
+
+
+if __name__ == "__main__":
+    import asyncio
+    import time
+
+    from backend.config.llm_gateway import llm_gateway
+    from backend.config.settings import settings
+    from backend.orchestrator.router import SAMPLE_MESSAGES, aorchestrate
+
+    def usage() -> tuple:
+        sites = llm_gateway.stats()["queue_wait"].values()
+        return (
+            sum(site["calls"] for site in sites),
+            sum(site["tokens"] for site in sites),
+        )
+
+    async def run_flow(mode: str) -> list:
+        settings.ROUTING_MODE = mode
+        rows = []
+        for message, expected in SAMPLE_MESSAGES.items():
+            calls, tokens = usage()
+            started = time.perf_counter()
+            result = await aorchestrate(message, {"language": "english"})
+            elapsed = time.perf_counter() - started
+            after_calls, after_tokens = usage()
+            rows.append((
+                result["intent"] == expected, elapsed,
+                after_calls - calls, after_tokens - tokens,
+            ))
+        return rows
+
+    async def main():
+        settings.AGENT_MODE = "react"
+        # Send every message to Gemini: the local classifier would
+        # otherwise route most of them in both flows
+        settings.INTENT_CONFIDENCE_THRESHOLD = 1.01
+        two_stage = await run_flow("two_stage")
+        single = await run_flow("single_call")
+
+        print("=== Two-stage vs single-call routing (react agents) ===")
+        print(f"{'message':<50} {'two-stage':>22}   {'single-call':>22}")
+        for message, a, b in zip(SAMPLE_MESSAGES, two_stage, single):
+            cells = [
+                f"{'✅' if ok else '❌'} {ms * 1000:6.0f} ms {n} calls {t:5d} tok"
+                for ok, ms, n, t in (a, b)
+            ]
+            print(f"{message[:50]:<50} {cells[0]:>22}   {cells[1]:>22}")
+        for name, rows in (("two-stage", two_stage), ("single-call", single)):
+            n = len(rows)
+            print(
+                f"{name:<12} accuracy {sum(r[0] for r in rows) / n:.0%}  "
+                f"avg {sum(r[1] for r in rows) / n * 1000:.0f} ms  "
+                f"{sum(r[2] for r in rows) / n:.1f} LLM calls  "
+                f"{sum(r[3] for r in rows) / n:.0f} tokens per message"
+            )
+
+    asyncio.run(main())
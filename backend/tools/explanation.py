@@ -2,29 +2,25 @@
 explanation.py — LLM-powered explanation generator using Google Gemini.
 
 Falls back to template strings if API key is missing or call fails.
-"""
 
-import os
+Generated explanations are cached in explanation_cache (long TTL, on
+disk) under a normalized context: only the fields an explanation type
+talks about, with numbers rounded to the precision the text quotes
+them. The same normalized context is what Gemini sees, so a cached
+explanation is exactly right for every context in its bucket.
+"""
 
 _llm = None
 
 
 def get_llm():
-    """Lazy-load the Gemini LLM singleton."""
+    """Lazy-load the LLM singleton (see llm_factory for backends)."""
     global _llm
     if _llm is None:
         try:
-            from langchain_google_genai import ChatGoogleGenerativeAI
+            from backend.config.llm_factory import chat_model
 
-            api_key = os.getenv("GOOGLE_API_KEY", "")
-            if not api_key:
-                raise ValueError("No GOOGLE_API_KEY set")
-
-            _llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.7,
-                google_api_key=api_key,
-            )
+            _llm = chat_model(temperature=0.7)
         except Exception as e:
             print(f"LLM init error: {e}")
             _llm = None
@@ -80,21 +76,96 @@ FALLBACK_RESPONSES = {
 }
 
 
-def generate_explanation(
-    context: dict, language: str = "hindi", explanation_type: str = "harvest"
-) -> str:
+# ─── Context Normalization ───────────────────────────────────
+
+# explanation_type -> {field: rounding step, None = used as is}
+# (a dict field, like the harvest breakdown, has each value rounded)
+EXPLANATION_FIELDS = {
+    "harvest": {
+        "crop": None,
+        "score": 1,
+        "color": None,
+        "recommendation": None,
+        "temp_c": 1,
+        "humidity_pct": 5,
+        "rain_forecast": None,
+        "avg_mandi_price": 1,
+        "price_trend": None,
+        "soil_moisture_factor": 0.1,
+        "breakdown": 1,
+    },
+    "market": {
+        "crop": None,
+        "volume_kg": 50,
+        "recommended_mandi": None,
+        "price_per_kg": 1,
+        "distance_km": 5,
+        "transport_cost": 10,
+        "pocket_cash": 50,
+    },
+    "spoilage": {
+        "crop": None,
+        "remaining_hours": 1,
+        "storage_method": None,
+        "risk_level": None,
+        "temp_c": 1,
+    },
+    "preservation": {
+        "crop": None,
+        "method": None,
+        "cost": 1,
+        "extra_days": 1,
+        "saves_rupees": 10,
+    },
+}
+
+
+def _bucket(value, step):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {k: _bucket(v, step) for k, v in sorted(value.items())}
+    if step is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    rounded = round(value / step) * step
+    return int(rounded) if float(step).is_integer() else round(rounded, 6)
+
+
+def normalize_context(context: dict, explanation_type: str) -> dict:
     """
-    Generate an LLM-powered explanation using Gemini.
-    Raises on failure — use generate_explanation_safe for production.
+    The fields of context this explanation type uses, bucketed and with
+    strings casefolded — the cache key's view of the context. The prompt
+    itself is written from the full context.
     """
-    from langchain_core.messages import SystemMessage, HumanMessage
+    fields = EXPLANATION_FIELDS.get(explanation_type, EXPLANATION_FIELDS["harvest"])
+    return {
+        field: _bucket(context[field], step)
+        for field, step in fields.items()
+        if context.get(field) is not None
+    }
 
-    llm = get_llm()
-    if llm is None:
-        raise RuntimeError("LLM not available")
 
-    system_msg = SystemMessage(content=SYSTEM_PROMPT.format(language=language))
+def explanation_key(
+    context: dict, language: str, explanation_type: str
+) -> str:
+    """Cache key: the LLM backend, normalized context, language and
+    the prompt text itself (so editing a prompt retires its old
+    explanations, and fake or replayed text never reaches Gemini
+    users)."""
+    from backend.config.cache import explanation_cache
+    from backend.config.llm_factory import llm_backend
+
+    return explanation_cache.make_key(
+        f"explain.{explanation_type}",
+        llm_backend(),
+        " ".join(language.lower().split()),
+        normalize_context(context, explanation_type),
+        SYSTEM_PROMPT,
+        USER_PROMPTS.get(explanation_type, USER_PROMPTS["harvest"]),
+    )
 
+
+def _user_prompt(context: dict, explanation_type: str) -> str:
     prompt_template = USER_PROMPTS.get(explanation_type, USER_PROMPTS["harvest"])
     # Format with available context keys, using defaults for missing ones
     safe_context = {
@@ -106,39 +177,323 @@ def generate_explanation(
         "method": context.get("method", "this method"),
         "cost": context.get("cost", "0"),
     }
-    user_msg = HumanMessage(content=prompt_template.format(**safe_context))
+    return prompt_template.format(**safe_context)
+
+
+def _build_messages(context: dict, language: str, explanation_type: str) -> list:
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    system_msg = SystemMessage(content=SYSTEM_PROMPT.format(language=language))
+    user_msg = HumanMessage(content=_user_prompt(context, explanation_type))
+    return [system_msg, user_msg]
+
+
+def _template_fallback(context: dict, explanation_type: str) -> str:
+    """Format the fallback template with whatever context is available."""
+    fallback_template = FALLBACK_RESPONSES.get(
+        explanation_type, FALLBACK_RESPONSES["harvest"]
+    )
+    try:
+        safe_context = {
+            "score": context.get("score", "N/A"),
+            "crop": context.get("crop", "your crop"),
+            "remaining_hours": context.get("remaining_hours", "unknown"),
+            "method": context.get("method", "this method"),
+            "cost": context.get("cost", "0"),
+        }
+        return fallback_template.format(**safe_context)
+    except Exception:
+        return fallback_template
 
-    response = llm.invoke([system_msg, user_msg])
+
+def _cached(key: str):
+    from backend.config.cache import explanation_cache
+
+    return explanation_cache.get(key)
+
+
+def _store(key: str, explanation: str):
+    from backend.config.cache import explanation_cache
+
+    if explanation:
+        explanation_cache.set(key, explanation)
+
+
+def cached_explanation(
+    context: dict, language: str = "hindi", explanation_type: str = "harvest"
+):
+    """The cached explanation for this context, or None."""
+    return _cached(explanation_key(context, language, explanation_type))
+
+
+def quick_explanation(
+    context: dict, language: str = "hindi", explanation_type: str = "harvest"
+) -> str:
+    """The cached explanation or the template — never calls Gemini
+    (for answers that are already out of time)."""
+    return cached_explanation(context, language, explanation_type) or (
+        _template_fallback(context, explanation_type)
+    )
+
+
+def _generate(key: str, context: dict, language: str, explanation_type: str) -> str:
+    llm = get_llm()
+    if llm is None:
+        raise RuntimeError("LLM not available")
+
+    response = llm.invoke(_build_messages(context, language, explanation_type))
+    _store(key, response.content)
     return response.content
 
 
+async def _agenerate(
+    key: str, context: dict, language: str, explanation_type: str
+) -> str:
+    llm = get_llm()
+    if llm is None:
+        raise RuntimeError("LLM not available")
+
+    response = await llm.ainvoke(
+        _build_messages(context, language, explanation_type)
+    )
+    _store(key, response.content)
+    return response.content
+
+
+def generate_explanation(
+    context: dict, language: str = "hindi", explanation_type: str = "harvest"
+) -> str:
+    """
+    Generate an LLM-powered explanation using Gemini, or reuse the
+    cached one for the same normalized context.
+    Raises on failure — use generate_explanation_safe for production.
+    """
+    key = explanation_key(context, language, explanation_type)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    return _generate(key, context, language, explanation_type)
+
+
+async def agenerate_explanation(
+    context: dict, language: str = "hindi", explanation_type: str = "harvest"
+) -> str:
+    """Async generate_explanation (uses the LLM's ainvoke)."""
+    key = explanation_key(context, language, explanation_type)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+    return await _agenerate(key, context, language, explanation_type)
+
+
 def generate_explanation_safe(
     context: dict, language: str = "hindi", explanation_type: str = "harvest"
 ) -> str:
     """
     Safe wrapper — always returns a string, never crashes.
-    Falls back to template responses if LLM fails.
+    A cached explanation is served even while llm_health is backing
+    off; otherwise falls back to template responses if the LLM fails.
     """
+    from backend.config.llm_health import llm_health
+
     try:
-        return generate_explanation(context, language, explanation_type)
+        key = explanation_key(context, language, explanation_type)
+        cached = _cached(key)
+        if cached is not None:
+            return cached
+        if not llm_health.allow_request():
+            raise RuntimeError("LLM unavailable (backing off)")
+        try:
+            explanation = _generate(key, context, language, explanation_type)
+        except Exception:
+            llm_health.record_failure()
+            raise
+        llm_health.record_success()
+        return explanation
     except Exception as e:
         print(f"LLM Error: {e}")
+        return _template_fallback(context, explanation_type)
 
-        # Try to format the fallback with available context
-        fallback_template = FALLBACK_RESPONSES.get(
-            explanation_type, FALLBACK_RESPONSES["harvest"]
-        )
+
+async def agenerate_explanation_safe(
+    context: dict, language: str = "hindi", explanation_type: str = "harvest"
+) -> str:
+    """Async generate_explanation_safe — same cache and fallbacks, never raises."""
+    from backend.config.llm_health import llm_health
+
+    try:
+        key = explanation_key(context, language, explanation_type)
+        cached = _cached(key)
+        if cached is not None:
+            return cached
+        if not llm_health.allow_request():
+            raise RuntimeError("LLM unavailable (backing off)")
         try:
-            safe_context = {
-                "score": context.get("score", "N/A"),
-                "crop": context.get("crop", "your crop"),
-                "remaining_hours": context.get("remaining_hours", "unknown"),
-                "method": context.get("method", "this method"),
-                "cost": context.get("cost", "0"),
-            }
-            return fallback_template.format(**safe_context)
+            explanation = await _agenerate(
+                key, context, language, explanation_type
+            )
         except Exception:
-            return fallback_template
+            llm_health.record_failure()
+            raise
+        llm_health.record_success()
+        return explanation
+    except Exception as e:
+        print(f"LLM Error: {e}")
+        return _template_fallback(context, explanation_type)
+
+
+# ─── Batch Generation ────────────────────────────────────────
+# Background jobs (notifications, pre-warming every crop × language)
+# need hundreds of explanations. Items are grouped by language and
+# sent EXPLANATION_BATCH_SIZE at a time as one structured-output
+# request, so the number of Gemini round trips shrinks by the batch
+# size. Items a batch answer leaves out (or a batch that fails to
+# parse) are generated one by one instead.
+
+BATCH_INSTRUCTIONS = (
+    "\n\nYou will receive several numbered requests. Answer each one "
+    "separately, as if it were the only request, following every rule "
+    "above. Return one explanation per request id."
+)
+
+
+def _batch_schema():
+    from pydantic import BaseModel
+
+    class BatchExplanation(BaseModel):
+        id: int
+        explanation: str
+
+    class BatchAnswer(BaseModel):
+        explanations: list[BatchExplanation]
+
+    return BatchAnswer
+
+
+def _batch_messages(language: str, items: list) -> list:
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    requests = "\n\n".join(
+        f"Request {i}:\n{_user_prompt(item['context'], item['explanation_type'])}"
+        for i, item in enumerate(items)
+    )
+    return [
+        SystemMessage(
+            content=SYSTEM_PROMPT.format(language=language) + BATCH_INSTRUCTIONS
+        ),
+        HumanMessage(content=requests),
+    ]
+
+
+async def _agenerate_batch(language: str, items: list) -> dict:
+    """One Gemini call for items; returns {index: explanation} for the
+    items it answered (empty if the call or its parsing failed)."""
+    from backend.config.llm_health import llm_health
+
+    llm = get_llm()
+    if llm is None or not llm_health.allow_request():
+        return {}
+    try:
+        answer = await llm.with_structured_output(_batch_schema()).ainvoke(
+            _batch_messages(language, items)
+        )
+        llm_health.record_success()
+    except Exception as e:
+        print(f"Batch explanation error ({len(items)} items): {e}")
+        llm_health.record_failure()
+        return {}
+    if answer is None:
+        return {}
+    return {
+        entry.id: entry.explanation.strip()
+        for entry in answer.explanations
+        if 0 <= entry.id < len(items) and entry.explanation.strip()
+    }
+
+
+def _batch_item(item: dict) -> dict:
+    item = {
+        "context": item.get("context", {}),
+        "language": item.get("language", "hindi"),
+        "explanation_type": item.get("explanation_type", "harvest"),
+    }
+    item["key"] = explanation_key(
+        item["context"], item["language"], item["explanation_type"]
+    )
+    return item
+
+
+async def agenerate_explanations_batch(
+    items: list, batch_size: int | None = None
+) -> list:
+    """
+    Explanations for many contexts, in the order given.
+
+    items are dicts with "context", "language" (default "hindi") and
+    "explanation_type" (default "harvest"). Cached explanations are
+    reused, identical items are generated once, and every result comes
+    from a batched call, an individual retry, or the template fallback,
+    so this never raises.
+    """
+    import asyncio
+
+    from backend.config.settings import settings
+
+    batch_size = max(1, batch_size or settings.EXPLANATION_BATCH_SIZE)
+    items = [_batch_item(item) for item in items]
+
+    results = {}
+    pending = {}  # key -> item, deduplicated
+    for item in items:
+        cached = _cached(item["key"])
+        if cached is not None:
+            results[item["key"]] = cached
+        else:
+            pending.setdefault(item["key"], item)
+
+    by_language = {}
+    for item in pending.values():
+        by_language.setdefault(item["language"], []).append(item)
+    batches = [
+        (language, group[i:i + batch_size])
+        for language, group in by_language.items()
+        for i in range(0, len(group), batch_size)
+    ]
+
+    answers = await asyncio.gather(
+        *(_agenerate_batch(language, batch) for language, batch in batches)
+    )
+
+    retries = []
+    for (_language, batch), answered in zip(batches, answers):
+        for index, item in enumerate(batch):
+            if index in answered:
+                results[item["key"]] = answered[index]
+                _store(item["key"], answered[index])
+            else:
+                retries.append(item)
+
+    if retries:
+        print(f"Batch explanations: {len(retries)} item(s) retried one by one")
+        retried = await asyncio.gather(*(
+            agenerate_explanation_safe(
+                item["context"], item["language"], item["explanation_type"]
+            )
+            for item in retries
+        ))
+        for item, explanation in zip(retries, retried):
+            results[item["key"]] = explanation
+
+    return [results[item["key"]] for item in items]
+
+
+def generate_explanations_batch(
+    items: list, batch_size: int | None = None
+) -> list:
+    """Sync agenerate_explanations_batch, for scripts and cron jobs."""
+    import asyncio
+
+    return asyncio.run(agenerate_explanations_batch(items, batch_size))
 
 
 if __name__ == "__main__":
@@ -157,3 +512,10 @@ if __name__ == "__main__":
     for etype in ["harvest", "market", "spoilage", "preservation"]:
         result = generate_explanation_safe(test_context, "hindi", etype)
         print(f"\n[{etype}] {result[:100]}...")
+
+    batch = generate_explanations_batch([
+        {"context": test_context, "language": lang, "explanation_type": etype}
+        for lang in ["hindi", "marathi"]
+        for etype in ["harvest", "spoilage"]
+    ])
+    print(f"\n[batch] {len(batch)} explanations")
@@ -8,13 +8,26 @@ import json
 import os
 
 from backend.tools.distance import haversine_distance
+from backend.tools.memo import memoize_tool, invalidate_data
 
 DATA_PATH = os.path.join(
     os.path.dirname(__file__), "..", "..", "data", "mandi_prices.json"
 )
 
-with open(DATA_PATH, encoding="utf-8") as f:
-    MANDI_DATA = json.load(f)
+
+def _load_mandi_data() -> dict:
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+MANDI_DATA = _load_mandi_data()
+
+
+def reload_mandi_data():
+    """Re-read mandi_prices.json and drop memoized results built on it."""
+    global MANDI_DATA
+    MANDI_DATA = _load_mandi_data()
+    invalidate_data("mandi_prices")
 
 
 def get_mandi_prices(crop: str) -> list:
@@ -27,6 +40,10 @@ def get_mandi_prices(crop: str) -> list:
     return MANDI_DATA.get(crop_lower, [])
 
 
+@memoize_tool(
+    casefold=("crop",), coords=("user_lat", "user_lng"),
+    depends_on=("mandi_prices",),
+)
 def get_nearby_mandis(
     crop: str, user_lat: float, user_lng: float, max_count: int = 3
 ) -> list:
@@ -52,6 +69,10 @@ def get_nearby_mandis(
     return enriched[:max_count]
 
 
+@memoize_tool(
+    casefold=("crop",), coords=("user_lat", "user_lng"),
+    depends_on=("mandi_prices",),
+)
 def get_best_pocket_cash_mandi(
     crop: str,
     quantity_kg: float,
@@ -0,0 +1,139 @@
+"""
+memo.py — Cross-request memoization for pure tool functions.
+
+Agents call the same deterministic tools (mandi ranking, spoilage
+hours, preservation ROI) over and over with the same arguments. The
+memoize_tool decorator keeps a small LRU per tool:
+
+- arguments are normalized first (crop names lowercased, coordinates
+  rounded) and the tool is called with the normalized values, so
+  equivalent calls share one entry
+- every result is returned as a fresh copy, so callers can mutate it
+  without corrupting the memo
+- entries are dropped when the JSON data a tool depends on is
+  reloaded (see invalidate_data); a result still being computed from
+  the old data when that happens is returned but not stored
+"""
+
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+COORD_DECIMALS = 4  # ~11 m — distances are reported to 0.1 km
+
+_registry: dict = {}
+
+
+def fresh_copy(value):
+    """Fast deep copy for JSON-like tool results."""
+    if isinstance(value, dict):
+        return {k: fresh_copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fresh_copy(v) for v in value]
+    return value
+
+
+class ToolMemo:
+    def __init__(self, fn, casefold=(), coords=(), depends_on=(), maxsize=256):
+        self.fn = fn
+        self.name = fn.__name__
+        self.casefold = set(casefold)
+        self.coords = set(coords)
+        self.depends_on = set(depends_on)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._signature = inspect.signature(fn)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by clear(): a miss computed across a clear is not stored
+        self._generation = 0
+
+    def normalize(self, args, kwargs) -> dict:
+        bound = self._signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        for name, value in params.items():
+            if name in self.casefold and isinstance(value, str):
+                params[name] = value.lower().strip()
+            elif name in self.coords and value is not None:
+                params[name] = round(float(value), COORD_DECIMALS)
+        return params
+
+    def __call__(self, *args, **kwargs):
+        params = self.normalize(args, kwargs)
+        key = tuple(params.items())
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fresh_copy(self._entries[key])
+            self.misses += 1
+            generation = self._generation
+
+        result = self.fn(**params)
+
+        with self._lock:
+            if generation != self._generation:
+                return result
+            self._entries[key] = fresh_copy(result)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 1) if total else 0.0,
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+def memoize_tool(casefold=(), coords=(), depends_on=(), maxsize=256):
+    """
+    Memoize a pure tool function.
+
+    casefold:   parameter names to lowercase/strip before lookup
+    coords:     parameter names to round to COORD_DECIMALS
+    depends_on: data source names; invalidate_data(name) clears them
+    """
+
+    def decorator(fn):
+        memo = ToolMemo(fn, casefold, coords, depends_on, maxsize)
+        _registry[memo.name] = memo
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return memo(*args, **kwargs)
+
+        wrapper.memo = memo
+        return wrapper
+
+    return decorator
+
+
+def invalidate_data(source: str):
+    """Clear every memoized tool that depends on a reloaded data source."""
+    for memo in _registry.values():
+        if source in memo.depends_on:
+            memo.clear()
+
+
+def clear_all():
+    for memo in _registry.values():
+        memo.clear()
+
+
+def memo_stats() -> dict:
+    """Per-tool hit/miss counters."""
+    return {name: memo.stats() for name, memo in _registry.items()}
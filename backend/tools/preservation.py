@@ -8,15 +8,31 @@ import json
 import os
 
 from backend.tools.spoilage import predict_remaining_hours
+from backend.tools.memo import memoize_tool, invalidate_data
 
 DATA_PATH = os.path.join(
     os.path.dirname(__file__), "..", "..", "data", "preservation_methods.json"
 )
 
-with open(DATA_PATH, encoding="utf-8") as f:
-    PRESERVATION_DATA = json.load(f)
 
+def _load_preservation_data() -> dict:
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return json.load(f)
 
+
+PRESERVATION_DATA = _load_preservation_data()
+
+
+def reload_preservation_data():
+    """Re-read preservation_methods.json and drop memoized results built on it."""
+    global PRESERVATION_DATA
+    PRESERVATION_DATA = _load_preservation_data()
+    invalidate_data("preservation_methods")
+
+
+@memoize_tool(
+    casefold=("crop", "current_storage"), depends_on=("preservation_methods",)
+)
 def get_preservation_options(
     crop: str, current_storage: str = "open_floor"
 ) -> list:
@@ -56,6 +72,10 @@ def get_preservation_options(
     return results
 
 
+@memoize_tool(
+    casefold=("crop", "method_id", "current_storage"),
+    depends_on=("preservation_methods", "spoilage_data"),
+)
 def calculate_preservation_benefit(
     crop: str, method_id: str, current_storage: str, temp_c: float
 ) -> dict:
@@ -4,17 +4,36 @@ spoilage.py — Crop spoilage prediction based on storage method, temperature, a
 Loads spoilage_data.json. Integrates with weather tool for live conditions.
 """
 
+import asyncio
 import json
 import os
 
-from backend.tools.weather import get_current_weather, detect_heatwave_risk
+from backend.tools.weather import (
+    get_current_weather,
+    detect_heatwave_risk,
+    aget_current_weather,
+    adetect_heatwave_risk,
+)
+from backend.tools.memo import memoize_tool, invalidate_data
 
 DATA_PATH = os.path.join(
     os.path.dirname(__file__), "..", "..", "data", "spoilage_data.json"
 )
 
-with open(DATA_PATH, encoding="utf-8") as f:
-    SPOILAGE_DATA = json.load(f)
+
+def _load_spoilage_data() -> dict:
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+SPOILAGE_DATA = _load_spoilage_data()
+
+
+def reload_spoilage_data():
+    """Re-read spoilage_data.json and drop memoized results built on it."""
+    global SPOILAGE_DATA
+    SPOILAGE_DATA = _load_spoilage_data()
+    invalidate_data("spoilage_data")
 
 
 def _get_temp_band(temp_c: float) -> str:
@@ -27,6 +46,9 @@ def _get_temp_band(temp_c: float) -> str:
         return "above_35"
 
 
+@memoize_tool(
+    casefold=("crop", "storage_method"), depends_on=("spoilage_data",)
+)
 def predict_remaining_hours(
     crop: str,
     storage_method: str,
@@ -105,7 +127,34 @@ def check_spoilage_with_weather(
     """
     weather = get_current_weather(lat, lng)
     heatwave = detect_heatwave_risk(lat, lng)
+    return _spoilage_with_weather(
+        crop, storage_method, hours_since_harvest, weather, heatwave
+    )
+
 
+async def acheck_spoilage_with_weather(
+    crop: str,
+    storage_method: str,
+    hours_since_harvest: float,
+    lat: float,
+    lng: float,
+) -> dict:
+    """Async check_spoilage_with_weather; weather calls run concurrently."""
+    weather, heatwave = await asyncio.gather(
+        aget_current_weather(lat, lng), adetect_heatwave_risk(lat, lng)
+    )
+    return _spoilage_with_weather(
+        crop, storage_method, hours_since_harvest, weather, heatwave
+    )
+
+
+def _spoilage_with_weather(
+    crop: str,
+    storage_method: str,
+    hours_since_harvest: float,
+    weather: dict,
+    heatwave: dict,
+) -> dict:
     result = predict_remaining_hours(
         crop, storage_method, weather["temp_c"], hours_since_harvest
     )
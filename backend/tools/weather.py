@@ -2,12 +2,25 @@
 weather.py — Current weather and forecast from OpenWeatherMap API.
 
 Falls back to hardcoded data if no API key is set or API call fails.
+Every fetch has an async twin (aget_*) built on httpx.AsyncClient.
+
+prefetch_weather(lat, lng) starts both API calls in the background for
+the rest of a request: every weather call for that location made inside
+the block (sync or async, in the same task or tasks and threads it
+spawns) waits for the prefetched result instead of calling the API
+again. The orchestrator opens it while the intent is being classified.
 """
 
+import asyncio
+import contextlib
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 
 import httpx
 
+from backend.tools.memo import COORD_DECIMALS
+
 API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
 
 FALLBACK_WEATHER = {
@@ -20,64 +33,156 @@ FALLBACK_WEATHER = {
 }
 
 
+def _current_url(lat: float, lng: float) -> str:
+    return (
+        f"http://api.openweathermap.org/data/2.5/weather"
+        f"?lat={lat}&lon={lng}&appid={API_KEY}&units=metric"
+    )
+
+
+def _forecast_url(lat: float, lng: float) -> str:
+    return (
+        f"http://api.openweathermap.org/data/2.5/forecast"
+        f"?lat={lat}&lon={lng}&appid={API_KEY}&units=metric"
+    )
+
+
+def _parse_current(data: dict) -> dict:
+    return {
+        "temp_c": data["main"]["temp"],
+        "humidity_pct": data["main"]["humidity"],
+        "description": data["weather"][0]["description"],
+        "wind_speed_ms": data["wind"]["speed"],
+        "feels_like_c": data["main"]["feels_like"],
+        "is_fallback": False,
+    }
+
+
+def _parse_forecast(data: dict) -> list:
+    entries = []
+    for item in data["list"][:8]:
+        entries.append({
+            "datetime": item["dt_txt"],
+            "temp_c": item["main"]["temp"],
+            "humidity_pct": item["main"]["humidity"],
+            "description": item["weather"][0]["description"],
+            "is_fallback": False,
+        })
+    return entries
+
+
+def _heatwave_from(current: dict, forecast: list) -> dict:
+    current_temp = current["temp_c"]
+    max_temp = max((f.get("temp_c", current_temp) for f in forecast), default=current_temp)
+
+    if max_temp > current_temp + 5:
+        return {
+            "alert": True,
+            "message": f"Heatwave expected. Temperature rising to {max_temp}°C",
+            "max_temp": max_temp,
+            "current_temp": current_temp,
+        }
+    return {
+        "alert": False,
+        "max_temp": max_temp,
+        "current_temp": current_temp,
+    }
+
+
+# ─── Request Prefetch ────────────────────────────────────────
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="weather")
+# {(kind, lat, lng): Future} for the current request, or None
+_prefetched: ContextVar = ContextVar("weather_prefetched", default=None)
+
+prefetch_counts = {"started": 0, "hits": 0}
+
+
+def _key(kind: str, lat: float, lng: float) -> tuple:
+    return kind, round(float(lat), COORD_DECIMALS), round(float(lng), COORD_DECIMALS)
+
+
+def _prefetched_future(kind: str, lat: float, lng: float):
+    futures = _prefetched.get()
+    future = futures.get(_key(kind, lat, lng)) if futures else None
+    if future is not None:
+        prefetch_counts["hits"] += 1
+    return future
+
+
+@contextlib.contextmanager
+def prefetch_weather(lat: float, lng: float):
+    """Fetch current weather and forecast for lat/lng in the background
+    and share the results with every weather call inside the block."""
+    futures = {
+        _key("current", lat, lng): _prefetch_pool.submit(_fetch_current, lat, lng),
+        _key("forecast", lat, lng): _prefetch_pool.submit(_fetch_forecast, lat, lng),
+    }
+    prefetch_counts["started"] += 1
+    token = _prefetched.set(futures)
+    try:
+        yield
+    finally:
+        # An async generator may be closed from another context
+        with contextlib.suppress(ValueError):
+            _prefetched.reset(token)
+        for future in futures.values():
+            future.cancel()
+
+
+def prefetch_stats() -> dict:
+    return dict(prefetch_counts)
+
+
+def _copy_forecast(forecast: list) -> list:
+    return [dict(entry) for entry in forecast]
+
+
+# ─── Sync API ────────────────────────────────────────────────
+
 def get_current_weather(lat: float, lng: float) -> dict:
     """
     Fetch current weather for given coordinates.
     Returns fallback data if API key missing or call fails.
     """
+    future = _prefetched_future("current", lat, lng)
+    if future is not None:
+        return dict(future.result())
+    return _fetch_current(lat, lng)
+
+
+def get_weather_forecast(lat: float, lng: float) -> list:
+    """
+    Fetch weather forecast (next 24 hours, 8 x 3-hour intervals).
+    Returns 8 fallback entries if API key missing or call fails.
+    """
+    future = _prefetched_future("forecast", lat, lng)
+    if future is not None:
+        return _copy_forecast(future.result())
+    return _fetch_forecast(lat, lng)
+
+
+def _fetch_current(lat: float, lng: float) -> dict:
     if not API_KEY:
         return dict(FALLBACK_WEATHER)
 
     try:
-        url = (
-            f"http://api.openweathermap.org/data/2.5/weather"
-            f"?lat={lat}&lon={lng}&appid={API_KEY}&units=metric"
-        )
-        resp = httpx.get(url, timeout=10)
+        resp = httpx.get(_current_url(lat, lng), timeout=10)
         resp.raise_for_status()
-        data = resp.json()
-
-        return {
-            "temp_c": data["main"]["temp"],
-            "humidity_pct": data["main"]["humidity"],
-            "description": data["weather"][0]["description"],
-            "wind_speed_ms": data["wind"]["speed"],
-            "feels_like_c": data["main"]["feels_like"],
-            "is_fallback": False,
-        }
+        return _parse_current(resp.json())
     except Exception as e:
         print(f"Weather API error: {e}")
         return dict(FALLBACK_WEATHER)
 
 
-def get_weather_forecast(lat: float, lng: float) -> list:
-    """
-    Fetch weather forecast (next 24 hours, 8 x 3-hour intervals).
-    Returns 8 fallback entries if API key missing or call fails.
-    """
+def _fetch_forecast(lat: float, lng: float) -> list:
     if not API_KEY:
         return [dict(FALLBACK_WEATHER) for _ in range(8)]
 
     try:
-        url = (
-            f"http://api.openweathermap.org/data/2.5/forecast"
-            f"?lat={lat}&lon={lng}&appid={API_KEY}&units=metric"
-        )
-        resp = httpx.get(url, timeout=10)
+        resp = httpx.get(_forecast_url(lat, lng), timeout=10)
         resp.raise_for_status()
-        data = resp.json()
-
-        entries = []
-        for item in data["list"][:8]:
-            entries.append({
-                "datetime": item["dt_txt"],
-                "temp_c": item["main"]["temp"],
-                "humidity_pct": item["main"]["humidity"],
-                "description": item["weather"][0]["description"],
-                "is_fallback": False,
-            })
-        return entries
-
+        return _parse_forecast(resp.json())
     except Exception as e:
         print(f"Forecast API error: {e}")
         return [dict(FALLBACK_WEATHER) for _ in range(8)]
@@ -89,22 +194,55 @@ def detect_heatwave_risk(lat: float, lng: float) -> dict:
     """
     current = get_current_weather(lat, lng)
     forecast = get_weather_forecast(lat, lng)
+    return _heatwave_from(current, forecast)
 
-    current_temp = current["temp_c"]
-    max_temp = max((f.get("temp_c", current_temp) for f in forecast), default=current_temp)
 
-    if max_temp > current_temp + 5:
-        return {
-            "alert": True,
-            "message": f"Heatwave expected. Temperature rising to {max_temp}°C",
-            "max_temp": max_temp,
-            "current_temp": current_temp,
-        }
-    return {
-        "alert": False,
-        "max_temp": max_temp,
-        "current_temp": current_temp,
-    }
+# ─── Async API (used by the agents' ainvoke path) ────────────
+
+async def aget_current_weather(lat: float, lng: float) -> dict:
+    """Async get_current_weather — does not block the event loop."""
+    future = _prefetched_future("current", lat, lng)
+    if future is not None:
+        # shield: a caller cut off by its deadline must not cancel the
+        # fetch other callers are waiting on
+        return dict(await asyncio.shield(asyncio.wrap_future(future)))
+    if not API_KEY:
+        return dict(FALLBACK_WEATHER)
+
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            resp = await client.get(_current_url(lat, lng))
+        resp.raise_for_status()
+        return _parse_current(resp.json())
+    except Exception as e:
+        print(f"Weather API error: {e}")
+        return dict(FALLBACK_WEATHER)
+
+
+async def aget_weather_forecast(lat: float, lng: float) -> list:
+    """Async get_weather_forecast — does not block the event loop."""
+    future = _prefetched_future("forecast", lat, lng)
+    if future is not None:
+        return _copy_forecast(await asyncio.shield(asyncio.wrap_future(future)))
+    if not API_KEY:
+        return [dict(FALLBACK_WEATHER) for _ in range(8)]
+
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            resp = await client.get(_forecast_url(lat, lng))
+        resp.raise_for_status()
+        return _parse_forecast(resp.json())
+    except Exception as e:
+        print(f"Forecast API error: {e}")
+        return [dict(FALLBACK_WEATHER) for _ in range(8)]
+
+
+async def adetect_heatwave_risk(lat: float, lng: float) -> dict:
+    """Async detect_heatwave_risk; both API calls run concurrently."""
+    current, forecast = await asyncio.gather(
+        aget_current_weather(lat, lng), aget_weather_forecast(lat, lng)
+    )
+    return _heatwave_from(current, forecast)
 
 
 if __name__ == "__main__":
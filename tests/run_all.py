@@ -1,5 +1,5 @@
 """
-Run all AgriChain tests — data validation and tool unit tests.
+Run all AgriChain tests — data validation, tool and config unit tests.
 """
 
 import subprocess
@@ -8,6 +8,7 @@ import sys
 sections = [
     ("Data Validation Tests", "tests/test_data/"),
     ("Tool Unit Tests", "tests/test_tools/"),
+    ("Config Unit Tests", "tests/test_config/"),
 ]
 
 all_passed = True
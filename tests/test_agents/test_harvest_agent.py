@@ -5,7 +5,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 import pytest
-from backend.agents.harvest_agent import run_harvest_agent
+from backend.agents.harvest_agent import estimate_price_trend, run_harvest_agent
 
 
 @pytest.mark.slow
@@ -20,3 +20,48 @@ def test_harvest_returns_explanation():
 def test_harvest_no_crash_bad_input():
     result = run_harvest_agent("unknown", 0, 0, "unknown", "X", "english")
     assert "explanation" in result
+
+
+# ─── Price trend ──────────────────────────────────────────────
+
+NAGPUR = (21.1458, 79.0882)
+
+
+def _mandi(price, lat, lng, history=None):
+    entry = {"price_per_kg": price, "lat": lat, "lng": lng}
+    if history is not None:
+        entry["history"] = [
+            {"date": f"2026-02-{day:02d}", "price_per_kg": p}
+            for day, p in enumerate(history, start=20)
+        ]
+    return entry
+
+
+def test_price_gap_without_history_is_stable():
+    # Local mandis pay far more than distant ones: geography, not a trend
+    prices = [
+        _mandi(30, 21.15, 79.09), _mandi(29, 21.2, 79.1),
+        _mandi(12, 19.07, 72.87), _mandi(11, 18.52, 73.85),
+    ]
+    assert estimate_price_trend(prices, *NAGPUR) == "stable"
+    assert estimate_price_trend([], *NAGPUR) == "stable"
+
+
+def test_trend_from_price_history():
+    rising = [_mandi(24, 21.15, 79.09, history=[20, 22])]
+    falling = [_mandi(16, 21.15, 79.09, history=[20, 18])]
+    flat = [_mandi(20.5, 21.15, 79.09, history=[20])]
+    assert estimate_price_trend(rising, *NAGPUR) == "rising"
+    assert estimate_price_trend(falling, *NAGPUR) == "falling"
+    assert estimate_price_trend(flat, *NAGPUR) == "stable"
+
+
+def test_trend_uses_nearest_mandis_with_history():
+    prices = [
+        _mandi(24, 21.15, 79.09, history=[20]),
+        _mandi(25, 21.2, 79.1, history=[20]),
+        _mandi(26, 21.1, 79.0, history=[20]),
+        _mandi(10, 19.07, 72.87, history=[20]),  # far away, ignored
+        _mandi(5, 21.15, 79.08),                 # no history
+    ]
+    assert estimate_price_trend(prices, *NAGPUR) == "rising"
@@ -0,0 +1,42 @@
+"""Tests for the local intent classifier (no LLM calls)."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from backend.orchestrator.intent_classifier import classify_intent, classify_intents
+
+
+def test_english_intents():
+    assert classify_intent("Should I harvest today?")[0] == "HARVEST"
+    assert classify_intent("Where to sell my crop?")[0] == "MARKET"
+    assert classify_intent("How long will my tomatoes last?")[0] == "SPOILAGE"
+    assert classify_intent("How to keep crop fresh?")[0] == "PRESERVATION"
+
+
+def test_hindi_and_marathi_intents():
+    assert classify_intent("प्याज किस मंडी में बेचूं?")[0] == "MARKET"
+    assert classify_intent("tamatar kitne din chalega?")[0] == "SPOILAGE"
+    assert classify_intent("कांदा कसा साठवावा?")[0] == "PRESERVATION"
+    assert classify_intent("कापणी आज करू का?")[0] == "HARVEST"
+
+
+def test_confidence():
+    intent, confidence = classify_intent("Which mandi gives the best price?")
+    assert intent == "MARKET"
+    assert 0.75 <= confidence <= 1.0
+
+
+def test_unknown_message_has_zero_confidence():
+    assert classify_intent("xyzzy qwerty")[1] == 0.0
+
+
+def test_compound_question_intents():
+    message = "my tomatoes are ready, where should I sell and how long will they last?"
+    assert classify_intents(message, 0.75) == ["MARKET", "SPOILAGE"]
+    assert classify_intents("फसल कहाँ बेचूं और कितने दिन चलेगी?", 0.75) == ["MARKET", "SPOILAGE"]
+
+
+def test_context_clause_is_not_an_intent():
+    message = "I harvested 6 hours ago. How long will it last?"
+    assert classify_intents(message, 0.75) == ["SPOILAGE"]
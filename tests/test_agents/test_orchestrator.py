@@ -40,3 +40,25 @@ def test_full_orchestrate():
     assert "intent" in result
     assert "response" in result
     assert len(result["response"]) > 0
+
+
+@pytest.mark.slow
+def test_stream_fans_out_compound_question():
+    import asyncio
+    from backend.orchestrator.router import astream_orchestrate
+
+    message = "where should I sell and how long will my tomatoes last?"
+
+    async def collect():
+        return [
+            event async for event in astream_orchestrate(
+                message, {"crop": "tomato", "language": "english"}
+            )
+        ]
+
+    events = asyncio.run(collect())
+    assert events[0][0] == "intent"
+    assert events[0][1]["intents"] == ["MARKET", "SPOILAGE"]
+    event, answer = events[-1]
+    assert event == "answer"
+    assert [part["intent"] for part in answer["parts"]] == ["MARKET", "SPOILAGE"]
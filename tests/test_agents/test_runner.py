@@ -0,0 +1,82 @@
+"""Tests for backend/agents/runner.py deadlines and the LLM breaker probe."""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+
+from backend.agents import runner
+from backend.config.llm_health import LLMHealth
+from backend.config.settings import settings
+
+
+@pytest.fixture
+def probing(monkeypatch):
+    """An open breaker whose single probe the test run has taken."""
+    health = LLMHealth(failure_threshold=1, base_backoff=0, max_backoff=0)
+    health.record_failure()
+    assert health.allow_request()
+    assert not health.allow_request()
+    monkeypatch.setattr(runner, "llm_health", health)
+    monkeypatch.setitem(settings.AGENT_DEADLINES, "test", 0.05)
+    return health
+
+
+def _slow_plan():
+    return {"slow": asyncio.sleep(5, result="late")}, None
+
+
+def _run(log):
+    return runner.run_agent(
+        "test", "prefetch", "system", "user", _slow_plan,
+        get_agent=None, recursion_limit=1, log=log,
+    )
+
+
+def test_deadline_releases_probe(probing):
+    result = asyncio.run(_run(runner.ToolLog()))
+    assert result is None
+    # The timeout counted as a failed probe and the next one is allowed
+    assert probing.failures == 2
+    assert probing.allow_request()
+
+
+def test_cancelled_run_releases_probe(probing):
+    async def cancel_run():
+        task = asyncio.ensure_future(_run(runner.ToolLog()))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_run())
+    # No verdict either way: failures unchanged, probe free again
+    assert probing.failures == 1
+    assert probing.allow_request()
+
+
+def test_run_sync_outside_and_inside_a_loop():
+    async def answer():
+        await asyncio.sleep(0)
+        return 42
+
+    assert runner.run_sync(answer()) == 42
+
+    async def from_async_code():
+        return runner.run_sync(answer())
+
+    assert asyncio.run(from_async_code()) == 42
+
+
+def test_sync_agent_wrapper_inside_running_loop():
+    from backend.agents.preservation_agent import run_preservation_agent
+
+    async def endpoint():
+        return run_preservation_agent(
+            "tomato", "open_floor", 35, "english", mode="prefetch"
+        )
+
+    result = asyncio.run(endpoint())
+    assert isinstance(result["explanation"], str)
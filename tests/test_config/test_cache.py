@@ -0,0 +1,112 @@
+"""Tests for backend/config/cache.py (LRU, namespace TTLs, sweeper)."""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+
+from backend.config import cache as cache_module
+from backend.config.cache import LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def make_cache(**kwargs) -> LRUCache:
+    kwargs.setdefault("sweep_interval", 0)
+    return LRUCache(**kwargs)
+
+
+def test_evicts_least_recently_used():
+    cache = make_cache(max_entries=2)
+    cache.set("harvest:a", 1)
+    cache.set("harvest:b", 2)
+    cache.get("harvest:a")
+    cache.set("harvest:c", 3)
+    assert cache.get("harvest:b") is None
+    assert cache.get("harvest:a") == 1
+    assert cache.get("harvest:c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_to_fit_byte_budget():
+    cache = make_cache(max_bytes=100)
+    cache.set("market:a", "x" * 60)
+    cache.set("market:b", "y" * 60)
+    assert cache.size == 1
+    assert cache.bytes <= 100
+    assert cache.get("market:b") == "y" * 60
+
+
+def test_namespace_ttls(clock):
+    cache = make_cache(ttl_seconds=300, namespace_ttls={"market": 60})
+    cache.set("market:a", 1)
+    cache.set("harvest:a", 2)
+    clock.now += 61
+    assert cache.get("market:a") is None
+    assert cache.get("harvest:a") == 2
+    clock.now += 240
+    assert cache.get("harvest:a") is None
+
+
+def test_sweep_drops_only_expired(clock):
+    cache = make_cache(namespace_ttls={"market": 60, "harvest": 600})
+    cache.set("market:a", 1)
+    cache.set("harvest:a", 2)
+    clock.now += 120
+    assert cache.sweep() == 1
+    assert cache.size == 1
+    assert cache.stats()["expirations"] == 1
+
+
+def test_background_sweeper_expires_unread_entries():
+    cache = LRUCache(ttl_seconds=0.05, sweep_interval=0.05)
+    try:
+        cache.set("spoilage:a", 1)
+        deadline = time.time() + 2
+        while cache.size and time.time() < deadline:
+            time.sleep(0.02)
+        assert cache.size == 0
+    finally:
+        cache.stop()
+
+
+def test_stale_entry_served_within_grace(clock):
+    cache = make_cache(ttl_seconds=10)
+    cache.set("chat:a", "answer", grace=20)
+    clock.now += 15
+    assert cache.get("chat:a") is None
+    assert cache.get_stale("chat:a") == ("answer", True)
+    clock.now += 20
+    assert cache.get_stale("chat:a") == (None, False)
+
+
+def test_roundtrip_returns_fresh_copy():
+    cache = make_cache()
+    cache.set("harvest:a", {"score": 72})
+    value = cache.get("harvest:a")
+    value["score"] = 0
+    assert cache.get("harvest:a") == {"score": 72}
+
+
+def test_clear_namespace():
+    cache = make_cache()
+    cache.set("market:a", 1)
+    cache.set("market:b", 2)
+    cache.set("harvest:a", 3)
+    assert cache.clear_namespace("market") == 2
+    assert cache.get("harvest:a") == 3
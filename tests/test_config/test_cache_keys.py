@@ -0,0 +1,84 @@
+"""Tests for backend/config/cache_keys.py (schema-based cache keys)."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from backend.config.cache_keys import build_cache_key, quantize_coord
+
+
+def test_quantize_snaps_to_cell_centre():
+    assert quantize_coord(21.1458, 0.05) == 21.125
+    assert quantize_coord(21.1401, 0.05) == quantize_coord(21.1499, 0.05)
+    assert quantize_coord(21.1458, 0.05) != quantize_coord(21.1501, 0.05)
+    assert quantize_coord(-0.01, 0.05) == -0.025
+
+
+def test_quantize_disabled_with_zero_cell():
+    assert quantize_coord(21.1458, 0) == 21.1458
+
+
+def test_nearby_farmers_share_a_key():
+    a = build_cache_key("market", {"crop": "onion", "lat": 21.141, "lng": 79.081})
+    b = build_cache_key("market", {"crop": "onion", "lat": 21.149, "lng": 79.089})
+    far = build_cache_key("market", {"crop": "onion", "lat": 20.937, "lng": 77.779})
+    assert a == b
+    assert a != far
+
+
+def test_missing_fields_take_schema_defaults():
+    explicit = build_cache_key("spoilage", {
+        "crop": "tomato", "storage_method": "open_floor",
+        "hours_since_harvest": 0, "lat": 21.1458, "lng": 79.0882,
+        "language": "hindi",
+    })
+    assert build_cache_key("spoilage", {"crop": "tomato"}) == explicit
+    assert build_cache_key("spoilage", {"crop": "tomato", "lat": None}) == explicit
+
+
+def test_strings_and_numbers_are_normalized():
+    a = build_cache_key("market", {"crop": "Onion ", "volume_kg": 500})
+    b = build_cache_key("market", {"crop": "onion", "volume_kg": 500.0})
+    assert a == b
+
+
+def test_unrelated_fields_are_ignored():
+    a = build_cache_key("preservation", {"crop": "onion", "lat": 10.0})
+    b = build_cache_key("preservation", {"crop": "onion", "lat": 30.0})
+    assert a == b
+
+
+def test_answer_changing_fields_change_the_key():
+    base = {"crop": "onion", "language": "hindi"}
+    assert build_cache_key("market", base) != build_cache_key(
+        "market", {**base, "language": "marathi"}
+    )
+    assert build_cache_key("market", base) != build_cache_key("spoilage", base)
+    assert build_cache_key("market", base).startswith("market:")
+
+
+def test_agent_mode_resolved_in_key(monkeypatch):
+    from backend.config.settings import settings
+
+    monkeypatch.setattr(settings, "AGENT_MODE", "prefetch")
+    default = build_cache_key("spoilage", {"crop": "tomato"})
+    assert default == build_cache_key(
+        "spoilage", {"crop": "tomato", "agent_mode": "PREFETCH"}
+    )
+    assert default != build_cache_key(
+        "spoilage", {"crop": "tomato", "agent_mode": "react"}
+    )
+
+
+def test_harvest_stream_never_shares_the_fast_mode_entry():
+    from backend.api.harvest import (
+        HarvestScoreRequest,
+        harvest_cache_key,
+        harvest_stream_cache_key,
+    )
+
+    fast = HarvestScoreRequest(crop="tomato", mode="fast")
+    agent = HarvestScoreRequest(crop="tomato", mode="agent", agent_mode="prefetch")
+    assert harvest_stream_cache_key(fast) != harvest_cache_key(fast)
+    assert harvest_stream_cache_key(fast) == harvest_cache_key(agent)
+    assert harvest_stream_cache_key(agent) == harvest_cache_key(agent)
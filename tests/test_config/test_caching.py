@@ -0,0 +1,85 @@
+"""Tests for backend/api/caching.py (stale refresh vs. joined misses)."""
+
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+
+import backend.api.caching as caching
+from backend.config import cache as cache_module
+from backend.config.cache import LRUCache
+from backend.config.singleflight import SingleFlight
+
+KEY = "market:test"
+
+
+class FakeRequest:
+    headers: dict = {}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A stale market entry in a fresh cache, and a fresh flight group."""
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    fresh = LRUCache(sweep_interval=0)
+    monkeypatch.setattr(caching, "agent_cache", fresh)
+    monkeypatch.setattr(caching, "agent_flight", SingleFlight())
+    fresh.set(KEY, {"answer": "old"}, ttl=10, grace=600)
+    clock.now += 60
+    return fresh
+
+
+def _miss_joins_refresh(cache, refreshed: dict):
+    """Serve the stale entry, then a miss while its refresh runs."""
+
+    async def main():
+        release = asyncio.Event()
+
+        async def refresh():
+            await release.wait()
+            return refreshed
+
+        async def compute():
+            raise AssertionError("the miss should join the refresh")
+
+        stale = await caching.serve_cached(
+            FakeRequest(), "market", KEY, compute, refresh=refresh,
+            grace_seconds=600,
+        )
+        cache.delete(KEY)
+        miss = asyncio.ensure_future(caching.serve_cached(
+            FakeRequest(), "market", KEY, compute, grace_seconds=600,
+        ))
+        await asyncio.sleep(0)
+        release.set()
+        return stale, await miss
+
+    return asyncio.run(main())
+
+
+def test_miss_joining_refresh_gets_its_body(cache):
+    stale, miss = _miss_joins_refresh(cache, {"answer": "new"})
+    assert stale.headers["X-Cache"] == "STALE"
+    assert miss.headers["X-Cache"] == "SHARED"
+    assert json.loads(miss.body) == {"answer": "new"}
+    assert cache.get(KEY) == {"answer": "new"}
+
+
+def test_miss_joining_failed_refresh_gets_uncached_fallback(cache):
+    fallback = {"answer": "template", "fallback": True}
+    _stale, miss = _miss_joins_refresh(cache, fallback)
+    assert miss.headers["X-Cache"] == "SHARED"
+    assert json.loads(miss.body) == fallback
+    assert cache.get(KEY) is None
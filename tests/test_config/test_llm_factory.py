@@ -0,0 +1,125 @@
+"""Tests for backend/config/llm_factory.py and fake_llm.py (no network)."""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.tools import tool
+
+from backend.config import llm_factory
+from backend.config.cache_keys import build_cache_key
+from backend.config.fake_llm import FakeChatModel
+from backend.config.llm_factory import (
+    Cassette,
+    LatencyMixin,
+    RecordingMixin,
+    chat_model,
+    _latency_seconds,
+)
+from backend.config.settings import settings
+from backend.tools.explanation import explanation_key
+
+
+@tool
+def get_weather(lat: float, lng: float) -> dict:
+    """Current weather at a location."""
+    return {"temp_c": 30}
+
+
+MESSAGES = [
+    SystemMessage(content="You advise farmers."),
+    HumanMessage(content="Farmer grows onion in Nagpur, lat=21.1, lng=79.0."),
+]
+
+
+class RecordingFake(RecordingMixin, FakeChatModel):
+    pass
+
+
+class SlowFake(LatencyMixin, FakeChatModel):
+    pass
+
+
+@pytest.fixture
+def cassette(tmp_path, monkeypatch):
+    tape = Cassette(str(tmp_path / "cassette.jsonl"))
+    monkeypatch.setattr(llm_factory, "_cassette", tape)
+    return tape
+
+
+# ─── FakeChatModel ────────────────────────────────────────────
+
+def test_fake_answers_deterministically():
+    model = FakeChatModel(temperature=0)
+    first = model.invoke(MESSAGES).content
+    assert first == model.invoke(MESSAGES).content
+    assert first.startswith("Advice:")
+
+
+def test_fake_calls_bound_tool_with_message_args():
+    message = FakeChatModel().bind_tools([get_weather]).invoke(MESSAGES)
+    assert message.tool_calls[0]["name"] == "get_weather"
+    assert message.tool_calls[0]["args"] == {"lat": 21.1, "lng": 79.0}
+
+
+def test_fake_streams_same_text():
+    model = FakeChatModel()
+    streamed = "".join(chunk.content for chunk in model.stream(MESSAGES))
+    assert streamed == model.invoke(MESSAGES).content
+
+
+# ─── Cassette record / replay ─────────────────────────────────
+
+def test_cassette_persists_entries(cassette):
+    RecordingFake(temperature=0).invoke(MESSAGES)
+    assert len(cassette) == 1
+    assert len(Cassette(cassette.path)) == 1
+
+
+def test_replay_returns_recorded_answer(cassette, monkeypatch):
+    recorded = RecordingFake(temperature=0).invoke(MESSAGES)
+    monkeypatch.setattr(settings, "LLM_BACKEND", "replay")
+    assert chat_model(temperature=0).invoke(MESSAGES).content == recorded.content
+
+
+def test_replay_unrecorded_request_raises(cassette, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BACKEND", "replay")
+    with pytest.raises(LookupError):
+        chat_model(temperature=0).invoke(MESSAGES)
+
+
+# ─── Latency injection ────────────────────────────────────────
+
+def test_no_latency_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_LATENCY_MS", 0)
+    monkeypatch.setattr(settings, "LLM_LATENCY_JITTER_MS", 0)
+    assert _latency_seconds() == 0.0
+
+
+def test_latency_is_slept_per_call(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_LATENCY_MS", 50)
+    monkeypatch.setattr(settings, "LLM_LATENCY_JITTER_MS", 20)
+    for _ in range(5):
+        assert 0.05 <= _latency_seconds() <= 0.07
+    started = time.perf_counter()
+    SlowFake().invoke(MESSAGES)
+    assert time.perf_counter() - started >= 0.05
+
+
+# ─── Cache keys per backend ───────────────────────────────────
+
+def test_cache_keys_differ_per_backend(monkeypatch):
+    request = {"crop": "onion", "lat": 21.1, "lng": 79.0}
+    context = {"crop": "onion", "score": 72}
+    keys = {}
+    for backend in ("gemini", "fake", "replay"):
+        monkeypatch.setattr(settings, "LLM_BACKEND", backend)
+        keys[backend] = (
+            build_cache_key("harvest", request),
+            explanation_key(context, "hindi", "harvest"),
+        )
+    assert len({agent for agent, _ in keys.values()}) == 3
+    assert len({explain for _, explain in keys.values()}) == 3
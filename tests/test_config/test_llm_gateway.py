@@ -0,0 +1,205 @@
+"""Tests for backend/config/llm_gateway.py (priorities, slots, buckets)."""
+
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from backend.config.llm_gateway import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    PRIORITY_URGENT,
+    CallSite,
+    LLMGateway,
+    _TokenBucket,
+)
+
+
+def _served_order(gateway: LLMGateway, waiters: list) -> list:
+    """Hold the only slot while waiters queue up, then release it and
+    return the names in the order they were granted."""
+    order = []
+
+    async def call(name, priority):
+        waiter = await gateway.acquire(1, CallSite(name, priority))
+        order.append(name)
+        gateway.release(waiter)
+
+    async def main():
+        holder = await gateway.acquire(1, CallSite("holder"))
+        tasks = []
+        for name, priority in waiters:
+            tasks.append(asyncio.ensure_future(call(name, priority)))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        assert order == []
+        gateway.release(holder)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    return order
+
+
+def test_served_by_priority():
+    order = _served_order(LLMGateway(max_concurrency=1), [
+        ("harvest", PRIORITY_LOW),
+        ("market", PRIORITY_NORMAL),
+        ("spoilage", PRIORITY_HIGH),
+        ("red-risk", PRIORITY_URGENT),
+    ])
+    assert order == ["red-risk", "spoilage", "market", "harvest"]
+
+
+def test_same_priority_in_arrival_order():
+    order = _served_order(LLMGateway(max_concurrency=1), [
+        (f"call-{i}", PRIORITY_NORMAL) for i in range(5)
+    ])
+    assert order == [f"call-{i}" for i in range(5)]
+
+
+def test_concurrency_cap():
+    gateway = LLMGateway(max_concurrency=2)
+    active = []
+    peak = []
+
+    async def call():
+        waiter = await gateway.acquire(1, CallSite("test"))
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        gateway.release(waiter)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert gateway.stats()["in_flight"] == 0
+    assert gateway.stats()["queue_wait"]["test"]["calls"] == 6
+
+
+def test_token_bucket_delay():
+    bucket = _TokenBucket(60)
+    assert bucket.delay(60) == 0.0
+    bucket.take(60)
+    assert 0.9 <= bucket.delay(1) <= 1.0
+    bucket.adjust(-30)
+    assert bucket.delay(1) == 0.0
+
+
+def test_disabled_bucket_never_waits():
+    bucket = _TokenBucket(0)
+    bucket.take(10 ** 6)
+    assert bucket.delay(10 ** 6) == 0.0
+
+
+def test_tpm_limit_delays_next_call():
+    gateway = LLMGateway(max_concurrency=4, tpm=60_000)
+
+    async def main():
+        first = await gateway.acquire(60_000, CallSite("big"))
+        gateway.release(first)
+        started = time.monotonic()
+        second = await gateway.acquire(100, CallSite("small"))
+        gateway.release(second)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.08
+    assert gateway.stats()["rate_limited"] >= 1
+
+
+def test_overestimate_is_refunded():
+    gateway = LLMGateway(max_concurrency=4, tpm=60_000)
+
+    async def main():
+        first = await gateway.acquire(60_000, CallSite("big"))
+        # Gemini reported far fewer tokens than estimated
+        gateway.release(first, used_tokens=1_000)
+        started = time.monotonic()
+        second = await gateway.acquire(100, CallSite("small"))
+        gateway.release(second)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.05
+    assert gateway.stats()["rate_limited"] == 0
+
+
+def test_sync_slot_records_tokens():
+    gateway = LLMGateway(max_concurrency=1)
+    with gateway.slot(500) as usage:
+        usage["tokens"] = 320
+    site = gateway.stats()["queue_wait"]["other"]
+    assert site["calls"] == 1
+    assert site["tokens"] == 320
+
+
+def test_unmetered_calls_skip_the_quota():
+    gateway = LLMGateway(max_concurrency=4, rpm=1, tpm=60_000)
+
+    async def main():
+        first = await gateway.acquire(60_000, CallSite("gemini"))
+        gateway.release(first)
+        started = time.monotonic()
+        for _ in range(3):
+            waiter = await gateway.acquire(100, CallSite("fake"), metered=False)
+            gateway.release(waiter, used_tokens=10 ** 6)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.05
+    assert gateway.stats()["rate_limited"] == 0
+
+
+def test_fake_and_replay_models_are_unmetered():
+    from backend.config.llm_factory import (
+        GatedFakeChatModel,
+        GeminiChatModel,
+        ReplayChatModel,
+    )
+
+    assert GeminiChatModel.metered
+    assert not GatedFakeChatModel.metered
+    assert not ReplayChatModel.metered
+
+
+def test_stream_frees_slot_before_consumer_finishes(monkeypatch):
+    import backend.config.llm_gateway as gateway_module
+    from backend.config.llm_factory import GatedFakeChatModel
+
+    gateway = LLMGateway(max_concurrency=1)
+    monkeypatch.setattr(gateway_module, "llm_gateway", gateway)
+    model = GatedFakeChatModel(temperature=0)
+
+    async def main():
+        stream = model.astream("Explain the harvest score of my tomatoes")
+        first = await stream.__anext__()
+        await asyncio.sleep(0.01)
+        # The slow reader still holds the stream, but not the slot
+        assert gateway.stats()["in_flight"] == 0
+        other = await asyncio.wait_for(model.ainvoke("Hello"), 1)
+        rest = [chunk async for chunk in stream]
+        return first, rest, other
+
+    first, rest, other = asyncio.run(main())
+    assert first.content and rest and other.content
+    assert gateway.stats()["in_flight"] == 0
+
+
+def test_abandoned_stream_frees_slot(monkeypatch):
+    import backend.config.llm_gateway as gateway_module
+    from backend.config.llm_factory import GatedFakeChatModel
+
+    gateway = LLMGateway(max_concurrency=1)
+    monkeypatch.setattr(gateway_module, "llm_gateway", gateway)
+    model = GatedFakeChatModel(temperature=0)
+
+    async def main():
+        stream = model.astream("Explain the harvest score of my tomatoes")
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert gateway.stats()["in_flight"] == 0
@@ -0,0 +1,91 @@
+"""Tests for backend/config/llm_health.py (breaker, backoff, probe)."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+
+from backend.config import llm_health as health_module
+from backend.config.llm_health import LLMHealth
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(health_module, "time", fake)
+    return fake
+
+
+def make_health() -> LLMHealth:
+    return LLMHealth(failure_threshold=2, base_backoff=5, max_backoff=20)
+
+
+def test_opens_after_threshold(clock):
+    health = make_health()
+    health.record_failure()
+    assert health.allow_request()
+    health.record_failure()
+    assert health.is_open
+    assert not health.allow_request()
+    assert health.status()["skipped_calls"] == 1
+    assert health.status()["retry_in_seconds"] == 5
+
+
+def test_success_resets_failures(clock):
+    health = make_health()
+    health.record_failure()
+    health.record_success()
+    health.record_failure()
+    assert not health.is_open
+
+
+def test_single_probe_after_backoff(clock):
+    health = make_health()
+    health.record_failure()
+    health.record_failure()
+    clock.now += 5
+    assert health.allow_request()
+    assert not health.allow_request()
+
+
+def test_probe_success_closes_breaker(clock):
+    health = make_health()
+    health.record_failure()
+    health.record_failure()
+    clock.now += 5
+    assert health.allow_request()
+    health.record_success()
+    assert health.status()["healthy"]
+    assert health.allow_request() and health.allow_request()
+
+
+def test_probe_failure_doubles_backoff_up_to_max(clock):
+    health = make_health()
+    health.record_failure()
+    health.record_failure()
+    for expected in (10, 20, 20):
+        clock.now += 30
+        assert health.allow_request()
+        health.record_failure()
+        assert health.status()["retry_in_seconds"] == expected
+        assert not health.allow_request()
+
+
+def test_released_probe_can_be_taken_again(clock):
+    health = make_health()
+    health.record_failure()
+    health.record_failure()
+    clock.now += 5
+    assert health.allow_request()
+    health.release_probe()
+    assert health.failures == 2
+    assert health.allow_request()
@@ -0,0 +1,105 @@
+"""Tests for backend/config/singleflight.py (request coalescing)."""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import pytest
+
+from backend.config.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"score": 72}
+
+    async def main():
+        return await asyncio.gather(*(
+            flight.do("harvest:a", compute) for _ in range(5)
+        ))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [{"score": 72}] * 5
+    assert [shared for _, shared in results] == [False] + [True] * 4
+    assert flight.coalesced == 4
+    assert flight.in_flight == 0
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("a", lambda: compute("a")),
+            flight.do("b", lambda: compute("b")),
+        )
+
+    assert asyncio.run(main()) == [("a", False), ("b", False)]
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_finished_key_runs_again():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.do("a", compute)
+        second = await flight.do("a", compute)
+        return first, second
+
+    assert asyncio.run(main()) == ((1, False), (2, False))
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("gemini down")
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("a", fail), flight.do("a", fail),
+            return_exceptions=True,
+        )
+
+    errors = asyncio.run(main())
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert flight.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_run():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("a", compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(flight.do("a", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == ("done", True)
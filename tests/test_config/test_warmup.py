@@ -0,0 +1,73 @@
+"""Tests for backend/config/warmup.py"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import backend.config.warmup as warmup_module
+from backend.config.settings import settings
+from backend.config.warmup import WarmUp, is_required
+
+
+def _ok():
+    return None
+
+
+def _fail():
+    raise ValueError("boom")
+
+
+def _run(monkeypatch, steps) -> WarmUp:
+    warm = WarmUp()
+    monkeypatch.setattr(warm, "_steps", lambda: steps)
+    asyncio.run(warm.run())
+    return warm
+
+
+def test_all_steps_ok_is_ready(monkeypatch):
+    warm = _run(monkeypatch, [("data", _ok), ("agents.market", _ok)])
+    assert warm.state == "done"
+    assert warm.healthy and warm.ready
+
+
+def test_failed_agent_build_is_not_ready(monkeypatch):
+    warm = _run(monkeypatch, [("data", _ok), ("agents.market", _fail)])
+    assert warm.state == "done"
+    assert not warm.healthy
+    assert not warm.ready
+    assert warm.status()["errors"] == {"agents.market": "boom"}
+    assert warm.status()["healthy"] is False
+
+
+def test_failed_llm_step_is_still_ready(monkeypatch):
+    warm = _run(monkeypatch, [
+        ("agents.market", _ok), ("llm.intent", _fail), ("connect.intent", _fail),
+    ])
+    assert warm.healthy and warm.ready
+    assert set(warm.errors) == {"llm.intent", "connect.intent"}
+
+
+def test_required_steps():
+    assert is_required("imports")
+    assert is_required("data")
+    assert is_required("agents.harvest")
+    assert not is_required("llm.answer")
+    assert not is_required("connect.answer")
+
+
+def test_no_api_key_skips_llm_steps(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BACKEND", "gemini")
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.setattr(warmup_module, "_load_data", _ok)
+    warm = WarmUp()
+    asyncio.run(warm.run())
+    assert set(warm.timings) == {"imports", "data"}
+    assert warm.skipped == ["agents.*", "llm.*", "connect.*"]
+    assert warm.ready
+
+
+def test_disabled_is_ready_at_once():
+    warm = WarmUp(enabled=False)
+    asyncio.run(warm.run())
+    assert warm.ready
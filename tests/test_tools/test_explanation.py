@@ -2,9 +2,24 @@
 
 import sys
 import os
+import asyncio
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from backend.tools.explanation import generate_explanation_safe, FALLBACK_RESPONSES
+import pytest
+from langchain_core.messages import AIMessage
+
+import backend.config.cache as cache_module
+import backend.config.llm_health as health_module
+from backend.config.cache import LRUCache
+from backend.config.llm_health import LLMHealth
+from backend.tools.explanation import (
+    FALLBACK_RESPONSES,
+    agenerate_explanations_batch,
+    explanation_key,
+    generate_explanation,
+    generate_explanation_safe,
+    normalize_context,
+)
 
 
 SAMPLE_CONTEXT = {
@@ -54,3 +69,165 @@ def test_fallback_contains_useful_info(monkeypatch):
 
     result = generate_explanation_safe(SAMPLE_CONTEXT, "hindi", "harvest")
     assert "78" in result, "Fallback should contain the score value"
+
+
+# ─── Normalized context and cache keys ────────────────────────
+
+class StubLLM:
+    """Answers "single <n>" and counts its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=f"single {self.calls}")
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    """A fresh in-memory explanation cache, a closed breaker and
+    install(llm) to put a stub in place of Gemini."""
+    import backend.tools.explanation as exp
+
+    def install(llm):
+        monkeypatch.setattr(exp, "_llm", llm)
+        return llm
+
+    monkeypatch.setattr(
+        cache_module, "explanation_cache", LRUCache(sweep_interval=0)
+    )
+    monkeypatch.setattr(health_module, "llm_health", LLMHealth())
+    return install
+
+
+def test_normalize_keeps_only_type_fields_bucketed():
+    context = {
+        "crop": "tomato", "score": 77.6, "humidity_pct": 63,
+        "soil_moisture_factor": 0.83, "recommended_mandi": "Kalamna",
+        "remaining_hours": None,
+    }
+    assert normalize_context(context, "harvest") == {
+        "crop": "tomato", "score": 78, "humidity_pct": 65,
+        "soil_moisture_factor": 0.8,
+    }
+
+
+def test_key_shared_within_bucket():
+    a = explanation_key({"crop": "tomato", "remaining_hours": 36.2}, "Hindi", "spoilage")
+    b = explanation_key({"crop": "tomato", "remaining_hours": 35.9, "score": 10}, "hindi ", "spoilage")
+    assert a == b
+
+
+def test_key_casefolds_strings():
+    a = explanation_key({"crop": "Tomato", "risk_level": "HIGH"}, "hindi", "spoilage")
+    b = explanation_key({"crop": " tomato ", "risk_level": "high"}, "hindi", "spoilage")
+    assert a == b
+
+
+def test_prompt_keeps_full_context():
+    from backend.tools.explanation import _user_prompt
+
+    context = {"crop": "tomato", "score": 77.6, "breakdown": {"weather": 25}}
+    prompt = _user_prompt(context, "harvest")
+    assert "'breakdown': {'weather': 25}" in prompt
+    assert "77.6" in prompt
+    assert explanation_key(context, "hindi", "harvest") != explanation_key(
+        {**context, "breakdown": {"weather": 10}}, "hindi", "harvest"
+    )
+
+
+def test_key_differs_by_bucket_language_and_type():
+    context = {"crop": "tomato", "remaining_hours": 36}
+    key = explanation_key(context, "hindi", "spoilage")
+    assert key != explanation_key({**context, "remaining_hours": 40}, "hindi", "spoilage")
+    assert key != explanation_key(context, "marathi", "spoilage")
+    assert key != explanation_key(context, "hindi", "preservation")
+
+
+def test_cached_explanation_skips_llm(stub_llm):
+    llm = stub_llm(StubLLM())
+    first = generate_explanation({"crop": "onion", "score": 71.8}, "hindi")
+    second = generate_explanation({"crop": "onion", "score": 72.2}, "hindi")
+    assert first == second
+    assert llm.calls == 1
+
+
+# ─── Batch generation ─────────────────────────────────────────
+
+class StubBatchLLM(StubLLM):
+    """Batch answers cover only answered_ids (all when None), or the
+    batch call raises batch_error."""
+
+    def __init__(self, answered_ids=None, batch_error=None):
+        super().__init__()
+        self.answered_ids = answered_ids
+        self.batch_error = batch_error
+        self.batches = []
+
+    def with_structured_output(self, schema):
+        llm = self
+
+        class Structured:
+            async def ainvoke(self, messages):
+                count = messages[1].content.count("Request ")
+                llm.batches.append(count)
+                if llm.batch_error:
+                    raise llm.batch_error
+                ids = range(count) if llm.answered_ids is None else llm.answered_ids
+                return schema(explanations=[
+                    {"id": i, "explanation": f"batch {i}"} for i in ids
+                ])
+
+        return Structured()
+
+
+def _batch_items(crops) -> list:
+    return [
+        {"context": {"crop": crop, "score": 70}, "explanation_type": "harvest"}
+        for crop in crops
+    ]
+
+
+def test_batch_answers_every_item_in_one_call(stub_llm):
+    llm = stub_llm(StubBatchLLM())
+    results = asyncio.run(agenerate_explanations_batch(
+        _batch_items(["onion", "tomato", "potato"]), batch_size=5,
+    ))
+    assert results == ["batch 0", "batch 1", "batch 2"]
+    assert llm.batches == [3]
+    assert llm.calls == 0
+
+
+def test_batch_missing_items_retried_one_by_one(stub_llm):
+    llm = stub_llm(StubBatchLLM(answered_ids=[0, 2]))
+    results = asyncio.run(agenerate_explanations_batch(
+        _batch_items(["onion", "tomato", "potato"]), batch_size=5,
+    ))
+    assert results[0] == "batch 0"
+    assert results[1] == "single 1"
+    assert results[2] == "batch 2"
+    assert llm.calls == 1
+
+
+def test_failed_batch_falls_back_per_item(stub_llm):
+    llm = stub_llm(StubBatchLLM(batch_error=ValueError("bad json")))
+    results = asyncio.run(agenerate_explanations_batch(
+        _batch_items(["onion", "tomato"]), batch_size=5,
+    ))
+    assert sorted(results) == ["single 1", "single 2"]
+    assert llm.calls == 2
+
+
+def test_batch_dedupes_and_reuses_cache(stub_llm):
+    llm = stub_llm(StubBatchLLM())
+    items = _batch_items(["onion", "onion", "tomato"])
+    first = asyncio.run(agenerate_explanations_batch(items, batch_size=5))
+    assert first[0] == first[1]
+    assert llm.batches == [2]
+    second = asyncio.run(agenerate_explanations_batch(items, batch_size=5))
+    assert second == first
+    assert llm.batches == [2]
@@ -0,0 +1,108 @@
+"""Tests for backend/tools/memo.py (memoized tool functions)."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from backend.tools.mandi import get_nearby_mandis, reload_mandi_data
+from backend.tools.memo import fresh_copy, memoize_tool
+from backend.tools.preservation import calculate_preservation_benefit
+from backend.tools.spoilage import predict_remaining_hours, reload_spoilage_data
+
+
+def _counts(tool) -> tuple:
+    stats = tool.memo.stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_fresh_copy_is_deep():
+    value = {"mandis": [{"name": "Kalamna", "prices": [18, 20]}]}
+    copy = fresh_copy(value)
+    copy["mandis"][0]["prices"].append(99)
+    assert value == {"mandis": [{"name": "Kalamna", "prices": [18, 20]}]}
+
+
+def test_mutating_a_result_does_not_corrupt_the_memo():
+    get_nearby_mandis.memo.clear()
+    first = get_nearby_mandis("onion", 21.1458, 79.0882)
+    first[0]["distance_km"] = -1
+    first.clear()
+    second = get_nearby_mandis("onion", 21.1458, 79.0882)
+    assert second and second[0]["distance_km"] >= 0
+
+
+def test_storage_method_is_casefolded():
+    predict_remaining_hours.memo.clear()
+    lower = predict_remaining_hours("tomato", "cold_storage", 30, 0)
+    mixed = predict_remaining_hours("Tomato", " Cold_Storage ", 30, 0)
+    assert mixed == lower
+    assert mixed["storage_method"] == "cold_storage"
+    assert predict_remaining_hours.memo.stats()["entries"] == 1
+
+
+def test_preservation_benefit_ids_are_casefolded():
+    calculate_preservation_benefit.memo.clear()
+    lower = calculate_preservation_benefit("tomato", "zecc", "open_floor", 32)
+    mixed = calculate_preservation_benefit("Tomato", "ZECC", "Open_Floor", 32)
+    assert mixed == lower
+    assert calculate_preservation_benefit.memo.stats()["entries"] == 1
+
+
+def test_coordinates_rounded_to_four_decimals():
+    get_nearby_mandis.memo.clear()
+    hits, misses = _counts(get_nearby_mandis)
+    get_nearby_mandis("onion", 21.14581, 79.08821)
+    get_nearby_mandis("onion", 21.145812, 79.088208)
+    assert _counts(get_nearby_mandis) == (hits + 1, misses + 1)
+    get_nearby_mandis("onion", 21.1459, 79.0882)
+    assert _counts(get_nearby_mandis) == (hits + 1, misses + 2)
+
+
+def test_reload_invalidates_dependent_tools():
+    predict_remaining_hours("tomato", "open_floor", 30, 0)
+    calculate_preservation_benefit("tomato", "zecc", "open_floor", 32)
+    get_nearby_mandis("onion", 21.1458, 79.0882)
+
+    reload_spoilage_data()
+    assert predict_remaining_hours.memo.stats()["entries"] == 0
+    assert calculate_preservation_benefit.memo.stats()["entries"] == 0
+    assert get_nearby_mandis.memo.stats()["entries"] > 0
+
+    reload_mandi_data()
+    assert get_nearby_mandis.memo.stats()["entries"] == 0
+
+
+def test_lru_keeps_most_recent_entries():
+    calls = []
+
+    @memoize_tool(maxsize=2)
+    def double(x: int) -> dict:
+        calls.append(x)
+        return {"value": 2 * x}
+
+    double(1)
+    double(2)
+    double(1)
+    double(3)  # evicts 2, the least recently used
+    double(1)
+    double(2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_result_computed_across_a_clear_is_not_stored():
+    data = {"version": 1}
+
+    @memoize_tool()
+    def lookup(key: str) -> dict:
+        result = {"version": data["version"]}
+        if data["version"] == 1:
+            # The data is reloaded while this call is still computing
+            data["version"] = 2
+            lookup.memo.clear()
+        return result
+
+    assert lookup("a") == {"version": 1}
+    assert lookup.memo.stats()["entries"] == 0
+    assert lookup("a") == {"version": 2}
+    assert lookup("a") == {"version": 2}
+    assert lookup.memo.stats()["hits"] == 1